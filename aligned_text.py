@@ -0,0 +1,215 @@
+# Parallel text of every version in a single file: one row per canonical verse
+# (see canon.ordinal) and one text column per version, each version mapped
+# through its versification (e.g. the catholic jl3:1 lands on the jl2:28 row).
+#
+# Verses a version numbers outside the canon (psalm titles, dn3:24-90...) have
+# no row. A version verse merged into the previous one (e.g. tnm 3jo1:14-15)
+# stays on the first row, a canonical verse split in two is joined back.
+#
+# Layout (little endian):
+#
+#   magic          8 bytes  b"BIBALGN1"
+#   header_len     u32
+#   header         JSON: rows, versions (name, path, versification, offsets_at, text_at)
+#   per version    uint32 text offset per row + 1, then the UTF-8 texts back to back
+#
+# A chapter of a version is a contiguous range of offsets and text, so showing
+# N versions side by side is N slices of the same mmap.
+#
+# Usage:
+#   python aligned_text.py build
+#   python aligned_text.py show jo 3 --versions ara kjv tnm
+
+import argparse
+import json
+import mmap
+from pathlib import Path
+import struct
+import time
+import typing as t
+from rich import print
+from biblia.canon import CHAPTER_SIZE, CHAPTER_START, VERSE_COUNT, chapter_slot
+from biblia.corpus import JSON_DIR, parse_verse_key
+from packed_corpus import default_version_dirs
+from versification import Versification, layout, ordinal, version_versification
+
+
+OUTPUT_FILE = Path("./build/aligned_text.bin")
+MAGIC = b"BIBALGN1"
+HEADER_LEN_STRUCT = struct.Struct("<I")
+
+
+class AlignedVersion(t.TypedDict):
+    name: str
+    path: str
+    """Relative to json/, e.g. "pt-br/acf" """
+    versification: Versification
+    offsets_at: int
+    text_at: int
+
+
+class AlignedHeader(t.TypedDict):
+    rows: int
+    versions: list[AlignedVersion]
+
+
+def _column(version_dir: Path, versification: Versification) -> list[bytes]:
+    """Text of every canonical verse in a version, b"" where it has none"""
+    to_canon = layout(versification).to_canon
+    texts: dict[int, list[str]] = {}
+
+    for book_dir in (path for path in version_dir.iterdir() if path.is_dir()):
+        for file in book_dir.glob("*.json"):
+            chapter = int(file.stem)
+            content: dict[str, str] = json.loads(file.read_text(encoding="utf-8"))["content"]
+            for (verse, _), text in sorted((parse_verse_key(key), value) for key, value in content.items()):
+                try:
+                    row = to_canon[ordinal(book_dir.name, chapter, verse, versification)]
+                except KeyError:
+                    continue
+
+                if row >= 0:
+                    texts.setdefault(row, []).append(text)
+
+    return [" ".join(texts[row]).encode("utf-8") if row in texts else b"" for row in range(VERSE_COUNT)]
+
+
+def build(output_file: Path = OUTPUT_FILE, version_dirs: list[Path] | None = None) -> AlignedHeader:
+    if version_dirs is None:
+        version_dirs = default_version_dirs()
+
+    columns = [_column(version_dir, version_versification(version_dir)) for version_dir in version_dirs]
+
+    # Offsets are only known once the header size is, so measure the header first
+    versions = [
+        AlignedVersion(
+            name=version_dir.name,
+            path=version_dir.relative_to(JSON_DIR).as_posix(),
+            versification=version_versification(version_dir),
+            offsets_at=0,
+            text_at=0,
+        )
+        for version_dir in version_dirs
+    ]
+    header = AlignedHeader(rows=VERSE_COUNT, versions=versions)
+    raw_header = b""
+    while True:
+        position = len(MAGIC) + HEADER_LEN_STRUCT.size + len(raw_header)
+        for version, column in zip(versions, columns):
+            position += -position % 4
+            version["offsets_at"] = position
+            version["text_at"] = position + (VERSE_COUNT + 1) * 4
+            position = version["text_at"] + sum(len(text) for text in column)
+
+        encoded = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(encoded) == len(raw_header):
+            break
+        raw_header = encoded
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_LEN_STRUCT.pack(len(raw_header)))
+        f.write(raw_header)
+        for version, column in zip(versions, columns):
+            f.write(b"\0" * (version["offsets_at"] - f.tell()))
+            offset = 0
+            offsets = [0]
+            for text in column:
+                offset += len(text)
+                offsets.append(offset)
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.write(b"".join(column))
+
+    tmp.replace(output_file)
+    return header
+
+
+class AlignedText:
+    """Read-only view over the file written by `build`"""
+
+    def __init__(self, path: Path = OUTPUT_FILE) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an aligned text file")
+
+        (header_len,) = HEADER_LEN_STRUCT.unpack_from(self._view, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LEN_STRUCT.size
+        self.header: AlignedHeader = json.loads(bytes(self._view[header_start : header_start + header_len]))
+        self._versions = {version["name"]: version for version in self.header["versions"]}
+
+    def __enter__(self) -> "AlignedText":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    @property
+    def versions(self) -> list[str]:
+        return list(self._versions)
+
+    def column(self, version: str, start: int, stop: int) -> list[str]:
+        """Texts of rows [start, stop) of a version, "" where it has no such verse"""
+        meta = self._versions[version]
+        offsets = struct.unpack_from(f"<{stop - start + 1}I", self._view, meta["offsets_at"] + start * 4)
+        text_at = meta["text_at"]
+        return [
+            str(self._view[text_at + offsets[idx] : text_at + offsets[idx + 1]], "utf-8")
+            for idx in range(stop - start)
+        ]
+
+    def rows(self, start: int, stop: int, versions: t.Iterable[str] | None = None) -> dict[str, list[str]]:
+        return {version: self.column(version, start, stop) for version in versions or self._versions}
+
+    def chapter(self, book: str, chapter: int, versions: t.Iterable[str] | None = None) -> dict[str, list[str]]:
+        """Version -> texts of verse 1..n of a canonical chapter"""
+        slot = chapter_slot(book, chapter)
+        return self.rows(CHAPTER_START[slot], CHAPTER_START[slot] + CHAPTER_SIZE[slot], versions)
+
+    def verse(self, book: str, chapter: int, verse: int, versions: t.Iterable[str] | None = None) -> dict[str, str]:
+        row = ordinal(book, chapter, verse)
+        return {version: texts[0] for version, texts in self.rows(row, row + 1, versions).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "show"])
+    parser.add_argument("book", nargs="?")
+    parser.add_argument("chapter", nargs="?", type=int)
+    parser.add_argument("--versions", nargs="*", help="Every version when omitted")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        header = build(args.output)
+        print(f"Write {args.output}: {header['rows']} rows x {len(header['versions'])} versions in {time.perf_counter() - start:.2f}s")
+        return
+
+    if not args.book or not args.chapter:
+        parser.error("show needs a book and a chapter")
+
+    with AlignedText(args.output) as aligned:
+        start = time.perf_counter()
+        columns = aligned.chapter(args.book, args.chapter, args.versions)
+        elapsed = time.perf_counter() - start
+
+        for idx in range(len(next(iter(columns.values())))):
+            print(f"[bold]{args.book}{args.chapter}:{idx + 1}[/bold]")
+            for version, texts in columns.items():
+                print(f"  [yellow]{version}[/yellow] {texts[idx]}")
+        print(f"Read {len(columns)} versions in {elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
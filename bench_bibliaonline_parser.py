@@ -0,0 +1,82 @@
+# Benchmark the copy_bibliaonline parser backends over saved chapter HTML and
+# check that every backend produces exactly the same verses/titles as bs4.
+#
+# Chapters are read from the HTTP cache (run copy_bibliaonline once to fill it)
+# or from a directory of *.html files:
+#
+#   python bench_bibliaonline_parser.py
+#   python bench_bibliaonline_parser.py --html-dir saved_pages/ --repeat 3
+
+import argparse
+import gzip
+from pathlib import Path
+import sys
+import time
+from rich import print
+from rich.table import Table
+from rich.console import Console
+from copy_bibliaonline import PARSERS, compact_json
+from http_cache import CACHE_DIR
+
+
+def _load_from_cache(cache_dir: Path) -> dict[str, str]:
+    pages: dict[str, str] = {}
+    for entry in sorted(cache_dir.glob("*/*.gz")):
+        header, content = gzip.decompress(entry.read_bytes()).split(b"\n", 1)
+        if b"bibliaonline.com.br" in header:
+            pages[entry.stem] = content.decode("utf-8")
+
+    return pages
+
+def _load_from_dir(html_dir: Path) -> dict[str, str]:
+    return {file.stem: file.read_text(encoding="utf-8") for file in sorted(html_dir.glob("*.html"))}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--html-dir", type=Path, help="Directory with saved chapter pages (*.html)")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backends", nargs="+", choices=PARSERS, default=list(PARSERS))
+    args = parser.parse_args()
+
+    pages = _load_from_dir(args.html_dir) if args.html_dir else _load_from_cache(args.cache_dir)
+    if not pages:
+        print("[red]No chapter pages found[/red]")
+        sys.exit(1)
+
+    expected = {name: compact_json(PARSERS["bs4"](html)) for name, html in pages.items()}
+
+    table = Table(title=f"{len(pages)} chapters x {args.repeat}")
+    table.add_column("Backend")
+    table.add_column("Chapters/s", justify="right")
+    table.add_column("ms/chapter", justify="right")
+    table.add_column("Mismatches", justify="right")
+
+    failed = False
+    for backend in args.backends:
+        parse = PARSERS[backend]
+        mismatches = [name for name, html in pages.items() if compact_json(parse(html)) != expected[name]]
+        failed |= bool(mismatches)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for html in pages.values():
+                parse(html)
+        elapsed = time.perf_counter() - start
+
+        total = len(pages) * args.repeat
+        table.add_row(
+            backend,
+            f"{total / elapsed:.1f}",
+            f"{elapsed / total * 1000:.2f}",
+            f"[red]{len(mismatches)}[/red]" if mismatches else "0",
+        )
+        for name in mismatches[:5]:
+            print(f"[red]{backend} differs from bs4 on {name}[/red]")
+
+    Console().print(table)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
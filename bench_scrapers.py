@@ -0,0 +1,293 @@
+# Offline benchmark of the copy_* scrapers: every pipeline downloads the same
+# sample books from mock_server, which replays fixtures recorded from the real
+# sites, and reports chapters/s, CPU per chapter and retries.
+#
+# Fixtures are http_cache directories under fixtures/scrapers/<pipeline>/. The
+# committed ones were rebuilt in each site's format from the chapters under
+# json/; `record` replaces them with real responses when there's network access.
+# `run` needs none, so it can gate CI with --compare against a saved baseline
+# (exit 1 on regressions, or when a request has no fixture).
+#
+# copy_catolica_avemaria drives Chrome through selenium and is not covered.
+#
+# Usage:
+#   python bench_scrapers.py record
+#   python bench_scrapers.py record --pipelines tnm refs
+#   python bench_scrapers.py run
+#   python bench_scrapers.py run --latency-ms 80 --jitter-ms 40 --rate-limit 0.05 --seed 1
+#   python bench_scrapers.py run --save bench.json
+#   python bench_scrapers.py run --compare bench.json --tolerance 0.25
+
+import argparse
+import asyncio
+from contextlib import contextmanager, redirect_stdout
+import io
+import json
+import multiprocessing
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+import typing as t
+import httpx
+from rich import print
+from rich.console import Console
+from rich.table import Table
+from biblia.canon import book, book_chapters, to_scheme
+from biblia.normalize import remove_accents
+import copy_bibliaonline
+import copy_bkjf
+import copy_catolica_aparecida
+import copy_catolica_pastoral
+import copy_comentarios
+import copy_refs
+import copy_tnm
+from fetcher import WORKERS, FetchEngine, Job
+from http_cache import ResponseCache
+import mock_server
+from mock_server import Faults, MockServer, Stats
+from scrape_manifest import Manifest
+from scrape_metrics import ScrapeMetrics
+from scrape_pipeline import ChapterStages, run_chapters
+
+
+FIXTURES_DIR = Path("./fixtures/scrapers/")
+SAMPLE_BOOKS = ("rt", "jn", "fp")
+"""Short books from both testaments, 12 chapters in every scheme"""
+TOLERANCE = 0.2
+
+
+class Pipeline(t.NamedTuple):
+    book_jobs: t.Callable[[FetchEngine, Manifest, str], list[t.Any]]
+    """Jobs downloading one book (canon abbrev) as the script's _main builds them, or its chapters with `stages`"""
+    stages: t.Callable[[FetchEngine, Manifest], ChapterStages] | None = None
+    """For scripts that run their chapters through scrape_pipeline"""
+    headers: dict[str, str] | None = None
+    workers: int = WORKERS
+
+
+class Result(t.TypedDict):
+    chapters: int
+    requests: int
+    retries: int
+    seconds: float
+    chapters_per_s: float
+    cpu_ms_per_chapter: float
+
+
+def _bibliaonline(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[copy_bibliaonline.ChapterRef]:
+    meta = copy_bibliaonline.OutputMeta(title=book(abbrev).name, abbrev=abbrev)
+    return copy_bibliaonline._chapter_refs(
+        meta, copy_bibliaonline.BR_VERSIONS[0], to_scheme(abbrev, "bibliaonline"), book_chapters(abbrev), copy_bibliaonline.BR_OUTPUT_DIR,
+    )
+
+def _bkjf(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[copy_bkjf.ChapterRef]:
+    title = book(abbrev).name
+    meta = copy_bkjf.OutputMeta(title=title, abbrev=abbrev)
+    return copy_bkjf._chapter_refs(meta, remove_accents(title.lower()), abbrev, book_chapters(abbrev))
+
+def _aparecida(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[Job[t.Any]]:
+    meta = copy_catolica_aparecida.OutputMeta(title=book(abbrev).catholic_name, abbrev=abbrev)
+    return copy_catolica_aparecida._download_version(
+        engine, manifest, meta, book(abbrev).testament == "VT", to_scheme(abbrev, "a12"),
+        book_chapters(abbrev, "a12"), copy_catolica_aparecida.BR_OUTPUT_DIR,
+    )
+
+def _pastoral(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[Job[t.Any]]:
+    meta = copy_catolica_pastoral.OutputMeta(title=book(abbrev).catholic_name, abbrev=abbrev)
+    return copy_catolica_pastoral._download_version(
+        engine, manifest, meta, abbrev, to_scheme(abbrev, "paulus"),
+        book_chapters(abbrev, "paulus"), copy_catolica_pastoral.BR_OUTPUT_DIR,
+    )
+
+def _comentarios(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[copy_comentarios.ChapterRef]:
+    return copy_comentarios._chapter_refs(
+        copy_comentarios.BR_VERSIONS[0], to_scheme(abbrev, "bibliatodo"), book_chapters(abbrev, "bibliatodo"), copy_comentarios.BR_OUTPUT_DIR,
+    )
+
+def _tnm(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[copy_tnm.ChapterRef]:
+    return copy_tnm._book_chapters(book(abbrev))
+
+def _refs(engine: FetchEngine, manifest: Manifest, abbrev: str) -> list[Job[t.Any]]:
+    async def _download_book() -> None:
+        await copy_refs._download_chapters(engine, manifest, abbrev, book_chapters(abbrev))
+
+    return [_download_book]
+
+
+PIPELINES: dict[str, Pipeline] = {
+    "bibliaonline": Pipeline(_bibliaonline, copy_bibliaonline._stages),
+    "bkjf": Pipeline(_bkjf, copy_bkjf._stages, headers=copy_bkjf.headers),
+    "aparecida": Pipeline(_aparecida, headers=copy_catolica_aparecida.headers),
+    "pastoral": Pipeline(_pastoral, headers=copy_catolica_pastoral.headers),
+    "comentarios": Pipeline(_comentarios, copy_comentarios._stages, headers=copy_comentarios.headers),
+    "tnm": Pipeline(_tnm, copy_tnm._stages, workers=copy_tnm.WORKERS),
+    "refs": Pipeline(_refs, workers=copy_refs.WORKERS),
+}
+
+
+@contextmanager
+def _scratch_dir() -> t.Iterator[Path]:
+    """The scripts write to ./json/..., run them from a throwaway directory"""
+    cwd = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="bench_scrapers_") as tmp:
+        os.chdir(tmp)
+        try:
+            with redirect_stdout(io.StringIO()):
+                yield Path(tmp)
+        finally:
+            os.chdir(cwd)
+
+
+async def _run_pipeline(pipeline: Pipeline, **engine_options) -> ScrapeMetrics:
+    with _scratch_dir() as tmp:
+        manifest = Manifest(tmp / "manifest.sqlite3", redo=True)
+        try:
+            async with FetchEngine(headers=pipeline.headers, workers=pipeline.workers, **engine_options) as engine:
+                jobs = [job for abbrev in SAMPLE_BOOKS for job in pipeline.book_jobs(engine, manifest, abbrev)]
+                if pipeline.stages:
+                    await run_chapters(engine, pipeline.stages(engine, manifest), jobs)
+                else:
+                    await engine.run(jobs)
+        finally:
+            manifest.close()
+
+    return engine.metrics
+
+
+def _serve(fixtures_dir: Path, faults: Faults, seed: int | None, ports: multiprocessing.Queue) -> None:
+    server = MockServer(mock_server.load_fixtures([fixtures_dir]), faults, seed)
+    asyncio.run(server.serve(mock_server.HOST, 0, started=ports.put))
+
+
+def _cpu_seconds() -> float:
+    """This process plus its finished children, i.e. scrape_pipeline's parse workers but not the running mock server"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def bench(name: str, fixtures_dir: Path, faults: Faults, seed: int | None) -> Result:
+    """Run one pipeline against a mock server on its own process, so its CPU isn't counted"""
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    server = context.Process(target=_serve, args=(fixtures_dir, faults, seed, ports), daemon=True)
+    server.start()
+    try:
+        url = f"http://{mock_server.HOST}:{ports.get(timeout=30)}"
+
+        start, cpu_start = time.perf_counter(), _cpu_seconds()
+        metrics = asyncio.run(_run_pipeline(PIPELINES[name], mock_server=url))
+        seconds, cpu = time.perf_counter() - start, _cpu_seconds() - cpu_start
+
+        stats: Stats = httpx.get(f"{url}/_stats").json()
+    finally:
+        server.terminate()
+        server.join()
+
+    if stats["missing"]:
+        raise RuntimeError(f"{stats['missing']} requests have no fixture, record {name} again")
+
+    chapters = sum(book_chapters(abbrev) for abbrev in SAMPLE_BOOKS)
+    return Result(
+        chapters=chapters,
+        requests=stats["requests"],
+        retries=metrics.retries,
+        seconds=round(seconds, 3),
+        chapters_per_s=round(chapters / seconds, 2),
+        cpu_ms_per_chapter=round(cpu / chapters * 1000, 2),
+    )
+
+
+def _regressions(results: dict[str, Result], baseline: dict[str, Result], tolerance: float) -> list[str]:
+    found: list[str] = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        base = baseline[name]
+        if result["chapters_per_s"] < base["chapters_per_s"] * (1 - tolerance):
+            found.append(f"{name}: {result['chapters_per_s']} chapters/s, baseline {base['chapters_per_s']}")
+        if result["cpu_ms_per_chapter"] > base["cpu_ms_per_chapter"] * (1 + tolerance):
+            found.append(f"{name}: {result['cpu_ms_per_chapter']} CPU ms/chapter, baseline {base['cpu_ms_per_chapter']}")
+        if result["retries"] > base["retries"] * (1 + tolerance) + 1:
+            found.append(f"{name}: {result['retries']} retries, baseline {base['retries']}")
+
+    return found
+
+
+def _record(names: list[str], fixtures_root: Path) -> None:
+    for name in names:
+        fixtures_dir = fixtures_root / name
+        print(f"Recording [yellow]{name}[/yellow] into {fixtures_dir}")
+        asyncio.run(_run_pipeline(PIPELINES[name], cache=ResponseCache(fixtures_dir)))
+        print(f"  {len(ResponseCache(fixtures_dir).keys())} responses")
+
+
+def _run(names: list[str], fixtures_root: Path, args: argparse.Namespace) -> None:
+    faults = mock_server.faults_from_args(args)
+    results: dict[str, Result] = {}
+    failed = False
+    for name in names:
+        fixtures_dir = fixtures_root / name
+        if not ResponseCache(fixtures_dir).keys():
+            print(f"[yellow]Skipping {name}, no fixtures in {fixtures_dir} (see `bench_scrapers.py record`)[/yellow]")
+            continue
+
+        try:
+            results[name] = bench(name, fixtures_dir, faults, args.seed)
+        except Exception as e:
+            print(f"[red]{name} failed:[/red] {e!r}")
+            failed = True
+
+    injected = ", ".join(f"{name}={value}" for name, value in faults._asdict().items() if value and name != "retry_after")
+    table = Table(title=f"{', '.join(SAMPLE_BOOKS)} from fixtures" + (f", {injected}" if injected else ""))
+    table.add_column("Pipeline")
+    table.add_column("Chapters", justify="right")
+    table.add_column("Requests", justify="right")
+    table.add_column("Retries", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Chapters/s", justify="right")
+    table.add_column("CPU ms/chapter", justify="right")
+    for name, result in results.items():
+        table.add_row(name, *(str(value) for value in result.values()))
+    Console().print(table)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+        print(f"Write [green]{args.save}[/green]")
+
+    if args.compare:
+        regressions = _regressions(results, json.loads(args.compare.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"[red]Regression[/red] {regression}")
+        failed |= bool(regressions)
+
+    sys.exit(1 if failed or not results else 0)
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--fixtures-dir", type=Path, default=FIXTURES_DIR)
+    common.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=list(PIPELINES))
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("record", parents=[common], help="Download the sample books from the real sites into the fixtures")
+
+    run = commands.add_parser("run", parents=[common], help="Benchmark every pipeline against the recorded fixtures")
+    run.add_argument("--save", type=Path, help="Write the results as a baseline for --compare")
+    run.add_argument("--compare", type=Path, help="Baseline written by --save")
+    run.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown before failing, 0.2 = 20%%")
+    mock_server.add_arguments(run)
+    args = parser.parse_args()
+
+    fixtures_root = args.fixtures_dir.resolve()
+    if args.command == "record":
+        _record(args.pipelines, fixtures_root)
+    else:
+        _run(args.pipelines, fixtures_root, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# Read side of the repo: book metadata (canon), verses (corpus), free text
+# references (references) and cross references (refs). Stdlib only, so it can
+# be installed without the scrapers' dependencies; the CLIs import rich lazily.
+#
+# Submodules load on first attribute access, `import biblia` costs nothing:
+#
+#   from biblia import Corpus, parse_references
+#   python -X importtime -c "from biblia import Corpus"
+
+import importlib
+import typing as t
+
+if t.TYPE_CHECKING:
+    from biblia.canon import BOOKS, Book, book_sort_key, ordinal
+    from biblia.corpus import Corpus, Verse
+    from biblia.references import Passage, parse_references, resolve_references
+    from biblia.refs import cited_by, refs
+
+
+_EXPORTS = {
+    "BOOKS": "canon",
+    "Book": "canon",
+    "book_sort_key": "canon",
+    "ordinal": "canon",
+    "Corpus": "corpus",
+    "Verse": "corpus",
+    "Passage": "references",
+    "parse_references": "references",
+    "resolve_references": "references",
+    "cited_by": "refs",
+    "refs": "refs",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'biblia' has no attribute {name!r}")
+
+    return getattr(importlib.import_module(f"biblia.{_EXPORTS[name]}"), name)
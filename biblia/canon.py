@@ -0,0 +1,544 @@
+# Registry of every book, its names in each source and the versification used
+# to number verses. Everything is computed at import, lookups are dict/array
+# indexing.
+
+from array import array
+from itertools import accumulate
+import typing as t
+from biblia.normalize import fold
+
+
+class Book(t.NamedTuple):
+    abbrev: str
+    """Directory name under json/, e.g. "gn", "jó" """
+    en: str | None
+    """English abbrev of abibliadigital.com.br, None for deuterocanonical books"""
+    name: str
+    """As in json/books.json"""
+    catholic_name: str
+    """Title used by the catholic versions, e.g. "Cântico dos Cânticos" for "Cânticos" """
+    testament: t.Literal["VT", "NT"]
+    group: str | None
+    author: str | None
+    chapters: int
+    catholic_chapters: int
+    """Daniel, Joel and Malachi are split differently in the catholic versions"""
+
+
+BOOKS: tuple[Book, ...] = (
+    Book("gn", "gn", "Gênesis", "Gênesis", "VT", "Pentateuco", "Moisés", 50, 50),
+    Book("ex", "ex", "Êxodo", "Êxodo", "VT", "Pentateuco", "Moisés", 40, 40),
+    Book("lv", "lv", "Levítico", "Levítico", "VT", "Pentateuco", "Moisés", 27, 27),
+    Book("nm", "nm", "Números", "Números", "VT", "Pentateuco", "Moisés", 36, 36),
+    Book("dt", "dt", "Deuteronômio", "Deuteronômio", "VT", "Pentateuco", "Moisés", 34, 34),
+    Book("js", "js", "Josué", "Josué", "VT", "Históricos", "Josué", 24, 24),
+    Book("jz", "jud", "Juízes", "Juízes", "VT", "Históricos", "Samuel", 21, 21),
+    Book("rt", "rt", "Rute", "Rute", "VT", "Históricos", "Samuel", 4, 4),
+    Book("1sm", "1sm", "1 Samuel", "1 Samuel", "VT", "Históricos", "Samuel", 31, 31),
+    Book("2sm", "2sm", "2 Samuel", "2 Samuel", "VT", "Históricos", "Samuel", 24, 24),
+    Book("1rs", "1kgs", "1 Reis", "1 Reis", "VT", "Históricos", "Jeremias", 22, 22),
+    Book("2rs", "2kgs", "2 Reis", "2 Reis", "VT", "Históricos", "Jeremias", 25, 25),
+    Book("1cr", "1ch", "1 Crônicas", "1 Crônicas", "VT", "Históricos", "Esdras", 29, 29),
+    Book("2cr", "2ch", "2 Crônicas", "2 Crônicas", "VT", "Históricos", "Esdras", 36, 36),
+    Book("ed", "ezr", "Esdras", "Esdras", "VT", "Históricos", "Esdras", 10, 10),
+    Book("ne", "ne", "Neemias", "Neemias", "VT", "Históricos", "Neemias", 13, 13),
+    Book("et", "et", "Ester", "Ester", "VT", "Históricos", "Desconhecido", 10, 10),
+    Book("jó", "job", "Jó", "Jó", "VT", "Poéticos", "Desconhecido", 42, 42),
+    Book("sl", "ps", "Salmos", "Salmos", "VT", "Poéticos", "David, Moisés, Salomão", 150, 150),
+    Book("pv", "prv", "Provérbios", "Provérbios", "VT", "Poéticos", "Salomão", 31, 31),
+    Book("ec", "ec", "Eclesiastes", "Eclesiastes", "VT", "Poéticos", "Salomão", 12, 12),
+    Book("ct", "so", "Cânticos", "Cântico dos Cânticos", "VT", "Poéticos", "Salomão", 8, 8),
+    Book("is", "is", "Isaías", "Isaías", "VT", "Profetas maiores", "Isaías", 66, 66),
+    Book("jr", "jr", "Jeremias", "Jeremias", "VT", "Profetas maiores", "Jeremias", 52, 52),
+    Book("lm", "lm", "Lamentações de Jeremias", "Lamentações", "VT", "Profetas maiores", "Jeremias", 5, 5),
+    Book("ez", "ez", "Ezequiel", "Ezequiel", "VT", "Profetas maiores", "Ezequiel", 48, 48),
+    Book("dn", "dn", "Daniel", "Daniel", "VT", "Profetas maiores", "Daniel", 12, 14),
+    Book("os", "ho", "Oséias", "Oseias", "VT", "Profetas menores", "Oséias", 14, 14),
+    Book("jl", "jl", "Joel", "Joel", "VT", "Profetas menores", "Joel", 3, 4),
+    Book("am", "am", "Amós", "Amós", "VT", "Profetas menores", "Amós", 9, 9),
+    Book("ob", "ob", "Obadias", "Obadias", "VT", "Profetas menores", "Obadias", 1, 1),
+    Book("jn", "jn", "Jonas", "Jonas", "VT", "Profetas menores", "Jonas", 4, 4),
+    Book("mq", "mi", "Miquéias", "Miquéias", "VT", "Profetas menores", "Miquéias", 7, 7),
+    Book("na", "na", "Naum", "Naum", "VT", "Profetas menores", "Naum", 3, 3),
+    Book("hc", "hk", "Habacuque", "Habacuque", "VT", "Profetas menores", "Habacuque", 3, 3),
+    Book("sf", "zp", "Sofonias", "Sofonias", "VT", "Profetas menores", "Sofonias", 3, 3),
+    Book("ag", "hg", "Ageu", "Ageu", "VT", "Profetas menores", "Ageu", 2, 2),
+    Book("zc", "zc", "Zacarias", "Zacarias", "VT", "Profetas menores", "Zacarias", 14, 14),
+    Book("ml", "ml", "Malaquias", "Malaquias", "VT", "Profetas menores", "Malaquias", 4, 3),
+    Book("mt", "mt", "Mateus", "Mateus", "NT", "Evangelhos", "Mateus", 28, 28),
+    Book("mc", "mk", "Marcos", "Marcos", "NT", "Evangelhos", "Marcos", 16, 16),
+    Book("lc", "lk", "Lucas", "Lucas", "NT", "Evangelhos", "Lucas", 24, 24),
+    Book("jo", "jo", "João", "João", "NT", "Evangelhos", "João", 21, 21),
+    Book("at", "act", "Atos", "Atos", "NT", "Histórico", "Lucas", 28, 28),
+    Book("rm", "rm", "Romanos", "Romanos", "NT", "Cartas", "Paulo", 16, 16),
+    Book("1co", "1co", "1 Coríntios", "1 Coríntios", "NT", "Cartas", "Paulo", 16, 16),
+    Book("2co", "2co", "2 Coríntios", "2 Coríntios", "NT", "Cartas", "Paulo", 13, 13),
+    Book("gl", "gl", "Gálatas", "Gálatas", "NT", "Cartas", "Paulo", 6, 6),
+    Book("ef", "eph", "Efésios", "Efésios", "NT", "Cartas", "Paulo", 6, 6),
+    Book("fp", "ph", "Filipenses", "Filipenses", "NT", "Cartas", "Paulo", 4, 4),
+    Book("cl", "cl", "Colossenses", "Colossenses", "NT", "Cartas", "Paulo", 4, 4),
+    Book("1ts", "1ts", "1 Tessalonicenses", "1 Tessalonicenses", "NT", "Cartas", "Paulo", 5, 5),
+    Book("2ts", "2ts", "2 Tessalonicenses", "2 Tessalonicenses", "NT", "Cartas", "Paulo", 3, 3),
+    Book("1tm", "1tm", "1 Timóteo", "1 Timóteo", "NT", "Cartas", "Paulo", 6, 6),
+    Book("2tm", "2tm", "2 Timóteo", "2 Timóteo", "NT", "Cartas", "Paulo", 4, 4),
+    Book("tt", "tt", "Tito", "Tito", "NT", "Cartas", "Paulo", 3, 3),
+    Book("fm", "phm", "Filemom", "Filemom", "NT", "Cartas", "Paulo", 1, 1),
+    Book("hb", "hb", "Hebreus", "Hebreus", "NT", "Cartas", "Desconhecido", 13, 13),
+    Book("tg", "jm", "Tiago", "Tiago", "NT", "Cartas", "Tiago", 5, 5),
+    Book("1pe", "1pe", "1 Pedro", "1 Pedro", "NT", "Cartas", "Pedro", 5, 5),
+    Book("2pe", "2pe", "2 Pedro", "2 Pedro", "NT", "Cartas", "Pedro", 3, 3),
+    Book("1jo", "1jo", "1 João", "1 João", "NT", "Cartas", "João", 5, 5),
+    Book("2jo", "2jo", "2 João", "2 João", "NT", "Cartas", "João", 1, 1),
+    Book("3jo", "3jo", "3 João", "3 João", "NT", "Cartas", "João", 1, 1),
+    Book("jd", "jd", "Judas", "Judas", "NT", "Cartas", "Judas", 1, 1),
+    Book("ap", "re", "Apocalipse", "Apocalipse", "NT", "Revelações", "João", 22, 22),
+    Book("tb", None, "Tobias", "Tobias", "VT", None, None, 14, 14),
+    Book("jt", None, "Judite", "Judite", "VT", None, None, 16, 16),
+    Book("1mc", None, "1 Macabeus", "1 Macabeus", "VT", None, None, 16, 16),
+    Book("2mc", None, "2 Macabeus", "2 Macabeus", "VT", None, None, 15, 15),
+    Book("sb", None, "Sabedoria", "Sabedoria", "VT", None, None, 19, 19),
+    Book("si", None, "Eclesiástico", "Eclesiástico", "VT", None, None, 51, 51),
+    Book("br", None, "Baruc", "Baruc", "VT", None, None, 6, 6),
+)
+"""Canonical (protestant) order, deuterocanonical books at the end"""
+
+ABBREVS = tuple(book.abbrev for book in BOOKS)
+BOOK_INDEX = {abbrev: idx for idx, abbrev in enumerate(ABBREVS)}
+PROTESTANT_BOOKS = BOOKS[:66]
+
+A12_SLUGS: dict[str, str] = {
+    "genesis": "gn",
+    "exodo": "ex",
+    "levitico": "lv",
+    "numeros": "nm",
+    "deuteronomio": "dt",
+    "josue": "js",
+    "juizes": "jz",
+    "rute": "rt",
+    "i-samuel": "1sm",
+    "ii-samuel": "2sm",
+    "i-reis": "1rs",
+    "ii-reis": "2rs",
+    "i-cronicas": "1cr",
+    "ii-cronicas": "2cr",
+    "esdras": "ed",
+    "neemias": "ne",
+    "tobias": "tb",
+    "judite": "jt",
+    "ester": "et",
+    "i-macabeus": "1mc",
+    "ii-macabeus": "2mc",
+    "jo": "jó",
+    "salmos": "sl",
+    "proverbios": "pv",
+    "eclesiastes": "ec",
+    "cantico-dos-canticos": "ct",
+    "sabedoria": "sb",
+    "eclesiastico": "si",
+    "isaias": "is",
+    "jeremias": "jr",
+    "lamentacoes": "lm",
+    "baruc": "br",
+    "ezequiel": "ez",
+    "daniel": "dn",
+    "oseias": "os",
+    "joel": "jl",
+    "amos": "am",
+    "abdias": "ob",
+    "jonas": "jn",
+    "miqueias": "mq",
+    "naum": "na",
+    "habacuc": "hc",
+    "sofonias": "sf",
+    "ageu": "ag",
+    "zacarias": "zc",
+    "malaquias": "ml",
+    # NT
+    "sao-mateus": "mt",
+    "sao-marcos": "mc",
+    "sao-lucas": "lc",
+    "sao-joao": "jo",
+    "atos-dos-apostolos": "at",
+    "romanos": "rm",
+    "i-corintios": "1co",
+    "ii-corintios": "2co",
+    "galatas": "gl",
+    "efesios": "ef",
+    "filipenses": "fp",
+    "colossenses": "cl",
+    "i-tessalonicenses": "1ts",
+    "ii-tessalonicenses": "2ts",
+    "i-timoteo": "1tm",
+    "ii-timoteo": "2tm",
+    "tito": "tt",
+    "filemon": "fm",
+    "hebreus": "hb",
+    "sao-tiago": "tg",
+    "i-sao-pedro": "1pe",
+    "ii-sao-pedro": "2pe",
+    "i-sao-joao": "1jo",
+    "ii-sao-joao": "2jo",
+    "iii-sao-joao": "3jo",
+    "sao-judas": "jd",
+    "apocalipse": "ap",
+}
+"""Book slugs of a12.com (biblia-aparecida) and bibliacatolica.com.br (ave-maria), in catholic order"""
+
+PAULUS_SLUGS: dict[str, str] = {
+    "genesis": "gn",
+    "exodo": "ex",
+    "levitico": "lv",
+    "numeros": "nm",
+    "deuteronomio": "dt",
+    "livro-de-josue": "js",
+    "livro-dos-juizes": "jz",
+    "rute": "rt",
+    "primeiro-livro-de-samuel": "1sm",
+    "segundo-livro-de-samuel": "2sm",
+    "primeiro-livro-dos-reis": "1rs",
+    "segundo-livro-dos-reis": "2rs",
+    "primeiro-livro-das-cronicas": "1cr",
+    "segundo-livro-das-cronicas": "2cr",
+    "esdras": "ed",
+    "neemias": "ne",
+    "tobias": "tb",
+    "judite": "jt",
+    "ester": "et",
+    "primeiro-livro-dos-macabeus": "1mc",
+    "segundo-livro-dos-macabeus": "2mc",
+    "jo": "jó",
+    "salmos": "sl",
+    "proverbios": "pv",
+    "eclesiastes": "ec",
+    "cantico-dos-canticos": "ct",
+    "sabedoria": "sb",
+    "eclesiastico": "si",
+    "isaias": "is",
+    "jeremias": "jr",
+    "lamentacoes": "lm",
+    "baruc": "br",
+    "ezequiel": "ez",
+    "daniel": "dn",
+    "oseias": "os",
+    "joel": "jl",
+    "amos": "am",
+    "abdias": "ob",
+    "jonas": "jn",
+    "miqueias": "mq",
+    "naum": "na",
+    "habacuc": "hc",
+    "sofonias": "sf",
+    "ageu": "ag",
+    "zacarias": "zc",
+    "malaquias": "ml",
+    # NT
+    "evangelho-segundo-sao-mateus": "mt",
+    "evangelho-segundo-sao-marcos": "mc",
+    "evangelho-segundo-sao-lucas": "lc",
+    "evangelho-segundo-sao-joao": "jo",
+    "atos-dos-apostolos": "at",
+    "carta-aos-romanos": "rm",
+    "primeira-carta-aos-corintios": "1co",
+    "segunda-carta-aos-corintios": "2co",
+    "carta-aos-galatas": "gl",
+    "carta-aos-efesios": "ef",
+    "carta-aos-filipenses": "fp",
+    "carta-aos-colossenses": "cl",
+    "primeira-carta-aos-tessalonicenses": "1ts",
+    "segunda-carta-aos-tessalonicenses": "2ts",
+    "primeira-carta-a-timoteo": "1tm",
+    "segunda-carta-a-timoteo": "2tm",
+    "carta-a-tito": "tt",
+    "carta-a-filemon": "fm",
+    "carta-aos-hebreus": "hb",
+    "carta-de-sao-tiago": "tg",
+    "primeira-carta-de-sao-pedro": "1pe",
+    "segunda-carta-de-sao-pedro": "2pe",
+    "primeira-carta-de-sao-joao": "1jo",
+    "segunda-carta-de-sao-joao": "2jo",
+    "terceira-carta-de-sao-joao": "3jo",
+    "carta-de-sao-judas": "jd",
+    "apocalipse-de-sao-joao": "ap",
+}
+"""Book slugs of paulus.com.br (biblia-pastoral), in catholic order"""
+
+BIBLIATODO_SLUGS: dict[str, str] = {
+    "genesis": "gn",
+    "exodo": "ex",
+    "levitico": "lv",
+    "numeros": "nm",
+    "deuteronomio": "dt",
+    "josue": "js",
+    "juizes": "jz",
+    "rute": "rt",
+    "1samuel": "1sm",
+    "2samuel": "2sm",
+    "1reis": "1rs",
+    "2reis": "2rs",
+    "1cronicas": "1cr",
+    "2cronicas": "2cr",
+    "esdras": "ed",
+    "neemias": "ne",
+    "ester": "et",
+    "jó": "jó",
+    "salmos": "sl",
+    "proverbios": "pv",
+    "eclesiastes": "ec",
+    "canticos": "ct",
+    "isaias": "is",
+    "jeremias": "jr",
+    "lamentacoes": "lm",
+    "ezequiel": "ez",
+    "daniel": "dn",
+    "oseias": "os",
+    "joel": "jl",
+    "amos": "am",
+    "obadias": "ob",
+    "jonas": "jn",
+    "miqueias": "mq",
+    "naum": "na",
+    "habacuque": "hc",
+    "sofonias": "sf",
+    "ageu": "ag",
+    "zacarias": "zc",
+    "malaquias": "ml",
+    "mateus": "mt",
+    "marcos": "mc",
+    "lucas": "lc",
+    "joao": "jo",
+    "atos": "at",
+    "romanos": "rm",
+    "1corintios": "1co",
+    "2corintios": "2co",
+    "galatas": "gl",
+    "efesios": "ef",
+    "filipenses": "fp",
+    "colossenses": "cl",
+    "1tessalonicenses": "1ts",
+    "2tessalonicenses": "2ts",
+    "1timoteo": "1tm",
+    "2timoteo": "2tm",
+    "tito": "tt",
+    "filemom": "fm",
+    "hebreus": "hb",
+    "tiago": "tg",
+    "1pedro": "1pe",
+    "2pedro": "2pe",
+    "1joao": "1jo",
+    "2joao": "2jo",
+    "3joao": "3jo",
+    "judas": "jd",
+    "apocalipse": "ap",
+}
+"""Book slugs of bibliatodo.com (comments)"""
+
+Scheme = t.Literal["canon", "api", "api-en", "bibliaonline", "a12", "paulus", "bibliatodo"]
+
+SCHEMES: dict[Scheme, dict[str, str]] = {
+    "canon": {abbrev: abbrev for abbrev in ABBREVS},
+    "api": {("job" if book.abbrev == "jó" else book.abbrev): book.abbrev for book in PROTESTANT_BOOKS},
+    "api-en": {book.en: book.abbrev for book in PROTESTANT_BOOKS if book.en},
+    "bibliaonline": {("atos" if book.abbrev == "at" else book.abbrev): book.abbrev for book in PROTESTANT_BOOKS},
+    "a12": A12_SLUGS,
+    "paulus": PAULUS_SLUGS,
+    "bibliatodo": BIBLIATODO_SLUGS,
+}
+"""Slug -> abbrev for every naming scheme in use"""
+
+CATHOLIC_SCHEMES = {"a12", "paulus"}
+CHAPTER_OVERRIDES: dict[Scheme, dict[str, int]] = {
+    "bibliatodo": {"ml": 3},
+}
+
+_SLUGS: dict[Scheme, dict[str, str]] = {
+    scheme: {abbrev: slug for slug, abbrev in slugs.items()} for scheme, slugs in SCHEMES.items()
+}
+
+ALIASES: dict[str, str] = {}
+"""Any known spelling -> abbrev, used by `resolve`. The canonical abbrevs win on
+conflicts, e.g. "jo" is João even though a12 uses it for Jó"""
+for _scheme in SCHEMES.values():
+    for _slug, _abbrev in _scheme.items():
+        ALIASES.setdefault(fold(_slug), _abbrev)
+for _book in BOOKS:
+    ALIASES.setdefault(fold(_book.name), _book.abbrev)
+    ALIASES.setdefault(fold(_book.catholic_name), _book.abbrev)
+ALIASES |= {abbrev: abbrev for abbrev in ABBREVS}
+
+CHAPTER_VERSE_MAP = {
+    "gn": {1: 31, 2: 25, 3: 24, 4: 26, 5: 32, 6: 22, 7: 24, 8: 22, 9: 29, 10: 32, 11: 32, 12: 20, 13: 18, 14: 24, 15: 21, 16: 16, 17: 27, 18: 33, 19: 38, 20: 18, 21: 34, 22: 24, 23: 20, 24: 67, 25: 34, 26: 35, 27: 46, 28: 22, 29: 35, 30: 43, 31: 55, 32: 32, 33: 20, 34: 31, 35: 29, 36: 43, 37: 36, 38: 30, 39: 23, 40: 23, 41: 57, 42: 38, 43: 34, 44: 34, 45: 28, 46: 34, 47: 31, 48: 22, 49: 33, 50: 26},
+    "ex": {1: 22, 2: 25, 3: 22, 4: 31, 5: 23, 6: 30, 7: 25, 8: 32, 9: 35, 10: 29, 11: 10, 12: 51, 13: 22, 14: 31, 15: 27, 16: 36, 17: 16, 18: 27, 19: 25, 20: 26, 21: 36, 22: 31, 23: 33, 24: 18, 25: 40, 26: 37, 27: 21, 28: 43, 29: 46, 30: 38, 31: 18, 32: 35, 33: 23, 34: 35, 35: 35, 36: 38, 37: 29, 38: 31, 39: 43, 40: 38},
+    "lv": {1: 17, 2: 16, 3: 17, 4: 35, 5: 19, 6: 30, 7: 38, 8: 36, 9: 24, 10: 20, 11: 47, 12: 8, 13: 59, 14: 57, 15: 33, 16: 34, 17: 16, 18: 30, 19: 37, 20: 27, 21: 24, 22: 33, 23: 44, 24: 23, 25: 55, 26: 46, 27: 34},
+    "nm": {1: 54, 2: 34, 3: 51, 4: 49, 5: 31, 6: 27, 7: 89, 8: 26, 9: 23, 10: 36, 11: 35, 12: 16, 13: 33, 14: 45, 15: 41, 16: 50, 17: 13, 18: 32, 19: 22, 20: 29, 21: 35, 22: 41, 23: 30, 24: 25, 25: 18, 26: 65, 27: 23, 28: 31, 29: 40, 30: 16, 31: 54, 32: 42, 33: 56, 34: 29, 35: 34, 36: 13},
+    "dt": {1: 46, 2: 37, 3: 29, 4: 49, 5: 33, 6: 25, 7: 26, 8: 20, 9: 29, 10: 22, 11: 32, 12: 32, 13: 18, 14: 29, 15: 23, 16: 22, 17: 20, 18: 22, 19: 21, 20: 20, 21: 23, 22: 30, 23: 25, 24: 22, 25: 19, 26: 19, 27: 26, 28: 68, 29: 29, 30: 20, 31: 30, 32: 52, 33: 29, 34: 12},
+    "js": {1: 18, 2: 24, 3: 17, 4: 24, 5: 15, 6: 27, 7: 26, 8: 35, 9: 27, 10: 43, 11: 23, 12: 24, 13: 33, 14: 15, 15: 63, 16: 10, 17: 18, 18: 28, 19: 51, 20: 9, 21: 45, 22: 34, 23: 16, 24: 33},
+    "jz": {1: 36, 2: 23, 3: 31, 4: 24, 5: 31, 6: 40, 7: 25, 8: 35, 9: 57, 10: 18, 11: 40, 12: 15, 13: 25, 14: 20, 15: 20, 16: 31, 17: 13, 18: 31, 19: 30, 20: 48, 21: 25},
+    "rt": {1: 22, 2: 23, 3: 18, 4: 22},
+    "1sm": {1: 28, 2: 36, 3: 21, 4: 22, 5: 12, 6: 21, 7: 17, 8: 22, 9: 27, 10: 27, 11: 15, 12: 25, 13: 23, 14: 52, 15: 35, 16: 23, 17: 58, 18: 30, 19: 24, 20: 42, 21: 15, 22: 23, 23: 29, 24: 22, 25: 44, 26: 25, 27: 12, 28: 25, 29: 11, 30: 31, 31: 13},
+    "2sm": {1: 27, 2: 32, 3: 39, 4: 12, 5: 25, 6: 23, 7: 29, 8: 18, 9: 13, 10: 19, 11: 27, 12: 31, 13: 39, 14: 33, 15: 37, 16: 23, 17: 29, 18: 33, 19: 43, 20: 26, 21: 22, 22: 51, 23: 39, 24: 25},
+    "1rs": {1: 53, 2: 46, 3: 28, 4: 34, 5: 18, 6: 38, 7: 51, 8: 66, 9: 28, 10: 29, 11: 43, 12: 33, 13: 34, 14: 31, 15: 34, 16: 34, 17: 24, 18: 46, 19: 21, 20: 43, 21: 29, 22: 53},
+    "2rs": {1: 18, 2: 25, 3: 27, 4: 44, 5: 27, 6: 33, 7: 20, 8: 29, 9: 37, 10: 36, 11: 21, 12: 21, 13: 25, 14: 29, 15: 38, 16: 20, 17: 41, 18: 37, 19: 37, 20: 21, 21: 26, 22: 20, 23: 37, 24: 20, 25: 30},
+    "1cr": {1: 54, 2: 55, 3: 24, 4: 43, 5: 26, 6: 81, 7: 40, 8: 40, 9: 44, 10: 14, 11: 47, 12: 40, 13: 14, 14: 17, 15: 29, 16: 43, 17: 27, 18: 17, 19: 19, 20: 8, 21: 30, 22: 19, 23: 32, 24: 31, 25: 31, 26: 32, 27: 34, 28: 21, 29: 30},
+    "2cr": {1: 17, 2: 18, 3: 17, 4: 22, 5: 14, 6: 42, 7: 22, 8: 18, 9: 31, 10: 19, 11: 23, 12: 16, 13: 22, 14: 15, 15: 19, 16: 14, 17: 19, 18: 34, 19: 11, 20: 37, 21: 20, 22: 12, 23: 21, 24: 27, 25: 28, 26: 23, 27: 9, 28: 27, 29: 36, 30: 27, 31: 21, 32: 33, 33: 25, 34: 33, 35: 27, 36: 23},
+    "ed": {1: 11, 2: 70, 3: 13, 4: 24, 5: 17, 6: 22, 7: 28, 8: 36, 9: 15, 10: 44},
+    "ne": {1: 11, 2: 20, 3: 32, 4: 23, 5: 19, 6: 19, 7: 73, 8: 18, 9: 38, 10: 39, 11: 36, 12: 47, 13: 31},
+    "et": {1: 22, 2: 23, 3: 15, 4: 17, 5: 14, 6: 14, 7: 10, 8: 17, 9: 32, 10: 3},
+    "jó": {1: 22, 2: 13, 3: 26, 4: 21, 5: 27, 6: 30, 7: 21, 8: 22, 9: 35, 10: 22, 11: 20, 12: 25, 13: 28, 14: 22, 15: 35, 16: 22, 17: 16, 18: 21, 19: 29, 20: 29, 21: 34, 22: 30, 23: 17, 24: 25, 25: 6, 26: 14, 27: 23, 28: 28, 29: 25, 30: 31, 31: 40, 32: 22, 33: 33, 34: 37, 35: 16, 36: 33, 37: 24, 38: 41, 39: 30, 40: 24, 41: 34, 42: 17},
+    "sl": {1: 6, 2: 12, 3: 8, 4: 8, 5: 12, 6: 10, 7: 17, 8: 9, 9: 20, 10: 18, 11: 7, 12: 8, 13: 6, 14: 7, 15: 5, 16: 11, 17: 15, 18: 50, 19: 14, 20: 9, 21: 13, 22: 31, 23: 6, 24: 10, 25: 22, 26: 12, 27: 14, 28: 9, 29: 11, 30: 12, 31: 24, 32: 11, 33: 22, 34: 22, 35: 28, 36: 12, 37: 40, 38: 22, 39: 13, 40: 17, 41: 13, 42: 11, 43: 5, 44: 26, 45: 17, 46: 11, 47: 9, 48: 14, 49: 20, 50: 23, 51: 19, 52: 9, 53: 6, 54: 7, 55: 23, 56: 13, 57: 11, 58: 11, 59: 17, 60: 12, 61: 8, 62: 12, 63: 11, 64: 10, 65: 13, 66: 20, 67: 7, 68: 35, 69: 36, 70: 5, 71: 24, 72: 20, 73: 28, 74: 23, 75: 10, 76: 12, 77: 20, 78: 72, 79: 13, 80: 19, 81: 16, 82: 8, 83: 18, 84: 12, 85: 13, 86: 17, 87: 7, 88: 18, 89: 52, 90: 17, 91: 16, 92: 15, 93: 5, 94: 23, 95: 11, 96: 13, 97: 12, 98: 9, 99: 9, 100: 5, 101: 8, 102: 28, 103: 22, 104: 35, 105: 45, 106: 48, 107: 43, 108: 13, 109: 31, 110: 7, 111: 10, 112: 10, 113: 9, 114: 8, 115: 18, 116: 19, 117: 2, 118: 29, 119: 176, 120: 7, 121: 8, 122: 9, 123: 4, 124: 8, 125: 5, 126: 6, 127: 5, 128: 6, 129: 8, 130: 8, 131: 3, 132: 18, 133: 3, 134: 3, 135: 21, 136: 26, 137: 9, 138: 8, 139: 24, 140: 13, 141: 10, 142: 7, 143: 12, 144: 15, 145: 21, 146: 10, 147: 20, 148: 14, 149: 9, 150: 6},
+    "pv": {1: 33, 2: 22, 3: 35, 4: 27, 5: 23, 6: 35, 7: 27, 8: 36, 9: 18, 10: 32, 11: 31, 12: 28, 13: 25, 14: 35, 15: 33, 16: 33, 17: 28, 18: 24, 19: 29, 20: 30, 21: 31, 22: 29, 23: 35, 24: 34, 25: 28, 26: 28, 27: 27, 28: 28, 29: 27, 30: 33, 31: 31},
+    "ec": {1: 18, 2: 26, 3: 22, 4: 16, 5: 20, 6: 12, 7: 29, 8: 17, 9: 18, 10: 20, 11: 10, 12: 14},
+    "ct": {1: 17, 2: 17, 3: 11, 4: 16, 5: 16, 6: 13, 7: 13, 8: 14},
+    "is": {1: 31, 2: 22, 3: 26, 4: 6, 5: 30, 6: 13, 7: 25, 8: 22, 9: 21, 10: 34, 11: 16, 12: 6, 13: 22, 14: 32, 15: 9, 16: 14, 17: 14, 18: 7, 19: 25, 20: 6, 21: 17, 22: 25, 23: 18, 24: 23, 25: 12, 26: 21, 27: 13, 28: 29, 29: 24, 30: 33, 31: 9, 32: 20, 33: 24, 34: 17, 35: 10, 36: 22, 37: 38, 38: 22, 39: 8, 40: 31, 41: 29, 42: 25, 43: 28, 44: 28, 45: 25, 46: 13, 47: 15, 48: 22, 49: 26, 50: 11, 51: 23, 52: 15, 53: 12, 54: 17, 55: 13, 56: 12, 57: 21, 58: 14, 59: 21, 60: 22, 61: 11, 62: 12, 63: 19, 64: 12, 65: 25, 66: 24},
+    "jr": {1: 19, 2: 37, 3: 25, 4: 31, 5: 31, 6: 30, 7: 34, 8: 22, 9: 26, 10: 25, 11: 23, 12: 17, 13: 27, 14: 22, 15: 21, 16: 21, 17: 27, 18: 23, 19: 15, 20: 18, 21: 14, 22: 30, 23: 40, 24: 10, 25: 38, 26: 24, 27: 22, 28: 17, 29: 32, 30: 24, 31: 40, 32: 44, 33: 26, 34: 22, 35: 19, 36: 32, 37: 21, 38: 28, 39: 18, 40: 16, 41: 18, 42: 22, 43: 13, 44: 30, 45: 5, 46: 28, 47: 7, 48: 47, 49: 39, 50: 46, 51: 64, 52: 34},
+    "lm": {1: 22, 2: 22, 3: 66, 4: 22, 5: 22},
+    "ez": {1: 28, 2: 10, 3: 27, 4: 17, 5: 17, 6: 14, 7: 27, 8: 18, 9: 11, 10: 22, 11: 25, 12: 28, 13: 23, 14: 23, 15: 8, 16: 63, 17: 24, 18: 32, 19: 14, 20: 49, 21: 32, 22: 31, 23: 49, 24: 27, 25: 17, 26: 21, 27: 36, 28: 26, 29: 21, 30: 26, 31: 18, 32: 32, 33: 33, 34: 31, 35: 15, 36: 38, 37: 28, 38: 23, 39: 29, 40: 49, 41: 26, 42: 20, 43: 27, 44: 31, 45: 25, 46: 24, 47: 23, 48: 35},
+    "dn": {1: 21, 2: 49, 3: 30, 4: 37, 5: 31, 6: 28, 7: 28, 8: 27, 9: 27, 10: 21, 11: 45, 12: 13},
+    "os": {1: 11, 2: 23, 3: 5, 4: 19, 5: 15, 6: 11, 7: 16, 8: 14, 9: 17, 10: 15, 11: 12, 12: 14, 13: 16, 14: 9},
+    "jl": {1: 20, 2: 32, 3: 21},
+    "am": {1: 15, 2: 16, 3: 15, 4: 13, 5: 27, 6: 14, 7: 17, 8: 14, 9: 15},
+    "ob": {1: 21},
+    "jn": {1: 17, 2: 10, 3: 10, 4: 11},
+    "mq": {1: 16, 2: 13, 3: 12, 4: 13, 5: 15, 6: 16, 7: 20},
+    "na": {1: 15, 2: 13, 3: 19},
+    "hc": {1: 17, 2: 20, 3: 19},
+    "sf": {1: 18, 2: 15, 3: 20},
+    "ag": {1: 15, 2: 23},
+    "zc": {1: 21, 2: 13, 3: 10, 4: 14, 5: 11, 6: 15, 7: 14, 8: 23, 9: 17, 10: 12, 11: 17, 12: 14, 13: 9, 14: 21},
+    "ml": {1: 14, 2: 17, 3: 18, 4: 6},
+    "mt": {1: 25, 2: 23, 3: 17, 4: 25, 5: 48, 6: 34, 7: 29, 8: 34, 9: 38, 10: 42, 11: 30, 12: 50, 13: 58, 14: 36, 15: 39, 16: 28, 17: 27, 18: 35, 19: 30, 20: 34, 21: 46, 22: 46, 23: 39, 24: 51, 25: 46, 26: 75, 27: 66, 28: 20},
+    "mc": {1: 45, 2: 28, 3: 35, 4: 41, 5: 43, 6: 56, 7: 37, 8: 38, 9: 50, 10: 52, 11: 33, 12: 44, 13: 37, 14: 72, 15: 47, 16: 20},
+    "lc": {1: 80, 2: 52, 3: 38, 4: 44, 5: 39, 6: 49, 7: 50, 8: 56, 9: 62, 10: 42, 11: 54, 12: 59, 13: 35, 14: 35, 15: 32, 16: 31, 17: 37, 18: 43, 19: 48, 20: 47, 21: 38, 22: 71, 23: 56, 24: 53},
+    "jo": {1: 51, 2: 25, 3: 36, 4: 54, 5: 47, 6: 71, 7: 53, 8: 59, 9: 41, 10: 42, 11: 57, 12: 50, 13: 38, 14: 31, 15: 27, 16: 33, 17: 26, 18: 40, 19: 42, 20: 31, 21: 25},
+    "at": {1: 26, 2: 47, 3: 26, 4: 37, 5: 42, 6: 15, 7: 60, 8: 40, 9: 43, 10: 48, 11: 30, 12: 25, 13: 52, 14: 28, 15: 41, 16: 40, 17: 34, 18: 28, 19: 41, 20: 38, 21: 40, 22: 30, 23: 35, 24: 27, 25: 27, 26: 32, 27: 44, 28: 31},
+    "rm": {1: 32, 2: 29, 3: 31, 4: 25, 5: 21, 6: 23, 7: 25, 8: 39, 9: 33, 10: 21, 11: 36, 12: 21, 13: 14, 14: 23, 15: 33, 16: 27},
+    "1co": {1: 31, 2: 16, 3: 23, 4: 21, 5: 13, 6: 20, 7: 40, 8: 13, 9: 27, 10: 33, 11: 34, 12: 31, 13: 13, 14: 40, 15: 58, 16: 24},
+    "2co": {1: 24, 2: 17, 3: 18, 4: 18, 5: 21, 6: 18, 7: 16, 8: 24, 9: 15, 10: 18, 11: 33, 12: 21, 13: 14},
+    "gl": {1: 24, 2: 21, 3: 29, 4: 31, 5: 26, 6: 18},
+    "ef": {1: 23, 2: 22, 3: 21, 4: 32, 5: 33, 6: 24},
+    "fp": {1: 30, 2: 30, 3: 21, 4: 23},
+    "cl": {1: 29, 2: 23, 3: 25, 4: 18},
+    "1ts": {1: 10, 2: 20, 3: 13, 4: 18, 5: 28},
+    "2ts": {1: 12, 2: 17, 3: 18},
+    "1tm": {1: 20, 2: 15, 3: 16, 4: 16, 5: 25, 6: 21},
+    "2tm": {1: 18, 2: 26, 3: 17, 4: 22},
+    "tt": {1: 16, 2: 15, 3: 15},
+    "fm": {1: 25},
+    "hb": {1: 14, 2: 18, 3: 19, 4: 16, 5: 14, 6: 20, 7: 28, 8: 13, 9: 28, 10: 39, 11: 40, 12: 29, 13: 25},
+    "tg": {1: 27, 2: 26, 3: 18, 4: 17, 5: 20},
+    "1pe": {1: 25, 2: 25, 3: 22, 4: 19, 5: 14},
+    "2pe": {1: 21, 2: 22, 3: 18},
+    "1jo": {1: 10, 2: 29, 3: 24, 4: 21, 5: 21},
+    "2jo": {1: 13},
+    "3jo": {1: 15},
+    "jd": {1: 25},
+    "ap": {1: 20, 2: 29, 3: 22, 4: 11, 5: 14, 6: 17, 7: 17, 8: 13, 9: 21, 10: 11, 11: 19, 12: 17, 13: 18, 14: 20, 15: 8, 16: 21, 17: 18, 18: 24, 19: 21, 20: 15, 21: 27, 22: 21}
+}
+"""Verses per chapter of the 66 books (as numbered by biblia.com.br / ARA)"""
+
+VERSE_COUNT = 0
+"""Verses with an ordinal, i.e. the 66 books of CHAPTER_VERSE_MAP"""
+CHAPTER_BASE = array("i", [-1] * len(BOOKS))
+"""Book index -> first slot in the per chapter arrays, -1 without versification"""
+CHAPTER_START = array("i")
+"""Chapter slot -> ordinal of its first verse"""
+CHAPTER_SIZE = array("i")
+SLOT_BOOK = array("i")
+SLOT_CHAPTER = array("i")
+ORDINAL_SLOT = array("i")
+"""Ordinal -> chapter slot, so decoding is two array reads"""
+
+# Whole books and repeated runs at once, this runs on every import
+for _abbrev, _chapters in CHAPTER_VERSE_MAP.items():
+    CHAPTER_BASE[BOOK_INDEX[_abbrev]] = len(CHAPTER_SIZE)
+    CHAPTER_SIZE.extend(_chapters.values())
+    SLOT_BOOK.extend(array("i", [BOOK_INDEX[_abbrev]]) * len(_chapters))
+    SLOT_CHAPTER.extend(_chapters)
+CHAPTER_START.extend(accumulate(CHAPTER_SIZE[:-1], initial=0))
+for _slot, _verses in enumerate(CHAPTER_SIZE):
+    ORDINAL_SLOT.extend(array("i", [_slot]) * _verses)
+VERSE_COUNT = sum(CHAPTER_SIZE)
+
+
+def book(name: str, scheme: Scheme = "canon") -> Book:
+    return BOOKS[BOOK_INDEX[from_scheme(name, scheme)]]
+
+
+def from_scheme(slug: str, scheme: Scheme) -> str:
+    """e.g. ("sao-mateus", "a12") -> "mt", ("job", "api") -> "jó" """
+    return SCHEMES[scheme][slug]
+
+
+def to_scheme(abbrev: str, scheme: Scheme) -> str:
+    """e.g. ("mt", "a12") -> "sao-mateus", ("at", "bibliaonline") -> "atos" """
+    return _SLUGS[scheme][abbrev]
+
+
+def scheme_books(scheme: Scheme) -> list[tuple[str, Book]]:
+    """(slug, book) of every book a source has, in the order the source lists them"""
+    return [(slug, BOOKS[BOOK_INDEX[abbrev]]) for slug, abbrev in SCHEMES[scheme].items()]
+
+
+def resolve(name: str) -> str:
+    """Abbrev for any spelling in use, e.g. "Gênesis", "i-samuel", "job", "atos" """
+    if name in BOOK_INDEX:
+        return name
+
+    return ALIASES[fold(name).strip()]
+
+
+def book_chapters(abbrev: str, scheme: Scheme = "canon") -> int:
+    if abbrev in CHAPTER_OVERRIDES.get(scheme, {}):
+        return CHAPTER_OVERRIDES[scheme][abbrev]
+
+    entry = BOOKS[BOOK_INDEX[abbrev]]
+    return entry.catholic_chapters if scheme in CATHOLIC_SCHEMES else entry.chapters
+
+
+def book_sort_key(abbrev: str) -> tuple[int, str]:
+    """Canonical order first, anything unknown (e.g. apocrifos) at the end by name"""
+    return BOOK_INDEX.get(abbrev, len(BOOKS)), abbrev
+
+
+def verse_id(book: str, chapter: int, verse: int, part: int = 0) -> int:
+    """Pack a verse in a single int that sorts in canonical order.
+
+    `part` is the letter suffix some versions use ("37a" -> 1), 0 otherwise.
+    Unlike `ordinal` it works for any book and verse number, including verse 0.
+    """
+    return (((BOOK_INDEX[book] << 8 | chapter) << 8 | verse) << 5) | part
+
+
+def split_verse_id(vid: int) -> tuple[str, int, int, int]:
+    return ABBREVS[vid >> 21], (vid >> 13) & 0xFF, (vid >> 5) & 0xFF, vid & 0x1F
+
+
+def format_verse_id(vid: int) -> str:
+    """e.g. "jo3:16", "sl119:37a" """
+    book, chapter, verse, part = split_verse_id(vid)
+    return f"{book}{chapter}:{verse}{chr(ord('a') + part - 1) if part else ''}"
+
+
+def chapter_slot(book: str, chapter: int, scheme: Scheme = "canon") -> int:
+    idx = BOOK_INDEX[from_scheme(book, scheme)]
+    base = CHAPTER_BASE[idx]
+    if base < 0 or not 1 <= chapter <= BOOKS[idx].chapters:
+        raise KeyError(f"{book}{chapter}")
+
+    return base + chapter - 1
+
+
+def ordinal(book: str, chapter: int, verse: int, scheme: Scheme = "canon") -> int:
+    """Dense position of the verse in the canon, 0 for gn1:1 and VERSE_COUNT - 1 for ap22:21"""
+    slot = chapter_slot(book, chapter, scheme)
+    if not 1 <= verse <= CHAPTER_SIZE[slot]:
+        raise KeyError(f"{book}{chapter}:{verse}")
+
+    return CHAPTER_START[slot] + verse - 1
+
+
+def from_ordinal(value: int, scheme: Scheme = "canon") -> tuple[str, int, int]:
+    if not 0 <= value < VERSE_COUNT:
+        raise KeyError(value)
+
+    slot = ORDINAL_SLOT[value]
+    return to_scheme(ABBREVS[SLOT_BOOK[slot]], scheme), SLOT_CHAPTER[slot], value - CHAPTER_START[slot] + 1
@@ -0,0 +1,174 @@
+# Read verses from the json/ tree without knowing its layout:
+#
+#   from biblia import Corpus
+#
+#   corpus = Corpus()
+#   corpus.chapter("ara", "jo", 3)            # (Verse, ...) of jo3
+#   corpus.verse("acf", "jo", 3, 16).text
+#   corpus.lookup("nvi", "jo 3:16-18; rm 8")  # see references.parse_references
+#
+# Versions are discovered on first use and a chapter file is only decoded the
+# first time it is read, then kept in a bounded LRU cache, so opening a Corpus
+# is instant and memory follows the chapters actually in use.
+
+from collections import OrderedDict
+import json
+from pathlib import Path
+import re
+import typing as t
+from biblia.canon import book_sort_key
+
+
+JSON_DIR = Path("./json/")
+NON_VERSION_DIRS = {"apocrifos", "comments", "refs", "refs-reverse"}
+"""Top level json/ directories that aren't bibles, apocrifos are books without a version"""
+MAX_DEPTH = 3
+"""json/catolicos/pt-br/<version> is the deepest version"""
+CACHE_SIZE = 256
+"""Decoded chapters kept in memory"""
+
+VERSE_KEY_PATTERN = re.compile(r"^(\d+)([a-z]?)$")
+"""e.g. "12", "0", "37a" (biblia-pastoral splits some verses in parts)"""
+
+
+def parse_verse_key(key: str) -> tuple[int, int]:
+    """"37a" -> (37, 1), "12" -> (12, 0)"""
+    match = VERSE_KEY_PATTERN.match(key)
+    if not match:
+        raise ValueError(f"Unexpected verse key: {key!r}")
+
+    verse, part = match.groups()
+    return int(verse), (ord(part) - ord("a") + 1) if part else 0
+
+
+def format_verse_key(verse: int, part: int) -> str:
+    return f"{verse}{chr(ord('a') + part - 1)}" if part else str(verse)
+
+
+class Verse:
+    __slots__ = ("version", "book", "chapter", "number", "part", "text")
+
+    def __init__(self, version: str, book: str, chapter: int, number: int, part: int, text: str) -> None:
+        self.version = version
+        self.book = book
+        self.chapter = chapter
+        self.number = number
+        self.part = part
+        """1 for "37a", 2 for "37b"... 0 for whole verses"""
+        self.text = text
+
+    @property
+    def key(self) -> str:
+        """As in the chapter file, e.g. "16", "37a" """
+        return format_verse_key(self.number, self.part)
+
+    def __repr__(self) -> str:
+        return f"Verse({self.version} {self.book}{self.chapter}:{self.key} {self.text[:30]!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Verse):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class CacheStats(t.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+class Corpus:
+    def __init__(self, root: Path = JSON_DIR, cache_size: int = CACHE_SIZE) -> None:
+        self.root = root
+        self.cache_size = cache_size
+        self._versions: dict[str, Path] | None = None
+        self._chapters: OrderedDict[tuple[Path, str, int], tuple[Verse, ...]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def versions(self) -> dict[str, Path]:
+        """Version name -> directory, e.g. "ara" -> json/pt-br/ara, found on first access"""
+        if self._versions is None:
+            self._versions = {}
+            pending = [path for path in sorted(self.root.iterdir()) if path.is_dir() and path.name not in NON_VERSION_DIRS]
+            while pending:
+                path = pending.pop(0)
+                children = [child for child in sorted(path.iterdir()) if child.is_dir()]
+                # A version holds book directories of <chapter>.json files, don't walk into those
+                if any((child / "1.json").exists() for child in children):
+                    self._versions.setdefault(path.name, path)
+                elif len(path.relative_to(self.root).parts) < MAX_DEPTH:
+                    pending += children
+
+        return self._versions
+
+    def version_dir(self, version: str) -> Path:
+        """By name ("ara") or path under json/ ("pt-br/ara")"""
+        if "/" in version:
+            return self.root / version
+
+        try:
+            return self.versions[version]
+        except KeyError:
+            raise KeyError(f"Unknown version: {version}") from None
+
+    def books(self, version: str) -> list[str]:
+        return sorted((path.name for path in self.version_dir(version).iterdir() if path.is_dir()), key=book_sort_key)
+
+    def chapter(self, version: str, book: str, chapter: int) -> tuple[Verse, ...]:
+        """Verses of a chapter in order, empty if the version doesn't have it"""
+        version_dir = self.version_dir(version)
+        key = (version_dir, book, chapter)
+        if key in self._chapters:
+            self.hits += 1
+            self._chapters.move_to_end(key)
+            return self._chapters[key]
+
+        self.misses += 1
+        try:
+            content: dict[str, str] = json.loads((version_dir / book / f"{chapter}.json").read_text(encoding="utf-8"))["content"]
+        except FileNotFoundError:
+            content = {}
+
+        verses = tuple(
+            Verse(version_dir.name, book, chapter, number, part, text)
+            for (number, part), text in sorted((parse_verse_key(key), text) for key, text in content.items())
+        )
+
+        self._chapters[key] = verses
+        if len(self._chapters) > self.cache_size:
+            self._chapters.popitem(last=False)
+            self.evictions += 1
+
+        return verses
+
+    def verse(self, version: str, book: str, chapter: int, number: int, part: int = 0) -> Verse | None:
+        for verse in self.chapter(version, book, chapter):
+            if (verse.number, verse.part) == (number, part):
+                return verse
+
+        return None
+
+    def lookup(self, version: str, references: str) -> list[Verse]:
+        """Verses of free text references, e.g. "jo 3:16-18; rm 8", every split part included"""
+        # Compiling the book names is only worth it for corpora that are asked for references
+        from biblia.references import parse_references
+
+        found: list[Verse] = []
+        for passage in parse_references(references):
+            found += [
+                verse for verse in self.chapter(version, passage.book, passage.chapter)
+                if passage.first <= verse.number and (passage.last is None or verse.number <= passage.last)
+            ]
+
+        return found
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, self.evictions, len(self._chapters))
+
+    def clear(self) -> None:
+        self._chapters.clear()
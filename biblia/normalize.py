@@ -0,0 +1,23 @@
+import re
+import unicodedata
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def remove_accents(input_str: str) -> str:
+    if input_str.isascii():
+        return input_str
+
+    normalized_str = unicodedata.normalize('NFD', input_str)
+    return ''.join(c for c in normalized_str if unicodedata.category(c) != 'Mn')
+
+
+def fold(text: str) -> str:
+    """Case and accent insensitive form of `text`, e.g. "Graça" -> "graca" """
+    return remove_accents(text.casefold())
+
+
+def tokenize(text: str) -> list[str]:
+    """Folded words of `text` in order, punctuation dropped"""
+    return WORD_PATTERN.findall(fold(text))
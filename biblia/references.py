@@ -0,0 +1,242 @@
+from functools import lru_cache
+import json
+from pathlib import Path
+import re
+import typing as t
+from biblia.canon import ABBREVS, ALIASES, BOOKS, SCHEMES, book_chapters
+from biblia.normalize import fold
+
+
+REF_PATTERN = re.compile(r"^(\d?[^\d:]+)(\d+):([\d,\-]+)$")
+"""e.g. "sl89:11,12", "1co9:1", "at1:25-27" as written in json/refs"""
+
+
+def split_ref(ref: str) -> tuple[str, str, str]:
+    """"sl89:11,12" -> ("sl", "89", "11,12")"""
+    match = REF_PATTERN.match(ref)
+    if not match:
+        raise ValueError(f"Unexpected reference: {ref!r}")
+
+    book, chapter, verses = match.groups()
+    return book, chapter, verses
+
+
+def verse_ranges(verses: str) -> t.Iterator[tuple[int, int]]:
+    """"11,12" -> (11, 11), (12, 12); "25-27" -> (25, 27)"""
+    for piece in verses.split(","):
+        start, _, end = piece.partition("-")
+        yield int(start), int(end or start)
+
+
+def expand_ref(ref: str) -> list[tuple[str, int, int]]:
+    """Every verse a reference points to, "at1:25-27" -> at1:25, at1:26, at1:27"""
+    book, chapter, verses = split_ref(ref)
+    return [
+        (book, int(chapter), verse)
+        for start, end in verse_ranges(verses)
+        for verse in range(start, end + 1)
+    ]
+
+
+# Free text references typed by users, e.g. "jo 3:16-18; rm 8; 1co13:4,7"
+
+
+class Passage(t.NamedTuple):
+    book: str
+    chapter: int
+    first: int
+    last: int | None
+    """None up to the end of the chapter"""
+
+
+def _variants(name: str) -> set[str]:
+    """Spellings accepted for a book name, e.g. "1 Coríntios" -> "1 coríntios", "1coríntios", "1 corintios"... """
+    found = set()
+    for form in (name.casefold(), fold(name)):
+        found |= {form, form.replace(" ", ""), form.replace("-", " ")}
+        if form[:1].isdigit() and form[1:2] != " ":
+            found.add(f"{form[0]} {form[1:]}")
+
+    return found
+
+
+@lru_cache(maxsize=None)
+def book_variants() -> dict[str, str]:
+    """Casefolded spelling -> abbrev, with and without accents and spaces"""
+    # Exact abbrevs first so "jo" is João and "jó" is Jó, then everything canon.resolve knows
+    variants: dict[str, str] = {}
+    for abbrev in ABBREVS:
+        variants.setdefault(abbrev, abbrev)
+    for abbrev in ABBREVS:
+        for variant in _variants(abbrev):
+            variants.setdefault(variant, abbrev)
+    for book in BOOKS:
+        for name in (book.name, book.catholic_name, *([book.en] if book.en else [])):
+            for variant in _variants(name):
+                variants.setdefault(variant, book.abbrev)
+    for slugs in SCHEMES.values():
+        for slug, abbrev in slugs.items():
+            for variant in _variants(slug):
+                variants.setdefault(variant, abbrev)
+    for alias, abbrev in ALIASES.items():
+        variants.setdefault(alias, abbrev)
+
+    return variants
+
+
+def _trie_pattern(words: t.Iterable[str]) -> str:
+    """Regex alternation of `words` shaped as a trie, so matching a book costs
+    one pass over its letters instead of one attempt per spelling"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def compile_node(node: dict) -> str:
+        branches = [re.escape(char) + compile_node(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+
+        pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Greedy, so the longest spelling wins and shorter ones are tried on backtracking
+        return f"(?:{pattern})?" if "" in node else pattern
+
+    return compile_node(trie)
+
+
+_VERSE_ITEM = r"\d+(?:\s*[-–]\s*\d+(?:\s*[:.]\s*\d+)?)?"
+
+
+@lru_cache(maxsize=None)
+def user_ref_pattern() -> re.Pattern:
+    """One reference of `parse_references`, matched against the casefolded text.
+    Compiled on first use, it takes a few dozen ms"""
+    return re.compile(
+        rf"^\s*(?P<book>{_trie_pattern(book_variants())})?\.?\s*(?P<chapter>\d+)"
+        rf"(?:\s*[:.]\s*(?P<verses>{_VERSE_ITEM}(?:\s*,\s*{_VERSE_ITEM})*))?\s*$"
+    )
+
+VERSE_NUMBER_PATTERN = re.compile(r"^\d+")
+"""Number part of a verse key, e.g. "37" of "37a" """
+
+_ITEM_PATTERN = re.compile(r"(\d+)(?:\s*[-–]\s*(\d+)(?:\s*[:.]\s*(\d+))?)?")
+
+
+@lru_cache(maxsize=4096)
+def _parse_one(text: str, book: str | None) -> tuple[str, tuple[Passage, ...]]:
+    match = user_ref_pattern().match(text.casefold())
+    if not match:
+        raise ValueError(f"Unexpected reference: {text!r}")
+
+    if match["book"]:
+        book = book_variants()[match["book"]]
+    elif book is None:
+        raise ValueError(f"Reference without a book: {text!r}")
+
+    chapter = int(match["chapter"])
+    if not match["verses"]:
+        return book, (Passage(book, chapter, 1, None),)
+
+    passages = []
+    for first, last, last_verse in _ITEM_PATTERN.findall(match["verses"]):
+        if last_verse and int(last) == chapter:
+            # "3:16-3:18" is written out but stays in the chapter
+            passages.append(Passage(book, chapter, int(first), int(last_verse)))
+        elif last_verse:
+            # "3:16-4:2" crosses into the following chapters, which must exist: one
+            # passage is built per chapter, so "gn 1:1-999999999:1" would never end
+            if not chapter < int(last) <= max(book_chapters(book), book_chapters(book, "paulus")):
+                raise ValueError(f"Chapter range out of {book}: {text!r}")
+            passages.append(Passage(book, chapter, int(first), None))
+            passages += [Passage(book, between, 1, None) for between in range(chapter + 1, int(last))]
+            passages.append(Passage(book, int(last), 1, int(last_verse)))
+        else:
+            passages.append(Passage(book, chapter, int(first), int(last or first)))
+
+    return book, tuple(passages)
+
+
+def parse_references(text: str) -> list[Passage]:
+    """"jo 3:16-18; rm 8; 1co13:4,7" -> jo3:16-18, rm8 (whole), 1co13:4, 1co13:7.
+
+    Books are any abbrev, name or slug in canon (accents and case optional),
+    and a reference without one continues the previous book: "jo 3:16; 4:2".
+    """
+    passages: list[Passage] = []
+    book: str | None = None
+    for piece in text.split(";"):
+        if piece.strip():
+            book, found = _parse_one(piece, book)
+            passages += found
+
+    return passages
+
+
+ResolvedPassage = tuple[Passage, dict[str, str]]
+"""The passage and its verses, verse key -> text (e.g. "37a" for split verses)"""
+
+
+NumberedVerses = list[tuple[int, str, str]]
+"""(verse number, verse key, text) of a chapter, e.g. (37, "37a", "...")"""
+
+
+def number_verses(content: dict[str, str]) -> NumberedVerses:
+    return [(int(VERSE_NUMBER_PATTERN.match(key)[0]), key, text) for key, text in content.items()]
+
+
+def select_verses(numbered: NumberedVerses, passage: Passage) -> dict[str, str]:
+    """Verse key -> text of the verses of a chapter `passage` covers"""
+    first, last = passage.first, passage.last
+    return {key: text for number, key, text in numbered if first <= number and (last is None or number <= last)}
+
+
+def resolve_passages(passages: t.Iterable[Passage], version_dir: Path) -> list[ResolvedPassage]:
+    """Text of every passage in a version, in the version's own numbering.
+
+    Passages are grouped by chapter first, so a chapter file is decoded once
+    however many verses of it are asked for.
+    """
+    passages = list(passages)
+    by_chapter: dict[tuple[str, int], list[int]] = {}
+    for idx, passage in enumerate(passages):
+        by_chapter.setdefault((passage.book, passage.chapter), []).append(idx)
+
+    resolved: list[dict[str, str]] = [{} for _ in passages]
+    for (book, chapter), indexes in by_chapter.items():
+        try:
+            content: dict[str, str] = json.loads((version_dir / book / f"{chapter}.json").read_text(encoding="utf-8"))["content"]
+        except FileNotFoundError:
+            continue
+
+        numbered = number_verses(content)
+        for idx in indexes:
+            resolved[idx] = select_verses(numbered, passages[idx])
+
+    return list(zip(passages, resolved))
+
+
+def resolve_references(text: str, version_dir: Path) -> list[ResolvedPassage]:
+    """`parse_references` + `resolve_passages`"""
+    return resolve_passages(parse_references(text), version_dir)
+
+
+def main():
+    # CLI only, `biblia` imports nothing outside the stdlib
+    import argparse
+    from rich import print
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("references", help='e.g. "jo 3:16-18; rm 8; 1co13:4,7"')
+    parser.add_argument("--version", type=Path, default=Path("./json/pt-br/ara"), help="Version directory to read the verses from")
+    args = parser.parse_args()
+
+    for passage, verses in resolve_references(args.references, args.version):
+        print(f"[bold]{passage.book}{passage.chapter}[/bold]")
+        for key, text in verses.items():
+            print(f"  {key} {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Cross references by verse, read from json/refs and json/refs-reverse (built
+# by refs_reverse):
+#
+#   from biblia.refs import cited_by, refs
+#
+#   refs("jo3:16")      # what jo3:16 points to, e.g. ["rm5:8", "1jo4:9,10"]
+#   cited_by("jo3:16")  # verses pointing to jo3:16, e.g. ["gn22:2", ...]
+#
+# Each book's file is decoded on first use and kept until it changes on disk.
+
+from functools import lru_cache
+import json
+from pathlib import Path
+from biblia.references import split_ref
+
+
+REFS_DIR = Path("./json/refs/")
+REVERSE_DIR = Path("./json/refs-reverse/")
+
+RefsContent = dict[str, list[str]]
+"""e.g. "gn1:1": ["jo1:1", "hb11:3"] for json/refs, "jo1:1": ["gn1:1"] reversed"""
+
+
+@lru_cache(maxsize=16)
+def _load_shard(path: Path, mtime_ns: int) -> RefsContent:
+    return json.loads(path.read_text())
+
+
+def _lookup(ref: str, directory: Path) -> list[str]:
+    book, chapter, verse = split_ref(ref)
+    path = directory / f"{book}.json"
+    try:
+        shard = _load_shard(path, path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return []
+
+    return shard.get(f"{book}{int(chapter)}:{int(verse)}", [])
+
+
+def refs(ref: str, refs_dir: Path = REFS_DIR) -> list[str]:
+    """References listed for `ref` (e.g. "jo3:16"), as written in json/refs ("1jo4:9,10")"""
+    return _lookup(ref, refs_dir)
+
+
+def cited_by(ref: str, reverse_dir: Path = REVERSE_DIR) -> list[str]:
+    """Verses that reference `ref` (e.g. "jo3:16"), in canonical order"""
+    return _lookup(ref, reverse_dir)
@@ -0,0 +1,302 @@
+# Verse API over HTTP/1.1, asyncio only:
+#
+#   GET  /versions                    loaded versions
+#   GET  /<version>/<book>/<chapter>  the chapter file, e.g. /ara/jo/3
+#   POST /<version>/batch             ["jo 3:16-18", "rm 8", ...] -> their verses
+#
+# Every chapter of the selected versions is read at startup and kept as the
+# complete HTTP response (head + UTF-8 JSON body) with a strong ETag, so serving
+# a chapter is a dict lookup and a single write, and If-None-Match answers 304.
+# Keep-alive and pipelined requests are handled on the same connection.
+#
+# uvloop is used when installed (the 'server' extra).
+#
+# Usage:
+#   python -m biblia.server
+#   python -m biblia.server --versions ara acf kjv --port 8080
+
+import asyncio
+from functools import lru_cache
+from hashlib import blake2b
+import json
+from pathlib import Path
+import time
+import typing as t
+from urllib.parse import unquote_to_bytes
+from biblia.corpus import Corpus
+from biblia.references import Passage, number_verses, parse_references, select_verses
+
+
+HOST = "127.0.0.1"
+PORT = 8080
+MAX_HEAD = 16 * 1024
+"""Request line + headers"""
+MAX_BODY = 1024 * 1024
+MAX_BATCH = 1000
+"""References in a single batch request"""
+MAX_PASSAGES = 2000
+"""Chapters or verse ranges the references of a batch expand to, e.g. "sl 1:1-150:6" is 150"""
+DECODED_CHAPTERS = 1024
+"""Chapters kept decoded for batch requests"""
+
+STATUS = {
+    200: b"200 OK",
+    304: b"304 Not Modified",
+    400: b"400 Bad Request",
+    404: b"404 Not Found",
+    405: b"405 Method Not Allowed",
+    413: b"413 Content Too Large",
+    431: b"431 Request Header Fields Too Large",
+}
+
+
+def _response(status: int, body: bytes = b"", headers: dict[str, str] | None = None) -> bytes:
+    lines = [b"HTTP/1.1 " + STATUS[status]]
+    if status != 304:
+        lines += [b"Content-Type: application/json; charset=utf-8", b"Content-Length: %d" % len(body)]
+    lines += [f"{name}: {value}".encode() for name, value in (headers or {}).items()]
+    return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+
+def _json_response(status: int, raw: t.Any) -> bytes:
+    return _response(status, json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _error(status: int, message: str) -> bytes:
+    return _json_response(status, {"error": message})
+
+
+class Chapter(t.NamedTuple):
+    etag: bytes
+    """Quoted, as sent in ETag and compared with If-None-Match"""
+    response: bytes
+    """Complete 200 response, head and body"""
+    not_modified: bytes
+    body_at: int
+
+
+class TooManyPassages(Exception):
+    pass
+
+
+class ChapterStore:
+    """Every chapter of some versions, ready to be written to a socket"""
+
+    def __init__(self) -> None:
+        self.chapters: dict[bytes, Chapter] = {}
+        """Keyed by the UTF-8 request path, e.g. b"/ara/jo/3" """
+        self.versions: list[str] = []
+        self.decoded = lru_cache(maxsize=DECODED_CHAPTERS)(self._decode)
+
+    @classmethod
+    def load(cls, corpus: Corpus, versions: t.Iterable[str]) -> "ChapterStore":
+        store = cls()
+        for version in versions:
+            store.add_version(version, corpus.version_dir(version))
+
+        return store
+
+    def add_version(self, name: str, version_dir: Path) -> int:
+        count = 0
+        for book_dir in (path for path in version_dir.iterdir() if path.is_dir()):
+            for file in book_dir.glob("*.json"):
+                # Re-encoded without \u escapes, accents take 2 bytes instead of 6
+                raw = json.loads(file.read_text(encoding="utf-8"))
+                body = json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                etag = b'"%s"' % blake2b(body, digest_size=12).hexdigest().encode()
+                headers = {"ETag": etag.decode(), "Cache-Control": "public, max-age=86400"}
+                response = _response(200, body, headers)
+                self.chapters[f"/{name}/{book_dir.name}/{file.stem}".encode("utf-8")] = Chapter(
+                    etag, response, _response(304, headers=headers), len(response) - len(body),
+                )
+                count += 1
+
+        self.versions.append(name)
+        self.decoded.cache_clear()
+        return count
+
+    def _decode(self, path: bytes) -> list[tuple[int, str, str]] | None:
+        chapter = self.chapters.get(path)
+        if chapter is None:
+            return None
+
+        return number_verses(json.loads(chapter.response[chapter.body_at :])["content"])
+
+    def batch(self, version: str, references: list[str]) -> list[dict[str, t.Any]]:
+        """Raises TooManyPassages before resolving anything when the references expand past MAX_PASSAGES"""
+        parsed: list[tuple[str, list[Passage] | ValueError]] = []
+        for reference in references:
+            try:
+                parsed.append((reference, parse_references(reference)))
+            except ValueError as e:
+                parsed.append((reference, e))
+
+        total = sum(len(passages) for _, passages in parsed if isinstance(passages, list))
+        if total > MAX_PASSAGES:
+            raise TooManyPassages(total)
+
+        results: list[dict[str, t.Any]] = []
+        for reference, passages in parsed:
+            if isinstance(passages, ValueError):
+                results.append({"reference": reference, "error": str(passages)})
+                continue
+
+            found = []
+            for passage in passages:
+                numbered = self.decoded(f"/{version}/{passage.book}/{passage.chapter}".encode("utf-8"))
+                found.append({
+                    "book": passage.book,
+                    "chapter": passage.chapter,
+                    "verses": select_verses(numbered, passage) if numbered is not None else {},
+                })
+            results.append({"reference": reference, "passages": found})
+
+        return results
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    if if_none_match.strip() == b"*":
+        return True
+
+    return any(candidate.strip().removeprefix(b"W/") == etag for candidate in if_none_match.split(b","))
+
+
+class HttpProtocol(asyncio.Protocol):
+    def __init__(self, store: ChapterStore) -> None:
+        self.store = store
+        self.transport: asyncio.Transport | None = None
+        self.buffer = bytearray()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = t.cast(asyncio.Transport, transport)
+
+    def data_received(self, data: bytes) -> None:
+        self.buffer += data
+        # Several requests may arrive at once when the client pipelines
+        while self.transport is not None and not self.transport.is_closing():
+            head_end = self.buffer.find(b"\r\n\r\n")
+            if head_end < 0:
+                if len(self.buffer) > MAX_HEAD:
+                    self._finish(_error(431, "Request head too large"), keep_alive=False)
+                return
+
+            request_line, *header_lines = bytes(self.buffer[:head_end]).split(b"\r\n")
+            try:
+                method, target, protocol = request_line.split(b" ")
+            except ValueError:
+                self._finish(_error(400, "Malformed request line"), keep_alive=False)
+                return
+
+            headers: dict[bytes, bytes] = {}
+            for line in header_lines:
+                name, _, value = line.partition(b":")
+                headers[name.strip().lower()] = value.strip()
+
+            try:
+                length = int(headers.get(b"content-length", 0))
+            except ValueError:
+                self._finish(_error(400, "Invalid Content-Length"), keep_alive=False)
+                return
+            if length > MAX_BODY:
+                self._finish(_error(413, f"Body over {MAX_BODY} bytes"), keep_alive=False)
+                return
+
+            body_end = head_end + 4 + length
+            if len(self.buffer) < body_end:
+                return
+
+            body = bytes(self.buffer[head_end + 4 : body_end])
+            del self.buffer[:body_end]
+
+            connection = headers.get(b"connection", b"").lower()
+            keep_alive = connection != b"close" if protocol == b"HTTP/1.1" else connection == b"keep-alive"
+            self._finish(self.handle(method, target, headers, body), keep_alive)
+
+    def _finish(self, response: bytes, keep_alive: bool) -> None:
+        assert self.transport is not None
+        self.transport.write(response)
+        if not keep_alive:
+            self.transport.close()
+
+    def handle(self, method: bytes, target: bytes, headers: dict[bytes, bytes], body: bytes) -> bytes:
+        path = target.partition(b"?")[0]
+        if method == b"GET":
+            chapter = self.store.chapters.get(path)
+            if chapter is None and b"%" in path:
+                chapter = self.store.chapters.get(unquote_to_bytes(path))
+
+            if chapter is not None:
+                if_none_match = headers.get(b"if-none-match")
+                if if_none_match is not None and _etag_matches(if_none_match, chapter.etag):
+                    return chapter.not_modified
+                return chapter.response
+
+            if path == b"/versions":
+                return _json_response(200, self.store.versions)
+
+            return _error(404, "Unknown chapter")
+
+        if method == b"POST" and path.endswith(b"/batch"):
+            version = unquote_to_bytes(path[1 : -len(b"/batch")]).decode("utf-8", "replace")
+            if version not in self.store.versions:
+                return _error(404, f"Unknown version: {version}")
+
+            try:
+                references = json.loads(body)
+            except ValueError:
+                return _error(400, "Body must be a JSON list of references")
+            if not isinstance(references, list) or not all(isinstance(reference, str) for reference in references):
+                return _error(400, "Body must be a JSON list of references")
+            if len(references) > MAX_BATCH:
+                return _error(413, f"Over {MAX_BATCH} references")
+
+            try:
+                results = self.store.batch(version, references)
+            except TooManyPassages as e:
+                return _error(413, f"References expand to {e} passages, over {MAX_PASSAGES}")
+
+            return _json_response(200, {"version": version, "results": results})
+
+        return _error(405, "Only GET chapters and POST batches")
+
+
+async def serve(store: ChapterStore, host: str = HOST, port: int = PORT) -> None:
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: HttpProtocol(store), host, port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    # CLI only, `biblia` imports nothing outside the stdlib
+    import argparse
+    from rich import print
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--versions", nargs="*", help="Every version when omitted")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    corpus = Corpus()
+    start = time.perf_counter()
+    store = ChapterStore.load(corpus, args.versions or corpus.versions)
+    print(f"Loaded {len(store.chapters)} chapters of {', '.join(store.versions)} in {time.perf_counter() - start:.2f}s")
+
+    try:
+        import uvloop
+    except ImportError:
+        loop_factory = None
+    else:
+        loop_factory = uvloop.new_event_loop
+
+    print(f"Listening on [green]http://{args.host}:{args.port}[/green]")
+    try:
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            runner.run(serve(store, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
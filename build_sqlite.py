@@ -0,0 +1,270 @@
+# Build a single SQLite database out of the json/ tree: every version's verses
+# and section titles, the cross references and the diario-viver comments, plus
+# an FTS5 index over the verse texts that ignores accents ("graca" finds "graça").
+#
+# The build is deterministic, files are read in canonical order and row ids are
+# assigned in that order, so the same json/ tree produces the same database.
+#
+# Usage:
+#   python build_sqlite.py
+#   python build_sqlite.py --search "graça" --version acf
+
+import argparse
+import json
+from pathlib import Path
+import sqlite3
+import time
+import typing as t
+from rich import print
+from biblia.canon import book_sort_key
+from biblia.corpus import JSON_DIR, parse_verse_key
+from biblia.references import split_ref, verse_ranges
+from comment_index import COMMENTS_DIR, read_comments
+from packed_corpus import default_version_dirs
+
+
+DB_PATH = Path("./build/biblia.sqlite3")
+REFS_DIR = Path("./json/refs/")
+
+SCHEMA = """
+CREATE TABLE versions (
+    id INTEGER PRIMARY KEY,
+    lang TEXT NOT NULL,
+    name TEXT NOT NULL,
+    UNIQUE (lang, name)
+);
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY,
+    abbrev TEXT NOT NULL UNIQUE
+);
+CREATE TABLE version_books (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    title TEXT NOT NULL,
+    chapters INTEGER NOT NULL,
+    PRIMARY KEY (version_id, book_id)
+);
+CREATE TABLE verses (
+    id INTEGER PRIMARY KEY,
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    chapter INTEGER NOT NULL,
+    verse INTEGER NOT NULL,
+    part TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL,
+    UNIQUE (version_id, book_id, chapter, verse, part)
+);
+CREATE TABLE titles (
+    version_id INTEGER NOT NULL REFERENCES versions (id),
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    chapter INTEGER NOT NULL,
+    verse INTEGER NOT NULL,
+    part TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL,
+    PRIMARY KEY (version_id, book_id, chapter, verse, part)
+);
+CREATE TABLE refs (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    chapter INTEGER NOT NULL,
+    verse INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    target_book_id INTEGER NOT NULL REFERENCES books (id),
+    target_chapter INTEGER NOT NULL,
+    target_verse_start INTEGER NOT NULL,
+    target_verse_end INTEGER NOT NULL
+);
+CREATE INDEX refs_source ON refs (book_id, chapter, verse);
+CREATE INDEX refs_target ON refs (target_book_id, target_chapter, target_verse_start);
+CREATE TABLE comments (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    book_id INTEGER NOT NULL REFERENCES books (id),
+    chapter INTEGER NOT NULL,
+    verse INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    end_chapter INTEGER NOT NULL,
+    end_verse INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX comments_verse ON comments (book_id, chapter, verse);
+CREATE VIRTUAL TABLE verses_fts USING fts5(
+    text,
+    content='verses',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+class SearchResult(t.TypedDict):
+    version: str
+    book: str
+    chapter: int
+    verse: str
+    text: str
+
+
+class Builder:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.books: dict[str, int] = {}
+
+    def book_id(self, abbrev: str) -> int:
+        if abbrev not in self.books:
+            self.books[abbrev] = len(self.books) + 1
+            self.conn.execute("INSERT INTO books (id, abbrev) VALUES (?, ?)", (self.books[abbrev], abbrev))
+
+        return self.books[abbrev]
+
+    def _book_dirs(self, directory: Path) -> list[Path]:
+        return sorted(
+            (path for path in directory.iterdir() if path.is_dir()),
+            key=lambda path: book_sort_key(path.name),
+        )
+
+    def _chapter_files(self, book_dir: Path) -> list[tuple[int, Path]]:
+        return sorted((int(file.stem), file) for file in book_dir.glob("*.json"))
+
+    def add_version(self, version_id: int, version_dir: Path) -> int:
+        lang = version_dir.parent.relative_to(JSON_DIR).as_posix()
+        self.conn.execute("INSERT INTO versions (id, lang, name) VALUES (?, ?, ?)", (version_id, lang, version_dir.name))
+
+        verses: list[tuple] = []
+        titles: list[tuple] = []
+        for book_dir in self._book_dirs(version_dir):
+            book_id = self.book_id(book_dir.name)
+            chapters = self._chapter_files(book_dir)
+            title = ""
+
+            for chapter, file in chapters:
+                raw = json.loads(file.read_text(encoding="utf-8"))
+                title = title or raw["meta"]["title"]
+
+                for (verse, part), text in sorted((parse_verse_key(key), value) for key, value in raw["content"].items()):
+                    verses.append((version_id, book_id, chapter, verse, _part(part), text))
+
+                for (verse, part), text in sorted((parse_verse_key(key), value) for key, value in raw.get("titles", {}).items()):
+                    titles.append((version_id, book_id, chapter, verse, _part(part), text))
+
+            self.conn.execute(
+                "INSERT INTO version_books (version_id, book_id, title, chapters) VALUES (?, ?, ?, ?)",
+                (version_id, book_id, title, chapters[-1][0]),
+            )
+
+        self.conn.executemany("INSERT INTO verses (version_id, book_id, chapter, verse, part, text) VALUES (?, ?, ?, ?, ?, ?)", verses)
+        self.conn.executemany("INSERT INTO titles (version_id, book_id, chapter, verse, part, title) VALUES (?, ?, ?, ?, ?, ?)", titles)
+        return len(verses)
+
+    def add_refs(self, refs_dir: Path) -> int:
+        rows: list[tuple] = []
+        files = sorted(refs_dir.glob("*.json"), key=lambda file: book_sort_key(file.stem))
+        for file in files:
+            book_id = self.book_id(file.stem)
+            refs: dict[str, list[str]] = json.loads(file.read_text(encoding="utf-8"))
+
+            for source, targets in refs.items():
+                _, chapter, verse = split_ref(source)
+                position = 0
+                for target in targets:
+                    target_book, target_chapter, target_verses = split_ref(target)
+                    target_book_id = self.book_id(target_book)
+                    for start, end in verse_ranges(target_verses):
+                        rows.append((book_id, int(chapter), int(verse), position, target_book_id, int(target_chapter), start, end))
+                        position += 1
+
+        self.conn.executemany(
+            "INSERT INTO refs (book_id, chapter, verse, position, target_book_id, target_chapter, target_verse_start, target_verse_end) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return len(rows)
+
+    def add_comments(self, comments_dir: Path) -> int:
+        rows = [
+            (comments_dir.name, self.book_id(comment.book), comment.chapter, comment.verse, comment.position, comment.end_chapter, comment.end_verse, comment.text)
+            for comment in read_comments(comments_dir)
+        ]
+        self.conn.executemany(
+            "INSERT INTO comments (source, book_id, chapter, verse, position, end_chapter, end_verse, text) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return len(rows)
+
+
+def _part(part: int) -> str:
+    return chr(ord("a") + part - 1) if part else ""
+
+
+def build(output_file: Path = DB_PATH, version_dirs: list[Path] | None = None) -> None:
+    if version_dirs is None:
+        version_dirs = default_version_dirs()
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_suffix(".tmp")
+    tmp.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(tmp, isolation_level=None)
+    conn.execute("PRAGMA page_size = 4096")
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+
+    builder = Builder(conn)
+    conn.execute("BEGIN")
+    for version_id, version_dir in enumerate(version_dirs, start=1):
+        start = time.perf_counter()
+        count = builder.add_version(version_id, version_dir)
+        print(f"Added {version_dir}: {count} verses in {time.perf_counter() - start:.2f}s")
+
+    print(f"Added {builder.add_refs(REFS_DIR)} refs")
+    print(f"Added {builder.add_comments(COMMENTS_DIR)} comments")
+
+    conn.execute("INSERT INTO verses_fts (verses_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO verses_fts (verses_fts) VALUES ('optimize')")
+    conn.execute("COMMIT")
+    conn.execute("VACUUM")
+    conn.close()
+
+    tmp.replace(output_file)
+
+
+def search(conn: sqlite3.Connection, query: str, version: str | None = None, limit: int = 20) -> list[SearchResult]:
+    """Full text search over the verses, best matches first (FTS5 query syntax)"""
+    rows = conn.execute(
+        """
+        SELECT versions.name, books.abbrev, verses.chapter, verses.verse || verses.part, verses.text
+        FROM verses_fts
+        JOIN verses ON verses.id = verses_fts.rowid
+        JOIN versions ON versions.id = verses.version_id
+        JOIN books ON books.id = verses.book_id
+        WHERE verses_fts MATCH ? AND (? IS NULL OR versions.name = ?)
+        ORDER BY verses_fts.rank
+        LIMIT ?
+        """,
+        (query, version, version, limit),
+    )
+    return [SearchResult(version=row[0], book=row[1], chapter=row[2], verse=row[3], text=row[4]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", type=Path, default=DB_PATH)
+    parser.add_argument("--search", help="Query an existing database instead of building it")
+    parser.add_argument("--version", help="Restrict --search to a version, e.g. acf")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.search:
+        conn = sqlite3.connect(f"file:{args.output}?mode=ro", uri=True)
+        for result in search(conn, args.search, args.version, args.limit):
+            print(f"[bold]{result['version']} {result['book']}{result['chapter']}:{result['verse']}[/bold] {result['text']}")
+        return
+
+    start = time.perf_counter()
+    build(args.output)
+    print(f"Write {args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# Interval index over the diario-viver comments: "which comments apply to
+# gn2:4" finds the ones written for a single verse and the ones written for a
+# range, e.g. gn1:3-2:7, in O(log n + k).
+#
+# A comment is stored under the first verse of its range (json/comments/<lang>/
+# <source>/<book>/<chapter>.json), copy_comentarios records where ranges end
+# in <source>/_ranges.json:
+#
+#   {"gn1:3": [[0, "gn2:7"]]}   comment 0 of gn1:3 goes up to gn2:7
+#
+# Chapters downloaded before ranges were recorded are skipped by a plain rerun,
+# so their range comments count as single verses until the comments are
+# downloaded again with `python copy_comentarios.py --redo`.
+#
+# Usage:
+#   python comment_index.py gn2:4
+#   python comment_index.py gn2:4-8
+
+import argparse
+import json
+from pathlib import Path
+import time
+import typing as t
+from rich import print
+from biblia.canon import book_sort_key, ordinal
+from biblia.references import split_ref, verse_ranges
+
+
+COMMENTS_DIR = Path("./json/comments/pt-br/diario-viver/")
+RANGES_FILE = "_ranges.json"
+
+RangesContent = dict[str, list[tuple[int, str]]]
+"""e.g. "gn1:3": [(0, "gn2:7")], comment position -> last verse it covers"""
+
+
+class Comment(t.NamedTuple):
+    book: str
+    chapter: int
+    verse: int
+    position: int
+    """Index in the verse's list of comments"""
+    end_chapter: int
+    end_verse: int
+    text: str
+
+
+def update_ranges(source_dir: Path, book: str, chapter: int, ranges: RangesContent) -> None:
+    """Replace the ranges recorded for a chapter after it was downloaded again"""
+    path = source_dir / RANGES_FILE
+    try:
+        content: RangesContent = json.loads(path.read_text())
+    except FileNotFoundError:
+        content = {}
+
+    prefix = f"{book}{chapter}:"
+    content = {key: value for key, value in content.items() if not key.startswith(prefix)} | ranges
+    ordered = dict(sorted(content.items(), key=lambda item: _ref_sort_key(item[0])))
+
+    source_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(ordered, ensure_ascii=False, separators=(",", ":")))
+    tmp.replace(path)
+
+
+def _ref_sort_key(ref: str) -> tuple[tuple[int, str], int, int]:
+    book, chapter, verse = split_ref(ref)
+    return book_sort_key(book), int(chapter), int(verse)
+
+
+def read_comments(comments_dir: Path = COMMENTS_DIR) -> t.Iterator[Comment]:
+    """Every comment in canonical order, with the end of its range (itself for single verses)"""
+    try:
+        ranges: RangesContent = json.loads((comments_dir / RANGES_FILE).read_text())
+    except FileNotFoundError:
+        ranges = {}
+
+    book_dirs = sorted((path for path in comments_dir.iterdir() if path.is_dir()), key=lambda path: book_sort_key(path.name))
+    for book_dir in book_dirs:
+        for chapter, file in sorted((int(file.stem), file) for file in book_dir.glob("*.json")):
+            comments: dict[str, list[str]] = json.loads(file.read_text(encoding="utf-8"))
+            for verse, texts in sorted(comments.items(), key=lambda item: int(item[0])):
+                ends = {position: end for position, end in ranges.get(f"{book_dir.name}{chapter}:{verse}", [])}
+                for position, text in enumerate(texts):
+                    end_chapter, end_verse = chapter, int(verse)
+                    if position in ends:
+                        _, end_chapter, end_verse = split_ref(ends[position])
+                    yield Comment(book_dir.name, chapter, int(verse), position, int(end_chapter), int(end_verse), text)
+
+
+class _Node(t.NamedTuple):
+    center: int
+    by_start: list[tuple[int, int, int]]
+    """(start, end, item) of the intervals containing `center`, by start"""
+    by_end: list[tuple[int, int, int]]
+    """The same intervals by end, descending"""
+    left: "_Node | None"
+    right: "_Node | None"
+
+
+class IntervalTree:
+    """Static centered interval tree over closed [start, end] integer intervals"""
+
+    def __init__(self, intervals: t.Iterable[tuple[int, int]]) -> None:
+        self._root = self._build(sorted((start, end, item) for item, (start, end) in enumerate(intervals)))
+
+    @classmethod
+    def _build(cls, intervals: list[tuple[int, int, int]]) -> _Node | None:
+        if not intervals:
+            return None
+
+        # Intervals come sorted by start, so the center always lies in one of them
+        center = intervals[len(intervals) // 2][0]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return _Node(
+            center,
+            here,
+            sorted(here, key=lambda interval: -interval[1]),
+            cls._build([interval for interval in intervals if interval[1] < center]),
+            cls._build([interval for interval in intervals if interval[0] > center]),
+        )
+
+    def overlapping(self, start: int, end: int) -> list[int]:
+        """Items (insertion indexes) of the intervals sharing a point with [start, end]"""
+        found: list[int] = []
+        pending = [self._root]
+        while pending:
+            node = pending.pop()
+            if node is None:
+                continue
+
+            if end < node.center:
+                for interval_start, _, item in node.by_start:
+                    if interval_start > end:
+                        break
+                    found.append(item)
+                pending.append(node.left)
+            elif start > node.center:
+                for _, interval_end, item in node.by_end:
+                    if interval_end < start:
+                        break
+                    found.append(item)
+                pending.append(node.right)
+            else:
+                found.extend(item for _, _, item in node.by_start)
+                pending += [node.left, node.right]
+
+        return found
+
+    def covering(self, point: int) -> list[int]:
+        return self.overlapping(point, point)
+
+
+class CommentIndex:
+    """Comments of a source by the canonical verses they apply to"""
+
+    def __init__(self, comments_dir: Path = COMMENTS_DIR) -> None:
+        self.comments: list[Comment] = []
+        intervals: list[tuple[int, int]] = []
+        self.skipped = 0
+        """Comments filed under verses the canon doesn't have, e.g. jó6:35"""
+
+        for comment in read_comments(comments_dir):
+            try:
+                start = ordinal(comment.book, comment.chapter, comment.verse)
+                end = ordinal(comment.book, comment.end_chapter, comment.end_verse)
+            except KeyError:
+                self.skipped += 1
+                continue
+
+            self.comments.append(comment)
+            intervals.append((start, max(start, end)))
+
+        self._tree = IntervalTree(intervals)
+
+    def overlapping(self, book: str, chapter: int, start_verse: int, end_verse: int) -> list[Comment]:
+        """Comments applying to any verse of chapter:start_verse-end_verse, in canonical order"""
+        items = self._tree.overlapping(ordinal(book, chapter, start_verse), ordinal(book, chapter, end_verse))
+        return [self.comments[item] for item in sorted(items)]
+
+    def covering(self, book: str, chapter: int, verse: int) -> list[Comment]:
+        return self.overlapping(book, chapter, verse, verse)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ref", help='e.g. "gn2:4" or "gn2:4-8"')
+    parser.add_argument("--comments-dir", type=Path, default=COMMENTS_DIR)
+    args = parser.parse_args()
+
+    book, chapter, verses = split_ref(args.ref)
+    start_verse, end_verse = next(verse_ranges(verses))
+
+    if not (args.comments_dir / RANGES_FILE).exists():
+        print(f"[yellow]No {RANGES_FILE}, comments on a range of verses only apply to its first one (run copy_comentarios.py --redo)[/yellow]")
+
+    start = time.perf_counter()
+    index = CommentIndex(args.comments_dir)
+    loaded = time.perf_counter()
+    comments = index.overlapping(book, int(chapter), start_verse, end_verse)
+    searched = time.perf_counter()
+
+    for comment in comments:
+        span = f"{comment.book}{comment.chapter}:{comment.verse}"
+        if (comment.end_chapter, comment.end_verse) != (comment.chapter, comment.verse):
+            span += f"-{comment.end_chapter}:{comment.end_verse}"
+        print(f"[bold]{span}[/bold] {comment.text[:200]}")
+    print(f"{len(comments)} comments, load {(loaded - start) * 1000:.1f}ms, query {(searched - loaded) * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
-from time import sleep
+import argparse
+import asyncio
+from bisect import bisect_right
+from functools import partial
 from rich import print
-import requests
 from bs4 import BeautifulSoup
+from biblia.canon import PROTESTANT_BOOKS, from_scheme, to_scheme
+from fetcher import FetchEngine
+import http_cache
+from http_cache import ResponseCache
+import httpx
+import scrape_manifest
+from scrape_manifest import ChapterKey, Manifest
+import scrape_metrics
+from scrape_metrics import ScrapeMetrics
+from scrape_pipeline import ChapterStages, run_chapters
 from pathlib import Path
 import typing as t
 import json
@@ -32,17 +44,20 @@ US_VERSIONS = ["kjv"]
 def compact_json(raw) -> str:
     return json.dumps(raw, separators=(',', ':')).replace("\n", "")
 
-def _pull_chapter(version: str, abbrev: str, chapter: int) -> tuple[dict[str, str], dict[str, str]]:
-    resp = requests.get(GET_CHAPTER.format(VERSION=version, ABBREV=abbrev, CHAPTER=chapter))
+async def _fetch_chapter(engine: FetchEngine, version: str, abbrev: str, chapter: int) -> httpx.Response:
+    resp = await engine.get(GET_CHAPTER.format(VERSION=version, ABBREV=abbrev, CHAPTER=chapter))
     resp.raise_for_status()
-    raw_html = resp.text
+    return resp
 
+def _parse_chapter_bs4(raw_html: str) -> tuple[dict[str, str], dict[str, str]]:
     soup = BeautifulSoup(raw_html, 'html.parser')
     verses: dict[str, str] = {}
     titles: dict[str, str] = {}
 
     for div_tag in soup.find_all("div", class_="l0", attrs={'data-v': True}):
         title_span = div_tag.find("span", class_="t")
+        if title_span is None:
+            raise ValueError(f"Title without a text span: {div_tag}")
         title_idx = title_span["data-v"].lstrip(".").rstrip(".")
         title_text = title_span.get_text(strip=True)
         titles[title_idx] = title_text
@@ -73,75 +88,202 @@ def _pull_chapter(version: str, abbrev: str, chapter: int) -> tuple[dict[str, st
 
     return verses, titles
 
-def _download_version(meta: OutputMeta, version: str, abbrev: str, chapters: int, output_dir: Path) -> None:
-    try:
-        for ch in range(1, chapters +1):
-            output_abbrev = "at" if abbrev == "atos" else abbrev
-            output_file = output_dir / version / output_abbrev / f"{ch}.json"
-
-            for attempt in range(3):
-              try:
-                chapter_content, title_content = _pull_chapter(version, abbrev, ch)
-                break
-              except Exception as e:
-                print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
-                if attempt < 2:
-                  print("[yellow]Retrying in 10 seconds...[/yellow]")
-                  sleep(10)
-                else:
-                  raise
-
-            new_content = Output(
-                meta=meta,
-                chapter=ch,
-                content=chapter_content
-            )
+def _has_class(name: str) -> str:
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
 
-            if title_content:
-                new_content["titles"] = title_content
+def _text(el) -> str:
+    """Same as BeautifulSoup's `get_text(strip=True)`, which leaves out scripts and styles"""
+    return "".join(s.strip() for s in el.xpath(".//text()[not(ancestor::script or ancestor::style or ancestor::template)]"))
 
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, "w") as f:
-                f.write(compact_json(new_content))
+class _SiblingIndex:
+    """Answers `find_next_siblings(attrs={"data-v": ...})` with a bisect instead of a scan"""
 
-            print(f"Write [green]{output_file}[/green]")
-    except Exception:
-        print(f"Error on [red]{meta['title']}[/red]")
-        raise
+    def __init__(self) -> None:
+        self._parents = {}
 
-def main():
-    book_data = json.loads(Path("json/books.json").read_text())
-    for book in book_data:
-        abbrev = book["abbrev"]["pt"]
-        title = book["name"]
-        chapters = book["chapters"]
-
-        if abbrev == "job":
-            abbrev = "jó"
-        elif abbrev == "at":
-            abbrev = "atos"
-
-        title = title.replace("º", "").replace("ª", "")
-
-        meta = OutputMeta(
-            title=title,
-            abbrev="at" if abbrev == "atos" else abbrev,
+    def following(self, el, data_v: str) -> list:
+        parent = el.getparent()
+        if parent is None:
+            return []
+
+        if parent not in self._parents:
+            positions = {}
+            by_value: dict[str, tuple[list[int], list]] = {}
+            for idx, child in enumerate(parent):
+                positions[child] = idx
+                if (value := child.get("data-v")) is not None and isinstance(child.tag, str):
+                    idxs, children = by_value.setdefault(value, ([], []))
+                    idxs.append(idx)
+                    children.append(child)
+
+            self._parents[parent] = (positions, by_value)
+
+        positions, by_value = self._parents[parent]
+        if data_v not in by_value:
+            return []
+
+        idxs, children = by_value[data_v]
+        return children[bisect_right(idxs, positions[el]):]
+
+def _parse_chapter_lxml(raw_html: str) -> tuple[dict[str, str], dict[str, str]]:
+    """Compiled XPath version of `_parse_chapter_bs4`, must produce the same output"""
+    from lxml import html as lxml_html
+
+    root = lxml_html.document_fromstring(raw_html)
+    verses: dict[str, str] = {}
+    titles: dict[str, str] = {}
+
+    for div_tag in root.xpath(f"//div[@data-v][{_has_class('l0')}]"):
+        title_spans = div_tag.xpath(f".//span[{_has_class('t')}]")
+        if not title_spans:
+            raise ValueError(f"Title without a text span: {lxml_html.tostring(div_tag, encoding='unicode')}")
+        title_span = title_spans[0]
+        title_idx = title_span.get("data-v").lstrip(".").rstrip(".")
+        titles[title_idx] = _text(title_span)
+
+    # find_next("span", class_="t") is the first text span after the verse span in document order
+    order = {el: idx for idx, el in enumerate(root.iter())}
+    text_spans = root.xpath(f"//span[{_has_class('t')}]")
+    text_positions = [order[span] for span in text_spans]
+    siblings = _SiblingIndex()
+
+    for p_tag in root.xpath(f"//p[@data-v][{_has_class('l0')} or {_has_class('l1')}]"):
+        for verse_number_span in p_tag.xpath(f".//span[@data-v][{_has_class('v')}]"):
+            verse_text = None
+            verse_number = _text(verse_number_span)
+
+            next_idx = bisect_right(text_positions, order[verse_number_span])
+            if next_idx < len(text_spans):
+                verse_text_tag = text_spans[next_idx]
+                verse_text = _text(verse_text_tag)
+                concat = [_text(sibling) for sibling in siblings.following(verse_text_tag, f".{verse_number}.")]
+                if concat:
+                    verse_text += " " + " ".join(concat)
+
+                concat = [_text(sibling) for sibling in siblings.following(verse_text_tag.getparent(), f".{verse_number}.")]
+                if concat:
+                    prefix_concat = " " if verse_text[-1] != " " else ""
+                    verse_text += prefix_concat + " ".join(concat)
+
+            if verse_number and verse_text:
+                verses[str(verse_number)] = verse_text
+
+    return verses, titles
+
+ChapterParser = t.Callable[[str], tuple[dict[str, str], dict[str, str]]]
+
+PARSERS: dict[str, ChapterParser] = {
+    "bs4": _parse_chapter_bs4,
+    "lxml": _parse_chapter_lxml,
+}
+
+def _parse_chapter(raw_html: str, parser: str = "bs4") -> tuple[dict[str, str], dict[str, str]]:
+    return PARSERS[parser](raw_html)
+
+class ChapterRef(t.NamedTuple):
+    meta: OutputMeta
+    version: str
+    abbrev: str
+    """bibliaonline's abbrev"""
+    chapter: int
+    output_dir: Path
+
+    @property
+    def key(self) -> ChapterKey:
+        return ChapterKey("bibliaonline", self.version, from_scheme(self.abbrev, "bibliaonline"), self.chapter)
+
+    @property
+    def output_file(self) -> Path:
+        return self.output_dir / self.version / from_scheme(self.abbrev, "bibliaonline") / f"{self.chapter}.json"
+
+ParsedChapter = tuple[dict[str, str], dict[str, str]]
+"""Verses and titles"""
+
+def _chapter_refs(meta: OutputMeta, version: str, abbrev: str, chapters: int, output_dir: Path) -> list[ChapterRef]:
+    return [ChapterRef(meta, version, abbrev, ch, output_dir) for ch in range(1, chapters + 1)]
+
+def _parse_ref(parser: str, ref: ChapterRef, raw_html: str) -> ParsedChapter:
+    return _parse_chapter(raw_html, parser)
+
+def _stages(engine: FetchEngine, manifest: Manifest, parser: str = "bs4") -> ChapterStages[ChapterRef, ParsedChapter]:
+    async def _fetch(ref: ChapterRef) -> httpx.Response | None:
+        if manifest.should_skip(ref.key):
+            return None
+
+        return await engine.retry(_fetch_chapter, engine, ref.version, ref.abbrev, ref.chapter)
+
+    def _write(ref: ChapterRef, resp: httpx.Response, parsed: ParsedChapter) -> None:
+        chapter_content, title_content = parsed
+        new_content = Output(
+            meta=ref.meta,
+            chapter=ref.chapter,
+            content=chapter_content
         )
 
-        # for version in BR_VERSIONS:
-        #     _download_version(meta, version, abbrev, chapters, BR_OUTPUT_DIR)
+        if title_content:
+            new_content["titles"] = title_content
+
+        raw = compact_json(new_content)
+        ref.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(ref.output_file, "w") as f:
+            f.write(raw)
 
-        # for version in US_VERSIONS:
-        #     _download_version(meta, version, abbrev, chapters, US_OUTPUT_DIR)
+        manifest.mark_done(ref.key, raw, resp)
+        print(f"Write [green]{ref.output_file}[/green]")
 
-        # if book["testament"] == "NT":
-        #     for version in GREEK_VERSIONS:
-        #         _download_version(meta, version, abbrev, chapters, GREEK_OUTPUT_DIR)
+    def _failed(ref: ChapterRef, e: BaseException) -> None:
+        manifest.mark_failed(ref.key, e)
+        print(f"Error on [red]{ref.meta['title']}[/red]")
 
-        if book["testament"] == "VT":
-            for version in HEBREW_VERSIONS:
-                _download_version(meta, version, abbrev, chapters, HEBREW_OUTPUT_DIR)
+    return ChapterStages(_fetch, partial(_parse_ref, parser), _write, _failed)
 
+async def _main(cache: ResponseCache | None, manifest: Manifest, parser: str, metrics: ScrapeMetrics):
+    refs: list[ChapterRef] = []
+
+    async with FetchEngine(cache=cache, metrics=metrics) as engine:
+        for book in PROTESTANT_BOOKS:
+            abbrev = to_scheme(book.abbrev, "bibliaonline")
+            title = book.name
+            chapters = book.chapters
+
+            title = title.replace("º", "").replace("ª", "")
+
+            meta = OutputMeta(
+                title=title,
+                abbrev=book.abbrev,
+            )
+
+            # for version in BR_VERSIONS:
+            #     refs += _chapter_refs(meta, version, abbrev, chapters, BR_OUTPUT_DIR)
+
+            # for version in US_VERSIONS:
+            #     refs += _chapter_refs(meta, version, abbrev, chapters, US_OUTPUT_DIR)
+
+            # if book.testament == "NT":
+            #     for version in GREEK_VERSIONS:
+            #         refs += _chapter_refs(meta, version, abbrev, chapters, GREEK_OUTPUT_DIR)
+
+            if book.testament == "VT":
+                for version in HEBREW_VERSIONS:
+                    refs += _chapter_refs(meta, version, abbrev, chapters, HEBREW_OUTPUT_DIR)
+
+        report = await run_chapters(engine, _stages(engine, manifest, parser), refs)
+
+    report.print()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parser", choices=PARSERS, default="bs4", help="HTML parser backend, lxml needs the 'fast' extra")
+    http_cache.add_arguments(parser)
+    scrape_manifest.add_arguments(parser)
+    scrape_metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = scrape_metrics.from_args(args)
+    try:
+        asyncio.run(_main(http_cache.from_args(args), scrape_manifest.from_args(args), args.parser, metrics))
+    finally:
+        metrics.export()
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,21 @@
-from time import sleep
+import argparse
+import asyncio
 from rich import print
-import requests
 from bs4 import BeautifulSoup
+from biblia.canon import PROTESTANT_BOOKS
+from fetcher import FetchEngine
+import http_cache
+from http_cache import ResponseCache
+import httpx
+import scrape_manifest
+from scrape_manifest import ChapterKey, Manifest
+import scrape_metrics
+from scrape_metrics import ScrapeMetrics
+from scrape_pipeline import ChapterStages, run_chapters
 from pathlib import Path
 import typing as t
 import json
-import unicodedata
+from biblia.normalize import remove_accents
 
 
 
@@ -30,11 +40,12 @@ headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
 }
 
-def _pull_chapter(book: str, chapter: int) -> dict[str, str]:
-    resp = requests.get(GET_CHAPTER.format(BOOK=book, CHAPTER=chapter), headers=headers)
+async def _fetch_chapter(engine: FetchEngine, book: str, chapter: int) -> httpx.Response:
+    resp = await engine.get(GET_CHAPTER.format(BOOK=book, CHAPTER=chapter))
     resp.raise_for_status()
-    raw_html = resp.text
+    return resp
 
+def _parse_chapter(raw_html: str) -> dict[str, str]:
     soup = BeautifulSoup(raw_html, 'html.parser')
     verses: dict[str, str] = {}
 
@@ -53,76 +64,102 @@ def _pull_chapter(book: str, chapter: int) -> dict[str, str]:
 
     return verses
 
-def _download_book(meta: OutputMeta, book: str, abbrev: str, chapters: int) -> None:
-    try:
-        for ch in range(1, chapters +1):
-            output_file = VERSION_OUTPUT_DIR / abbrev / f"{ch}.json"
-            if output_file.exists():
-                continue
-
-            for attempt in range(3):
-              try:
-                chapter_content = _pull_chapter(book, ch)
-                break
-              except Exception as e:
-                print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
-                if attempt < 2:
-                  print("[yellow]Retrying in 10 seconds...[/yellow]")
-                  sleep(10)
-                else:
-                  raise
-
-            new_content = Output(
-                meta=meta,
-                chapter=ch,
-                content=chapter_content
-            )
+class ChapterRef(t.NamedTuple):
+    meta: OutputMeta
+    book: str
+    """Slug in the site's URLs, e.g. "cantares-de-salomao" """
+    abbrev: str
+    chapter: int
 
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, "w") as f:
-                f.write(compact_json(new_content))
+    @property
+    def key(self) -> ChapterKey:
+        return ChapterKey("bkjfiel", "bkjf", self.abbrev, self.chapter)
 
-            print(f"Write [green]{output_file}[/green]")
-    except Exception:
-        print(f"Error on [red]{meta['abbrev']}[/red]")
-        raise
+    @property
+    def output_file(self) -> Path:
+        return VERSION_OUTPUT_DIR / self.abbrev / f"{self.chapter}.json"
 
+def _chapter_refs(meta: OutputMeta, book: str, abbrev: str, chapters: int) -> list[ChapterRef]:
+    return [ChapterRef(meta, book, abbrev, ch) for ch in range(1, chapters + 1)]
 
-def remove_accents(input_str: str) -> str:
-    normalized_str = unicodedata.normalize('NFD', input_str)
-    return ''.join(c for c in normalized_str if unicodedata.category(c) != 'Mn')
+def _parse_ref(ref: ChapterRef, raw_html: str) -> dict[str, str]:
+    return _parse_chapter(raw_html)
 
-def main():
-    book_data = json.loads(Path("json/books.json").read_text())
-    for book in book_data:
-        abbrev = book["abbrev"]["pt"]
-        title = book["name"]
-        chapters = book["chapters"]
-
-        if abbrev == "job":
-            abbrev = "jó"
-
-        meta = OutputMeta(
-            title=title,
-            abbrev=abbrev,
+def _stages(engine: FetchEngine, manifest: Manifest) -> ChapterStages[ChapterRef, dict[str, str]]:
+    async def _fetch(ref: ChapterRef) -> httpx.Response | None:
+        if manifest.should_skip(ref.key, ref.output_file):
+            return None
+
+        return await engine.retry(_fetch_chapter, engine, ref.book, ref.chapter)
+
+    def _write(ref: ChapterRef, resp: httpx.Response, chapter_content: dict[str, str]) -> None:
+        new_content = Output(
+            meta=ref.meta,
+            chapter=ref.chapter,
+            content=chapter_content
         )
 
-        book = remove_accents(title.lower())
-        match abbrev:
-            case "ct":
-                book = "cantares-de-salomao"
+        raw = compact_json(new_content)
+        ref.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(ref.output_file, "w") as f:
+            f.write(raw)
+
+        manifest.mark_done(ref.key, raw, resp)
+        print(f"Write [green]{ref.output_file}[/green]")
+
+    def _failed(ref: ChapterRef, e: BaseException) -> None:
+        manifest.mark_failed(ref.key, e)
+        print(f"Error on [red]{ref.abbrev}[/red]")
+
+    return ChapterStages(_fetch, _parse_ref, _write, _failed)
 
-            case "lm":
-                book = "lamentacoes"
 
-            case "at":
-                book = "atos-dos-apostolos"
+async def _main(cache: ResponseCache | None, manifest: Manifest, metrics: ScrapeMetrics):
+    refs: list[ChapterRef] = []
 
-            case _ if abbrev.startswith("1") or abbrev.startswith("2") or abbrev.startswith("3"):
-                book = book.replace("ª ", "-").replace("º ", "-")
+    async with FetchEngine(headers=headers, cache=cache, metrics=metrics) as engine:
+        for book in PROTESTANT_BOOKS:
+            abbrev = book.abbrev
+            title = book.name
+            chapters = book.chapters
 
-        _download_book(meta, book, abbrev, chapters)
+            meta = OutputMeta(
+                title=title,
+                abbrev=abbrev,
+            )
+
+            book = remove_accents(title.lower())
+            match abbrev:
+                case "ct":
+                    book = "cantares-de-salomao"
+
+                case "lm":
+                    book = "lamentacoes"
+
+                case "at":
+                    book = "atos-dos-apostolos"
+
+                case _ if abbrev.startswith("1") or abbrev.startswith("2") or abbrev.startswith("3"):
+                    book = book.replace("ª ", "-").replace("º ", "-")
+
+            refs += _chapter_refs(meta, book, abbrev, chapters)
 
+        report = await run_chapters(engine, _stages(engine, manifest), refs)
+
+    report.print()
+
+def main():
+    parser = argparse.ArgumentParser()
+    http_cache.add_arguments(parser)
+    scrape_manifest.add_arguments(parser)
+    scrape_metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = scrape_metrics.from_args(args)
+    try:
+        asyncio.run(_main(http_cache.from_args(args), scrape_manifest.from_args(args), metrics))
+    finally:
+        metrics.export()
 
 if __name__ == "__main__":
     main()
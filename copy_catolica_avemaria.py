@@ -2,6 +2,7 @@ import re
 from time import sleep
 from rich import print
 from bs4 import BeautifulSoup
+from biblia.canon import SCHEMES, book_chapters, scheme_books
 from pathlib import Path
 import typing as t
 import json
@@ -10,6 +11,8 @@ from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
+from rate_limit import backoff_delay
+from scrape_manifest import ChapterKey, Manifest
 
 
 BR_OUTPUT_DIR = Path("./json/catolicos/pt-br/")
@@ -34,19 +37,22 @@ headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
 }
 
-options = Options()
-options.headless = True
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
+def _start_driver() -> webdriver.Chrome:
+    """Chrome is only installed and launched when scraping, not on import"""
+    options = Options()
+    options.headless = True
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
 
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
-driver.set_page_load_timeout(3)
+    service = Service(ChromeDriverManager().install())
+    driver = webdriver.Chrome(service=service, options=options)
+    driver.set_page_load_timeout(3)
+    return driver
 
 def compact_json(raw) -> str:
     return json.dumps(raw, separators=(',', ':')).replace("\n", "")
 
-def _pull_chapter(version: str, abbrev: str, chapter: int) -> dict[str, str]:
+def _pull_chapter(driver: webdriver.Chrome, version: str, abbrev: str, chapter: int) -> dict[str, str]:
     url = GET_CHAPTER.format(VERSION=version, ABBREV=abbrev, CHAPTER=chapter)
     try:
         driver.get(url)
@@ -79,17 +85,20 @@ def _pull_chapter(version: str, abbrev: str, chapter: int) -> dict[str, str]:
 
     return verses
 
-def _download_version(meta: OutputMeta, version: str, abbrev: str, chapters: int, output_dir: Path) -> None:
+def _download_version(driver: webdriver.Chrome, manifest: Manifest, meta: OutputMeta, version: str, abbrev: str, chapters: int, output_dir: Path) -> None:
     try:
         for ch in range(1, chapters +1):
             filepath_abbrev = SHORT_ABBREV_MAP[abbrev]
+            key = ChapterKey("bibliacatolica", "ave-maria", filepath_abbrev, ch)
             output_file = output_dir / "ave-maria" / filepath_abbrev / f"{ch}.json"
-            if output_file.exists() and len(json.loads(output_file.read_text())["content"]) > 0:
+            if manifest.should_skip(key):
+                continue
+            if not manifest.redo and output_file.exists() and len(json.loads(output_file.read_text())["content"]) > 0:
                 continue
 
             for attempt in range(3):
               try:
-                chapter_content = _pull_chapter(version, abbrev, ch)
+                chapter_content = _pull_chapter(driver, version, abbrev, ch)
                 if len(chapter_content) == 0:
                   print(f"[red]Empty chapter {abbrev} {ch}[/red]")
                   continue
@@ -97,8 +106,9 @@ def _download_version(meta: OutputMeta, version: str, abbrev: str, chapters: int
               except Exception as e:
                 print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
                 if attempt < 2:
-                  print("[yellow]Retrying in 10 seconds...[/yellow]")
-                  sleep(10)
+                  delay = backoff_delay(attempt)
+                  print(f"[yellow]Retrying in {delay:.1f} seconds...[/yellow]")
+                  sleep(delay)
                 else:
                   raise
 
@@ -108,12 +118,17 @@ def _download_version(meta: OutputMeta, version: str, abbrev: str, chapters: int
                 content=chapter_content
             )
 
+            raw = compact_json(new_content)
             output_file.parent.mkdir(parents=True, exist_ok=True)
             with open(output_file, "w") as f:
-                f.write(compact_json(new_content))
+                f.write(raw)
+
+            if chapter_content:
+                manifest.mark_done(key, raw)
 
             print(f"Write [green]{output_file}[/green]")
-    except Exception:
+    except Exception as e:
+        manifest.mark_failed(key, e)
         print(f"Error on [red]{meta['title']}[/red]")
         raise
 
@@ -123,159 +138,14 @@ class BookRef(t.TypedDict):
     chapters: int
 
 BOOKS: list[BookRef] = [
-    {"name": "Gênesis",              "abbrev": "genesis",              "chapters": 50},
-    {"name": "Êxodo",                "abbrev": "exodo",                "chapters": 40},
-    {"name": "Levítico",             "abbrev": "levitico",             "chapters": 27},
-    {"name": "Números",              "abbrev": "numeros",              "chapters": 36},
-    {"name": "Deuteronômio",         "abbrev": "deuteronomio",         "chapters": 34},
-    {"name": "Josué",                "abbrev": "josue",                "chapters": 24},
-    {"name": "Juízes",               "abbrev": "juizes",               "chapters": 21},
-    {"name": "Rute",                 "abbrev": "rute",                 "chapters": 4},
-    {"name": "1 Samuel",             "abbrev": "i-samuel",             "chapters": 31},
-    {"name": "2 Samuel",             "abbrev": "ii-samuel",            "chapters": 24},
-    {"name": "1 Reis",               "abbrev": "i-reis",               "chapters": 22},
-    {"name": "2 Reis",               "abbrev": "ii-reis",              "chapters": 25},
-    {"name": "1 Crônicas",           "abbrev": "i-cronicas",           "chapters": 29},
-    {"name": "2 Crônicas",           "abbrev": "ii-cronicas",          "chapters": 36},
-    {"name": "Esdras",               "abbrev": "esdras",               "chapters": 10},
-    {"name": "Neemias",              "abbrev": "neemias",              "chapters": 13},
-    {"name": "Tobias",               "abbrev": "tobias",               "chapters": 14},
-    {"name": "Judite",               "abbrev": "judite",               "chapters": 16},
-    {"name": "Ester",                "abbrev": "ester",                "chapters": 10},
-    {"name": "1 Macabeus",           "abbrev": "i-macabeus",           "chapters": 16},
-    {"name": "2 Macabeus",           "abbrev": "ii-macabeus",          "chapters": 15},
-    {"name": "Jó",                   "abbrev": "jo",                   "chapters": 42},
-    {"name": "Salmos",               "abbrev": "salmos",               "chapters": 150},
-    {"name": "Provérbios",           "abbrev": "proverbios",           "chapters": 31},
-    {"name": "Eclesiastes",          "abbrev": "eclesiastes",          "chapters": 12},
-    {"name": "Cântico dos Cânticos", "abbrev": "cantico-dos-canticos", "chapters": 8},
-    {"name": "Sabedoria",            "abbrev": "sabedoria",            "chapters": 19},
-    {"name": "Eclesiástico",         "abbrev": "eclesiastico",         "chapters": 51},
-    {"name": "Isaías",               "abbrev": "isaias",               "chapters": 66},
-    {"name": "Jeremias",             "abbrev": "jeremias",             "chapters": 52},
-    {"name": "Lamentações",          "abbrev": "lamentacoes",          "chapters": 5},
-    {"name": "Baruc",                "abbrev": "baruc",                "chapters": 6},
-    {"name": "Ezequiel",             "abbrev": "ezequiel",             "chapters": 48},
-    {"name": "Daniel",               "abbrev": "daniel",               "chapters": 14},
-    {"name": "Oseias",               "abbrev": "oseias",               "chapters": 14},
-    {"name": "Joel",                 "abbrev": "joel",                 "chapters": 4},
-    {"name": "Amós",                 "abbrev": "amos",                 "chapters": 9},
-    {"name": "Obadias",              "abbrev": "abdias",               "chapters": 1},
-    {"name": "Jonas",                "abbrev": "jonas",                "chapters": 4},
-    {"name": "Miquéias",             "abbrev": "miqueias",             "chapters": 7},
-    {"name": "Naum",                 "abbrev": "naum",                 "chapters": 3},
-    {"name": "Habacuque",            "abbrev": "habacuc",              "chapters": 3},
-    {"name": "Sofonias",             "abbrev": "sofonias",             "chapters": 3},
-    {"name": "Ageu",                 "abbrev": "ageu",                 "chapters": 2},
-    {"name": "Zacarias",             "abbrev": "zacarias",             "chapters": 14},
-    {"name": "Malaquias",            "abbrev": "malaquias",            "chapters": 3},
-    {"name": "Mateus",               "abbrev": "sao-mateus",           "chapters": 28},
-    {"name": "Marcos",               "abbrev": "sao-marcos",           "chapters": 16},
-    {"name": "Lucas",                "abbrev": "sao-lucas",            "chapters": 24},
-    {"name": "João",                 "abbrev": "sao-joao",             "chapters": 21},
-    {"name": "Atos",                 "abbrev": "atos-dos-apostolos",   "chapters": 28},
-    {"name": "Romanos",              "abbrev": "romanos",              "chapters": 16},
-    {"name": "1 Coríntios",          "abbrev": "i-corintios",          "chapters": 16},
-    {"name": "2 Coríntios",          "abbrev": "ii-corintios",         "chapters": 13},
-    {"name": "Gálatas",              "abbrev": "galatas",              "chapters": 6},
-    {"name": "Efésios",              "abbrev": "efesios",              "chapters": 6},
-    {"name": "Filipenses",           "abbrev": "filipenses",           "chapters": 4},
-    {"name": "Colossenses",          "abbrev": "colossenses",          "chapters": 4},
-    {"name": "1 Tessalonicenses",    "abbrev": "i-tessalonicenses",    "chapters": 5},
-    {"name": "2 Tessalonicenses",    "abbrev": "ii-tessalonicenses",   "chapters": 3},
-    {"name": "1 Timóteo",            "abbrev": "i-timoteo",            "chapters": 6},
-    {"name": "2 Timóteo",            "abbrev": "ii-timoteo",           "chapters": 4},
-    {"name": "Tito",                 "abbrev": "tito",                 "chapters": 3},
-    {"name": "Filemom",              "abbrev": "filemon",              "chapters": 1},
-    {"name": "Hebreus",              "abbrev": "hebreus",              "chapters": 13},
-    {"name": "Tiago",                "abbrev": "sao-tiago",            "chapters": 5},
-    {"name": "1 Pedro",              "abbrev": "i-sao-pedro",          "chapters": 5},
-    {"name": "2 Pedro",              "abbrev": "ii-sao-pedro",         "chapters": 3},
-    {"name": "1 João",               "abbrev": "i-sao-joao",           "chapters": 5},
-    {"name": "2 João",               "abbrev": "ii-sao-joao",          "chapters": 1},
-    {"name": "3 João",               "abbrev": "iii-sao-joao",         "chapters": 1},
-    {"name": "Judas",                "abbrev": "sao-judas",                "chapters": 1},
-    {"name": "Apocalipse",           "abbrev": "apocalipse",           "chapters": 22},
+    {"name": book.catholic_name, "abbrev": slug, "chapters": book_chapters(book.abbrev, "a12")}
+    for slug, book in scheme_books("a12")
 ]
 
-SHORT_ABBREV_MAP: dict[str, str] = {
-    "genesis": "gn",
-    "exodo": "ex",
-    "levitico": "lv",
-    "numeros": "nm",
-    "deuteronomio": "dt",
-    "josue": "js",
-    "juizes": "jz",
-    "rute": "rt",
-    "i-samuel": "1sm",
-    "ii-samuel": "2sm",
-    "i-reis": "1rs",
-    "ii-reis": "2rs",
-    "i-cronicas": "1cr",
-    "ii-cronicas": "2cr",
-    "esdras": "ed",
-    "neemias": "ne",
-    "tobias": "tb",
-    "judite": "jt",
-    "ester": "et",
-    "i-macabeus": "1mc",
-    "ii-macabeus": "2mc",
-    "jo": "jó",
-    "salmos": "sl",
-    "proverbios": "pv",
-    "eclesiastes": "ec",
-    "cantico-dos-canticos": "ct",
-    "sabedoria": "sb",
-    "eclesiastico": "si",
-    "isaias": "is",
-    "jeremias": "jr",
-    "lamentacoes": "lm",
-    "baruc": "br",
-    "ezequiel": "ez",
-    "daniel": "dn",
-    "oseias": "os",
-    "joel": "jl",
-    "amos": "am",
-    "abdias": "ob",
-    "jonas": "jn",
-    "miqueias": "mq",
-    "naum": "na",
-    "habacuc": "hc",
-    "sofonias": "sf",
-    "ageu": "ag",
-    "zacarias": "zc",
-    "malaquias": "ml",
-    # NT
-    "sao-mateus": "mt",
-    "sao-marcos": "mc",
-    "sao-lucas": "lc",
-    "sao-joao": "jo",
-    "atos-dos-apostolos": "at",
-    "romanos": "rm",
-    "i-corintios": "1co",
-    "ii-corintios": "2co",
-    "galatas": "gl",
-    "efesios": "ef",
-    "filipenses": "fp",
-    "colossenses": "cl",
-    "i-tessalonicenses": "1ts",
-    "ii-tessalonicenses": "2ts",
-    "i-timoteo": "1tm",
-    "ii-timoteo": "2tm",
-    "tito": "tt",
-    "filemon": "fm",
-    "hebreus": "hb",
-    "sao-tiago": "tg",
-    "i-sao-pedro": "1pe",
-    "ii-sao-pedro": "2pe",
-    "i-sao-joao": "1jo",
-    "ii-sao-joao": "2jo",
-    "iii-sao-joao": "3jo",
-    "sao-judas": "jd",
-    "apocalipse": "ap",
-}
+SHORT_ABBREV_MAP: dict[str, str] = SCHEMES["a12"]
 
-def main():
+def main(driver: webdriver.Chrome):
+    manifest = Manifest()
     for book in BOOKS:
         title = book["name"]
         abbrev = book["abbrev"]
@@ -287,16 +157,17 @@ def main():
         )
 
         for version in BR_VERSIONS:
-            _download_version(meta, version, abbrev, chapters, BR_OUTPUT_DIR)
+            _download_version(driver, manifest, meta, version, abbrev, chapters, BR_OUTPUT_DIR)
 
         for version in US_VERSIONS:
-            _download_version(meta, version, abbrev, chapters, US_OUTPUT_DIR)
+            _download_version(driver, manifest, meta, version, abbrev, chapters, US_OUTPUT_DIR)
 
 
 if __name__ == "__main__":
-    # ch = _pull_chapter("biblia-ave-maria", "genesis", 1)
+    driver = _start_driver()
+    # ch = _pull_chapter(driver, "biblia-ave-maria", "genesis", 1)
     # print(ch)
     try:
-        main()
+        main(driver)
     finally:
         driver.quit()
@@ -1,9 +1,21 @@
+import argparse
+import asyncio
 from collections import defaultdict
 import re
-from time import sleep
 from rich import print
-import requests
 from bs4 import BeautifulSoup
+from biblia.canon import SCHEMES, book_chapters, scheme_books
+import comment_index
+from comment_index import RangesContent
+from fetcher import FetchEngine
+import http_cache
+from http_cache import ResponseCache
+import httpx
+import scrape_manifest
+from scrape_manifest import ChapterKey, Manifest
+import scrape_metrics
+from scrape_metrics import ScrapeMetrics
+from scrape_pipeline import ChapterStages, run_chapters
 from pathlib import Path
 import typing as t
 import json
@@ -37,24 +49,31 @@ def compact_json(raw) -> str:
 def _trim_html(raw_html: str) -> str:
     return BeautifulSoup(raw_html, 'html.parser').get_text(strip=True)
 
-def _pull_chapter_comments(comment_version: str, book: str, chapter: int) -> CommentsOutput:
-    resp = requests.get(GET_CHAPTER.format(COMMENT_VERSION=comment_version, BOOK=book, CHAPTER=chapter), headers=headers)
+async def _fetch_chapter_comments(engine: FetchEngine, comment_version: str, book: str, chapter: int) -> httpx.Response:
+    resp = await engine.get(GET_CHAPTER.format(COMMENT_VERSION=comment_version, BOOK=book, CHAPTER=chapter))
     resp.raise_for_status()
-    raw_html = resp.text
+    return resp
 
+def _parse_chapter_comments(raw_html: str, book: str, chapter: int) -> tuple[CommentsOutput, RangesContent]:
+    """Comments by verse, plus where the ones written for a range of verses end.
+
+    Ranges are kept under their first verse with the end stored apart (see
+    comment_index), so the chapter files keep the verse -> comments format.
+    """
     soup = BeautifulSoup(raw_html, 'html.parser')
     comments: CommentsOutput = defaultdict(list)
+    ranges: RangesContent = defaultdict(list)
 
     comments_div = soup.find('div', id='comentariouno')
     if not comments_div:
         print(f"[yellow]Nenhum comentário encontrado para {book} capítulo {chapter}.[/yellow]")
-        return comments
+        return comments, ranges
 
     all_comments = comments_div.find('p')
     comm_group = all_comments.decode_contents().split("<br/><br/>")
 
     def _append_comment(verse: str, raw_comment: str) -> None:
-        comments[verse].append(_trim_html(raw_comment))
+        comments[str(verse)].append(_trim_html(raw_comment))
 
     for comm in comm_group:
         if match := re.match(SIMPLE_VERSE_PATTERN, comm):
@@ -66,193 +85,107 @@ def _pull_chapter_comments(comment_version: str, book: str, chapter: int) -> Com
         elif match := re.match(RANGE_VERSE_PATTERN, comm):
             verse_range = match.group(1)
             first_verse = int(verse_range.split(".")[1])
+            last_chapter, last_verse = match.group(2).split(".")
             raw_comm = match.group(3)
 
             _append_comment(first_verse, raw_comm)
+            ranges[f"{SHORT_ABBREV_MAP[book]}{chapter}:{first_verse}"].append(
+                (len(comments[str(first_verse)]) - 1, f"{SHORT_ABBREV_MAP[book]}{int(last_chapter)}:{int(last_verse)}")
+            )
 
         else:
             pass
             # comments["CHAPTER"].append(comm)
 
-    return comments
+    return comments, ranges
 
-def _download_version(version: str, abbrev: str, chapters: int, output_dir: Path) -> None:
-    try:
-        for ch in range(1, chapters +1):
-            filepath_abbrev = SHORT_ABBREV_MAP[abbrev]
-            output_file = output_dir / version / filepath_abbrev / f"{ch}.json"
-            if output_file.exists():
-                continue
-
-            for attempt in range(3):
-              try:
-                chapter_comments = _pull_chapter_comments(version, abbrev, ch)
-                break
-              except Exception as e:
-                print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
-                if attempt < 2:
-                  print("[yellow]Retrying in 10 seconds...[/yellow]")
-                  sleep(10)
-                else:
-                  raise
-
-            if not chapter_comments:
-                continue
-
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, "w") as f:
-                f.write(compact_json(chapter_comments))
-
-            print(f"Write [green]{output_file}[/green]")
-    except Exception:
-        print(f"Error on [red]{abbrev}[/red]")
-        raise
+class ChapterRef(t.NamedTuple):
+    version: str
+    abbrev: str
+    """bibliatodo's book slug"""
+    chapter: int
+    output_dir: Path
+
+    @property
+    def key(self) -> ChapterKey:
+        return ChapterKey("bibliatodo", self.version, SHORT_ABBREV_MAP[self.abbrev], self.chapter)
+
+    @property
+    def output_file(self) -> Path:
+        return self.output_dir / self.version / SHORT_ABBREV_MAP[self.abbrev] / f"{self.chapter}.json"
+
+ParsedComments = tuple[CommentsOutput, RangesContent]
+
+def _chapter_refs(version: str, abbrev: str, chapters: int, output_dir: Path) -> list[ChapterRef]:
+    return [ChapterRef(version, abbrev, ch, output_dir) for ch in range(1, chapters + 1)]
+
+def _parse_ref(ref: ChapterRef, raw_html: str) -> ParsedComments:
+    return _parse_chapter_comments(raw_html, ref.abbrev, ref.chapter)
+
+def _stages(engine: FetchEngine, manifest: Manifest) -> ChapterStages[ChapterRef, ParsedComments]:
+    async def _fetch(ref: ChapterRef) -> httpx.Response | None:
+        if manifest.should_skip(ref.key, ref.output_file):
+            return None
+
+        return await engine.retry(_fetch_chapter_comments, engine, ref.version, ref.abbrev, ref.chapter)
+
+    def _write(ref: ChapterRef, resp: httpx.Response, parsed: ParsedComments) -> None:
+        chapter_comments, chapter_ranges = parsed
+        # Only ever called from the pipeline's single writer, the ranges files have no other writer.
+        # Empty chapters too, so ranges from an earlier download don't outlive their comments
+        comment_index.update_ranges(ref.output_dir / ref.version, SHORT_ABBREV_MAP[ref.abbrev], ref.chapter, chapter_ranges)
+        if not chapter_comments:
+            manifest.mark_empty(ref.key, resp)
+            return
+
+        raw = compact_json(chapter_comments)
+        ref.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(ref.output_file, "w") as f:
+            f.write(raw)
+
+        manifest.mark_done(ref.key, raw, resp)
+        print(f"Write [green]{ref.output_file}[/green]")
+
+    def _failed(ref: ChapterRef, e: BaseException) -> None:
+        manifest.mark_failed(ref.key, e)
+        print(f"Error on [red]{ref.abbrev}[/red]")
+
+    return ChapterStages(_fetch, _parse_ref, _write, _failed)
 
 BOOKS: list[BookRef] = [
-    {"name": "Gênesis",              "abbrev": "genesis",              "chapters": 50},
-    {"name": "Êxodo",                "abbrev": "exodo",                "chapters": 40},
-    {"name": "Levítico",             "abbrev": "levitico",             "chapters": 27},
-    {"name": "Números",              "abbrev": "numeros",              "chapters": 36},
-    {"name": "Deuteronômio",         "abbrev": "deuteronomio",         "chapters": 34},
-    {"name": "Josué",                "abbrev": "josue",                "chapters": 24},
-    {"name": "Juízes",               "abbrev": "juizes",               "chapters": 21},
-    {"name": "Rute",                 "abbrev": "rute",                 "chapters": 4},
-    {"name": "1 Samuel",             "abbrev": "1samuel",              "chapters": 31},
-    {"name": "2 Samuel",             "abbrev": "2samuel",              "chapters": 24},
-    {"name": "1 Reis",               "abbrev": "1reis",                "chapters": 22},
-    {"name": "2 Reis",               "abbrev": "2reis",                "chapters": 25},
-    {"name": "1 Crônicas",           "abbrev": "1cronicas",            "chapters": 29},
-    {"name": "2 Crônicas",           "abbrev": "2cronicas",            "chapters": 36},
-    {"name": "Esdras",               "abbrev": "esdras",               "chapters": 10},
-    {"name": "Neemias",              "abbrev": "neemias",              "chapters": 13},
-    {"name": "Ester",                "abbrev": "ester",                "chapters": 10},
-    {"name": "Jó",                   "abbrev": "jó",                   "chapters": 42},
-    {"name": "Salmos",               "abbrev": "salmos",               "chapters": 150},
-    {"name": "Provérbios",           "abbrev": "proverbios",           "chapters": 31},
-    {"name": "Eclesiastes",          "abbrev": "eclesiastes",          "chapters": 12},
-    {"name": "Cântico dos Cânticos", "abbrev": "canticos",             "chapters": 8},
-    {"name": "Isaías",               "abbrev": "isaias",               "chapters": 66},
-    {"name": "Jeremias",             "abbrev": "jeremias",             "chapters": 52},
-    {"name": "Lamentações",          "abbrev": "lamentacoes",          "chapters": 5},
-    {"name": "Ezequiel",             "abbrev": "ezequiel",             "chapters": 48},
-    {"name": "Daniel",               "abbrev": "daniel",               "chapters": 12},
-    {"name": "Oseias",               "abbrev": "oseias",               "chapters": 14},
-    {"name": "Joel",                 "abbrev": "joel",                 "chapters": 3},
-    {"name": "Amós",                 "abbrev": "amos",                 "chapters": 9},
-    {"name": "Obadias",              "abbrev": "obadias",              "chapters": 1},
-    {"name": "Jonas",                "abbrev": "jonas",                "chapters": 4},
-    {"name": "Miquéias",             "abbrev": "miqueias",             "chapters": 7},
-    {"name": "Naum",                 "abbrev": "naum",                 "chapters": 3},
-    {"name": "Habacuque",            "abbrev": "habacuque",            "chapters": 3},
-    {"name": "Sofonias",             "abbrev": "sofonias",             "chapters": 3},
-    {"name": "Ageu",                 "abbrev": "ageu",                 "chapters": 2},
-    {"name": "Zacarias",             "abbrev": "zacarias",             "chapters": 14},
-    {"name": "Malaquias",            "abbrev": "malaquias",            "chapters": 3},
-    {"name": "Mateus",               "abbrev": "mateus",               "chapters": 28},
-    {"name": "Marcos",               "abbrev": "marcos",               "chapters": 16},
-    {"name": "Lucas",                "abbrev": "lucas",                "chapters": 24},
-    {"name": "João",                 "abbrev": "joao",                 "chapters": 21},
-    {"name": "Atos",                 "abbrev": "atos",                 "chapters": 28},
-    {"name": "Romanos",              "abbrev": "romanos",              "chapters": 16},
-    {"name": "1 Coríntios",          "abbrev": "1corintios",           "chapters": 16},
-    {"name": "2 Coríntios",          "abbrev": "2corintios",           "chapters": 13},
-    {"name": "Gálatas",              "abbrev": "galatas",              "chapters": 6},
-    {"name": "Efésios",              "abbrev": "efesios",              "chapters": 6},
-    {"name": "Filipenses",           "abbrev": "filipenses",           "chapters": 4},
-    {"name": "Colossenses",          "abbrev": "colossenses",          "chapters": 4},
-    {"name": "1 Tessalonicenses",    "abbrev": "1tessalonicenses",     "chapters": 5},
-    {"name": "2 Tessalonicenses",    "abbrev": "2tessalonicenses",     "chapters": 3},
-    {"name": "1 Timóteo",            "abbrev": "1timoteo",             "chapters": 6},
-    {"name": "2 Timóteo",            "abbrev": "2timoteo",             "chapters": 4},
-    {"name": "Tito",                 "abbrev": "tito",                 "chapters": 3},
-    {"name": "Filemom",              "abbrev": "filemom",              "chapters": 1},
-    {"name": "Hebreus",              "abbrev": "hebreus",              "chapters": 13},
-    {"name": "Tiago",                "abbrev": "tiago",                "chapters": 5},
-    {"name": "1 Pedro",              "abbrev": "1pedro",               "chapters": 5},
-    {"name": "2 Pedro",              "abbrev": "2pedro",               "chapters": 3},
-    {"name": "1 João",               "abbrev": "1joao",                "chapters": 5},
-    {"name": "2 João",               "abbrev": "2joao",                "chapters": 1},
-    {"name": "3 João",               "abbrev": "3joao",                "chapters": 1},
-    {"name": "Judas",                "abbrev": "judas",                "chapters": 1},
-    {"name": "Apocalipse",           "abbrev": "apocalipse",           "chapters": 22},
+    {"name": book.name, "abbrev": slug, "chapters": book_chapters(book.abbrev, "bibliatodo")}
+    for slug, book in scheme_books("bibliatodo")
 ]
 
-SHORT_ABBREV_MAP: dict[str, str] = {
-    "genesis": "gn",
-    "exodo": "ex",
-    "levitico": "lv",
-    "numeros": "nm",
-    "deuteronomio": "dt",
-    "josue": "js",
-    "juizes": "jz",
-    "rute": "rt",
-    "1samuel": "1sm",
-    "2samuel": "2sm",
-    "1reis": "1rs",
-    "2reis": "2rs",
-    "1cronicas": "1cr",
-    "2cronicas": "2cr",
-    "esdras": "ed",
-    "neemias": "ne",
-    "ester": "et",
-    "jó": "jó",
-    "salmos": "sl",
-    "proverbios": "pv",
-    "eclesiastes": "ec",
-    "canticos": "ct",
-    "isaias": "is",
-    "jeremias": "jr",
-    "lamentacoes": "lm",
-    "ezequiel": "ez",
-    "daniel": "dn",
-    "oseias": "os",
-    "joel": "jl",
-    "amos": "am",
-    "obadias": "ob",
-    "jonas": "jn",
-    "miqueias": "mq",
-    "naum": "na",
-    "habacuque": "hc",
-    "sofonias": "sf",
-    "ageu": "ag",
-    "zacarias": "zc",
-    "malaquias": "ml",
-    "mateus": "mt",
-    "marcos": "mc",
-    "lucas": "lc",
-    "joao": "jo",
-    "atos": "at",
-    "romanos": "rm",
-    "1corintios": "1co",
-    "2corintios": "2co",
-    "galatas": "gl",
-    "efesios": "ef",
-    "filipenses": "fp",
-    "colossenses": "cl",
-    "1tessalonicenses": "1ts",
-    "2tessalonicenses": "2ts",
-    "1timoteo": "1tm",
-    "2timoteo": "2tm",
-    "tito": "tt",
-    "filemom": "fm",
-    "hebreus": "hb",
-    "tiago": "tg",
-    "1pedro": "1pe",
-    "2pedro": "2pe",
-    "1joao": "1jo",
-    "2joao": "2jo",
-    "3joao": "3jo",
-    "judas": "jd",
-    "apocalipse": "ap",
-}
+SHORT_ABBREV_MAP: dict[str, str] = SCHEMES["bibliatodo"]
+
+async def _main(cache: ResponseCache | None, manifest: Manifest, metrics: ScrapeMetrics):
+    refs: list[ChapterRef] = []
+
+    async with FetchEngine(headers=headers, cache=cache, metrics=metrics) as engine:
+        for book in BOOKS:
+            abbrev = book["abbrev"]
+            chapters = book["chapters"]
+
+            for version in BR_VERSIONS:
+                refs += _chapter_refs(version, abbrev, chapters, BR_OUTPUT_DIR)
+
+        report = await run_chapters(engine, _stages(engine, manifest), refs)
+
+    report.print()
 
 def main():
-    for book in BOOKS:
-        abbrev = book["abbrev"]
-        chapters = book["chapters"]
+    parser = argparse.ArgumentParser()
+    http_cache.add_arguments(parser)
+    scrape_manifest.add_arguments(parser)
+    scrape_metrics.add_arguments(parser)
+    args = parser.parse_args()
 
-        for version in BR_VERSIONS:
-            _download_version(version, abbrev, chapters, BR_OUTPUT_DIR)
+    metrics = scrape_metrics.from_args(args)
+    try:
+        asyncio.run(_main(http_cache.from_args(args), scrape_manifest.from_args(args), metrics))
+    finally:
+        metrics.export()
 
 
 if __name__ == "__main__":
@@ -1,12 +1,21 @@
+import argparse
+import asyncio
 import re
-from time import sleep
 from rich import print
-import requests
 from bs4 import BeautifulSoup
+from biblia.canon import PROTESTANT_BOOKS, Book
+from fetcher import FetchEngine
+import http_cache
+from http_cache import ResponseCache
+import httpx
+import scrape_manifest
+from scrape_manifest import ChapterKey, Manifest
+import scrape_metrics
+from scrape_metrics import ScrapeMetrics
+from scrape_pipeline import ChapterStages, run_chapters
 from pathlib import Path
 import typing as t
 import json
-import threading
 
 
 BR_OUTPUT_DIR = Path("./json/pt-br/")
@@ -28,6 +37,8 @@ GET_US_CHAPTER = "https://www.jw.org/en/library/bible/study-bible/books/{BOOK}/{
 # https://www.jw.org/en/library/bible/study-bible/books/john/8/
 BR_VERSIONS = ["tnm"]
 US_VERSIONS = [] # tnw
+WORKERS = 5
+"""How many chapters are downloaded at once"""
 
 def compact_json(raw) -> str:
     return json.dumps(raw, separators=(',', ':')).replace("\n", "")
@@ -36,11 +47,16 @@ def _trim_verse_txt(raw: str, cur_verse: str) -> str:
     raw = raw.lstrip(cur_verse).replace("*", "").replace("+", "").replace("  ", " ").strip()
     return re.sub(r'\s+', ' ', raw)
 
-def _pull_chapter(book: str, chapter: int) -> dict[str, str]:
-    resp = requests.get(GET_BR_CHAPTER.format(BOOK=book, CHAPTER=chapter))
+def _has_bible_text(resp: httpx.Response) -> bool:
+    return 'id="bibleText"' in resp.text
+
+async def _fetch_chapter(engine: FetchEngine, book: str, chapter: int) -> httpx.Response:
+    # A page without the text isn't cached, so a retry downloads it again
+    resp = await engine.get(GET_BR_CHAPTER.format(BOOK=book, CHAPTER=chapter), accept=_has_bible_text)
     resp.raise_for_status()
-    raw_html = resp.text
+    return resp
 
+def _parse_chapter(raw_html: str, book: str, chapter: int) -> dict[str, str]:
     soup = BeautifulSoup(raw_html, 'html.parser')
     verses: dict[str, str] = {}
 
@@ -63,88 +79,111 @@ def _pull_chapter(book: str, chapter: int) -> dict[str, str]:
 
     return verses
 
-def _download_version(meta: OutputMeta, version: str, book: str, abbrev: str, chapters: int, output_dir: Path) -> None:
-    try:
-        for ch in range(1, chapters +1):
-            output_abbrev = "at" if abbrev == "atos" else abbrev
-            output_file = output_dir / version / output_abbrev / f"{ch}.json"
-            if output_file.exists():
-                continue
-
-            for attempt in range(3):
-              try:
-                chapter_content = _pull_chapter(book, ch)
-                break
-              except Exception as e:
-                print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
-                if attempt < 2:
-                  print("[yellow]Retrying in 60 seconds...[/yellow]")
-                  sleep(60)
-                else:
-                  raise
-
-            new_content = Output(
-                meta=meta,
-                chapter=ch,
-                content=chapter_content
-            )
-
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_file, "w") as f:
-                f.write(compact_json(new_content))
-
-            print(f"Write [green]{output_file}[/green]")
-    except Exception:
-        print(f"Error on [red]{meta['title']}[/red]")
-        raise
+class ChapterRef(t.NamedTuple):
+    meta: OutputMeta
+    version: str
+    book: str
+    """Name in jw.org's URLs, e.g. "Cântico-de-Salomão" """
+    abbrev: str
+    chapter: int
+    output_dir: Path
 
-def main():
-    book_data = json.loads(Path("json/books.json").read_text())
-    threads = []
+    @property
+    def key(self) -> ChapterKey:
+        return ChapterKey("jw", self.version, self.abbrev, self.chapter)
+
+    @property
+    def output_file(self) -> Path:
+        return self.output_dir / self.version / self.abbrev / f"{self.chapter}.json"
+
+def _chapter_refs(meta: OutputMeta, version: str, book: str, abbrev: str, chapters: int, output_dir: Path) -> list[ChapterRef]:
+    return [ChapterRef(meta, version, book, abbrev, ch, output_dir) for ch in range(1, chapters + 1)]
+
+def _book_chapters(book: Book) -> list[ChapterRef]:
+    abbrev = book.abbrev
+    title = book.name
+    chapters = book.chapters
+
+    title = title.replace("º ", "-").replace("ª ", "-")
 
-    def process_book(book):
-        abbrev = book["abbrev"]["pt"]
-        title = book["name"]
-        chapters = book["chapters"]
+    meta = OutputMeta(
+        title=title.replace("-", " "),
+        abbrev=abbrev,
+    )
 
-        title = title.replace("º ", "-").replace("ª ", "-")
+    if abbrev == "lm":
+        title = "Lamentações"
+    elif abbrev == "ct":
+        title = "Cântico-de-Salomão"
+    elif abbrev == "fm":
+        title = "Filêmon"
 
-        if abbrev == "job":
-            abbrev = "jó"
-        elif abbrev == "at":
-            abbrev = "atos"
+    refs: list[ChapterRef] = []
+    for version in BR_VERSIONS:
+        refs += _chapter_refs(meta, version, title, abbrev, chapters, BR_OUTPUT_DIR)
 
-        meta = OutputMeta(
-            title=title.replace("-", " "),
-            abbrev="at" if abbrev == "atos" else abbrev,
+    for version in US_VERSIONS:
+        refs += _chapter_refs(meta, version, title, abbrev, chapters, US_OUTPUT_DIR)
+
+    return refs
+
+async def _fetch_bible_text(engine: FetchEngine, book: str, chapter: int) -> httpx.Response:
+    resp = await _fetch_chapter(engine, book, chapter)
+    # jw.org sometimes answers 200 with a page that has no text yet, fetch it again
+    if not _has_bible_text(resp):
+        raise ValueError(f"No bibleText in {resp.url}")
+
+    return resp
+
+def _parse_ref(ref: ChapterRef, raw_html: str) -> dict[str, str]:
+    return _parse_chapter(raw_html, ref.book, ref.chapter)
+
+def _stages(engine: FetchEngine, manifest: Manifest) -> ChapterStages[ChapterRef, dict[str, str]]:
+    async def _fetch(ref: ChapterRef) -> httpx.Response | None:
+        if manifest.should_skip(ref.key, ref.output_file):
+            return None
+
+        return await engine.retry(_fetch_bible_text, engine, ref.book, ref.chapter)
+
+    def _write(ref: ChapterRef, resp: httpx.Response, chapter_content: dict[str, str]) -> None:
+        new_content = Output(
+            meta=ref.meta,
+            chapter=ref.chapter,
+            content=chapter_content
         )
 
-        if abbrev == "lm":
-            title = "Lamentações"
-        elif abbrev == "ct":
-            title = "Cântico-de-Salomão"
-        elif abbrev == "fm":
-            title = "Filêmon"
+        raw = compact_json(new_content)
+        ref.output_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(ref.output_file, "w") as f:
+            f.write(raw)
 
-        for version in BR_VERSIONS:
-            _download_version(meta, version, title, abbrev, chapters, BR_OUTPUT_DIR)
+        manifest.mark_done(ref.key, raw, resp)
+        print(f"Write [green]{ref.output_file}[/green]")
 
-        for version in US_VERSIONS:
-            _download_version(meta, version, title, abbrev, chapters, US_OUTPUT_DIR)
+    def _failed(ref: ChapterRef, e: BaseException) -> None:
+        manifest.mark_failed(ref.key, e)
 
-    semaphore = threading.Semaphore(5)
+    return ChapterStages(_fetch, _parse_ref, _write, _failed)
 
-    def thread_function(book):
-        with semaphore:
-            process_book(book)
+async def _main(cache: ResponseCache | None, manifest: Manifest, metrics: ScrapeMetrics):
+    async with FetchEngine(workers=WORKERS, cache=cache, metrics=metrics) as engine:
+        refs = (ref for book in PROTESTANT_BOOKS for ref in _book_chapters(book))
+        report = await run_chapters(engine, _stages(engine, manifest), refs)
 
-    for book in book_data:
-        thread = threading.Thread(target=thread_function, args=(book,))
-        threads.append(thread)
-        thread.start()
+    report.print()
 
-    for thread in threads:
-        thread.join()
+def main():
+    parser = argparse.ArgumentParser()
+    http_cache.add_arguments(parser)
+    scrape_manifest.add_arguments(parser)
+    scrape_metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    metrics = scrape_metrics.from_args(args)
+    try:
+        asyncio.run(_main(http_cache.from_args(args), scrape_manifest.from_args(args), metrics))
+    finally:
+        metrics.export()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+# Export the json/ tree to Parquet for analytics, so notebooks stop walking
+# thousands of JSON files:
+#
+#   build/parquet/verses/version=<name>/verses.parquet   one file per version
+#   build/parquet/titles.parquet
+#   build/parquet/refs.parquet                            one row per target range
+#   build/parquet/comments.parquet
+#
+# Rows are in canonical order and version/lang/book are dictionary encoded, so
+# filters on book and chapter skip whole pages. `ordinal` is the canonical verse
+# (see versification), -1 for verses protestant bibles don't have, and joins the
+# versions and the refs with each other.
+#
+# Needs pyarrow (the 'analytics' extra).
+#
+# Usage:
+#   python export_parquet.py
+#   python export_parquet.py --load     # time reading everything back
+
+import argparse
+import json
+from pathlib import Path
+import time
+import typing as t
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from rich import print
+from biblia.canon import book_sort_key, ordinal as canon_ordinal
+from biblia.corpus import JSON_DIR, format_verse_key, parse_verse_key
+from biblia.references import split_ref, verse_ranges
+from comment_index import COMMENTS_DIR, read_comments
+from packed_corpus import default_version_dirs
+from versification import Versification, layout, ordinal, version_versification
+
+
+OUTPUT_DIR = Path("./build/parquet/")
+REFS_DIR = Path("./json/refs/")
+
+Table = t.Literal["verses", "titles", "refs", "comments"]
+
+_DICT = pa.dictionary(pa.int16(), pa.string())
+
+VERSES_SCHEMA = pa.schema([
+    ("lang", _DICT),
+    ("book", _DICT),
+    ("chapter", pa.int16()),
+    ("verse", pa.int16()),
+    ("part", pa.string()),
+    ("ordinal", pa.int32()),
+    ("text", pa.string()),
+])
+"""version is the partition key, see `load`"""
+
+TITLES_SCHEMA = pa.schema([
+    ("version", _DICT),
+    ("book", _DICT),
+    ("chapter", pa.int16()),
+    ("verse", pa.int16()),
+    ("part", pa.string()),
+    ("title", pa.string()),
+])
+
+REFS_SCHEMA = pa.schema([
+    ("book", _DICT),
+    ("chapter", pa.int16()),
+    ("verse", pa.int16()),
+    ("ordinal", pa.int32()),
+    ("position", pa.int16()),
+    ("target_book", _DICT),
+    ("target_chapter", pa.int16()),
+    ("target_verse_start", pa.int16()),
+    ("target_verse_end", pa.int16()),
+])
+
+COMMENTS_SCHEMA = pa.schema([
+    ("source", _DICT),
+    ("book", _DICT),
+    ("chapter", pa.int16()),
+    ("verse", pa.int16()),
+    ("ordinal", pa.int32()),
+    ("position", pa.int16()),
+    ("end_chapter", pa.int16()),
+    ("end_verse", pa.int16()),
+    ("end_ordinal", pa.int32()),
+    ("text", pa.string()),
+])
+
+
+def _book_dirs(directory: Path) -> list[Path]:
+    return sorted((path for path in directory.iterdir() if path.is_dir()), key=lambda path: book_sort_key(path.name))
+
+
+def _chapter_files(book_dir: Path) -> list[tuple[int, Path]]:
+    return sorted((int(file.stem), file) for file in book_dir.glob("*.json"))
+
+
+def _ordinal(book: str, chapter: int, verse: int, versification: Versification) -> int:
+    try:
+        return layout(versification).to_canon[ordinal(book, chapter, verse, versification)]
+    except KeyError:
+        return -1
+
+
+def _write(rows: dict[str, list], schema: pa.Schema, output_file: Path) -> int:
+    table = pa.table({name: pa.array(rows[name], type=schema.field(name).type) for name in schema.names}, schema=schema)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_suffix(".tmp")
+    pq.write_table(table, tmp, compression="zstd", write_statistics=True)
+    tmp.replace(output_file)
+    return len(table)
+
+
+def export_version(version_dir: Path, titles: dict[str, list], output_dir: Path = OUTPUT_DIR) -> int:
+    """Write the verses of a version, and collect its titles in `titles`"""
+    versification = version_versification(version_dir)
+    lang = version_dir.parent.relative_to(JSON_DIR).as_posix()
+    verses: dict[str, list] = {name: [] for name in VERSES_SCHEMA.names}
+
+    for book_dir in _book_dirs(version_dir):
+        for chapter, file in _chapter_files(book_dir):
+            raw = json.loads(file.read_text(encoding="utf-8"))
+            for (verse, part), text in sorted((parse_verse_key(key), value) for key, value in raw["content"].items()):
+                for name, value in zip(VERSES_SCHEMA.names, (
+                    lang, book_dir.name, chapter, verse, _part(verse, part),
+                    _ordinal(book_dir.name, chapter, verse, versification), text,
+                )):
+                    verses[name].append(value)
+
+            for (verse, part), title in sorted((parse_verse_key(key), value) for key, value in raw.get("titles", {}).items()):
+                for name, value in zip(TITLES_SCHEMA.names, (version_dir.name, book_dir.name, chapter, verse, _part(verse, part), title)):
+                    titles[name].append(value)
+
+    return _write(verses, VERSES_SCHEMA, output_dir / "verses" / f"version={version_dir.name}" / "verses.parquet")
+
+
+def _part(verse: int, part: int) -> str:
+    return format_verse_key(verse, part).removeprefix(str(verse))
+
+
+def export_refs(refs_dir: Path = REFS_DIR, output_dir: Path = OUTPUT_DIR) -> int:
+    rows: dict[str, list] = {name: [] for name in REFS_SCHEMA.names}
+    for file in sorted(refs_dir.glob("*.json"), key=lambda file: book_sort_key(file.stem)):
+        refs: dict[str, list[str]] = json.loads(file.read_text(encoding="utf-8"))
+        for source, targets in refs.items():
+            book, chapter, verse = split_ref(source)
+            source_ordinal = canon_ordinal(book, int(chapter), int(verse))
+            position = 0
+            for target in targets:
+                target_book, target_chapter, target_verses = split_ref(target)
+                for start, end in verse_ranges(target_verses):
+                    for name, value in zip(REFS_SCHEMA.names, (
+                        book, int(chapter), int(verse), source_ordinal, position, target_book, int(target_chapter), start, end,
+                    )):
+                        rows[name].append(value)
+                    position += 1
+
+    return _write(rows, REFS_SCHEMA, output_dir / "refs.parquet")
+
+
+def export_comments(comments_dir: Path = COMMENTS_DIR, output_dir: Path = OUTPUT_DIR) -> int:
+    rows: dict[str, list] = {name: [] for name in COMMENTS_SCHEMA.names}
+    for comment in read_comments(comments_dir):
+        for name, value in zip(COMMENTS_SCHEMA.names, (
+            comments_dir.name, comment.book, comment.chapter, comment.verse,
+            _ordinal(comment.book, comment.chapter, comment.verse, "protestant"), comment.position,
+            comment.end_chapter, comment.end_verse, _ordinal(comment.book, comment.end_chapter, comment.end_verse, "protestant"), comment.text,
+        )):
+            rows[name].append(value)
+
+    return _write(rows, COMMENTS_SCHEMA, output_dir / "comments.parquet")
+
+
+def export(output_dir: Path = OUTPUT_DIR, version_dirs: list[Path] | None = None) -> None:
+    if version_dirs is None:
+        version_dirs = default_version_dirs()
+
+    titles: dict[str, list] = {name: [] for name in TITLES_SCHEMA.names}
+    for version_dir in version_dirs:
+        start = time.perf_counter()
+        count = export_version(version_dir, titles, output_dir)
+        print(f"Write {version_dir.name}: {count} verses in {time.perf_counter() - start:.2f}s")
+
+    print(f"Write titles: {_write(titles, TITLES_SCHEMA, output_dir / 'titles.parquet')} titles")
+    print(f"Write refs: {export_refs(REFS_DIR, output_dir)} refs")
+    print(f"Write comments: {export_comments(COMMENTS_DIR, output_dir)} comments")
+
+
+def load(table: Table = "verses", columns: list[str] | None = None, filter: ds.Expression | None = None, output_dir: Path = OUTPUT_DIR) -> pa.Table:
+    """Read an exported table, e.g. load("verses", ["book", "text"], ds.field("version") == "acf").
+
+    Only the requested columns are decoded and `filter` skips partitions and row
+    groups through their statistics. `.to_pandas()` on the result for a dataframe.
+    """
+    if table == "verses":
+        dataset = ds.dataset(output_dir / "verses", format="parquet", partitioning=ds.HivePartitioning.discover(infer_dictionary=True))
+    else:
+        dataset = ds.dataset(output_dir / f"{table}.parquet", format="parquet")
+
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--load", action="store_true", help="Time loading the exported tables instead")
+    args = parser.parse_args()
+
+    if not args.load:
+        start = time.perf_counter()
+        export(args.output_dir)
+        print(f"Exported to {args.output_dir} in {time.perf_counter() - start:.2f}s")
+        return
+
+    for table in t.get_args(Table):
+        start = time.perf_counter()
+        loaded = load(table, output_dir=args.output_dir)
+        print(f"Load [bold]{table}[/bold]: {loaded.num_rows} rows in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+import asyncio
+from functools import partial
+from rich import print
+import httpx
+from http_cache import CacheMiss, CachedResponse, ResponseCache
+from rate_limit import BACKOFF, MAX_BACKOFF, HostLimiter, backoff_delay, is_throttled, parse_retry_after
+from scrape_metrics import ScrapeMetrics
+import typing as t
+from urllib.parse import urlsplit
+
+
+T = t.TypeVar("T")
+
+Job = t.Callable[[], t.Awaitable[T]]
+"""A unit of work for the queue, e.g. downloading a single chapter"""
+
+PER_HOST_LIMIT = 8
+"""Max in-flight requests to the same host, the request rate is up to its HostLimiter"""
+MAX_CONNECTIONS = 32
+WORKERS = 16
+"""How many jobs are pulled from the queue at once"""
+TIMEOUT = 30.0
+RETRIES = 5
+
+
+class FetchEngine:
+    """Async HTTP client shared by every copy_* scraper.
+
+    Keeps a pool of keep-alive connections, limits concurrency per host and
+    runs chapter jobs from a queue, so a download is bound by the remote host
+    instead of by round-trip latency.
+
+    Each host gets a `rate_limit.HostLimiter`: the request rate grows while
+    responses are healthy and halves on 429/5xx/timeouts, honoring
+    Retry-After, so it settles near what the host tolerates. Failed jobs are
+    retried after a jittered exponential delay (see `retry`).
+
+    When a `cache` is given, successful responses are stored on disk and
+    served from there on the next run (see `http_cache.ResponseCache`).
+    A request's `accept` rejects responses that are successful but useless,
+    e.g. a page without the text yet: they are neither stored nor served
+    from the cache, so retrying the request goes to the network again.
+
+    With `mock_server` every request goes to that `mock_server.MockServer`
+    instead, as `<mock_server>/<cache key>`, so recorded fixtures (cache
+    entries) are replayed without touching the real hosts.
+
+    Requests and retries are recorded in `metrics`, which the scripts also
+    use to time their parsing and writing (see `scrape_metrics`).
+    """
+
+    def __init__(
+        self,
+        *,
+        headers: dict[str, str] | None = None,
+        per_host_limit: int = PER_HOST_LIMIT,
+        max_connections: int = MAX_CONNECTIONS,
+        workers: int = WORKERS,
+        timeout: float = TIMEOUT,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        max_backoff: float = MAX_BACKOFF,
+        cache: ResponseCache | None = None,
+        mock_server: str | None = None,
+        metrics: ScrapeMetrics | None = None,
+    ) -> None:
+        if retries < 1:
+            raise ValueError(f"retries must be at least 1, got {retries}")
+
+        self.headers = headers or {}
+        self.per_host_limit = per_host_limit
+        self.max_connections = max_connections
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self.mock_server = mock_server
+        self.metrics = metrics or ScrapeMetrics(directory=None)
+
+        self._client: httpx.AsyncClient | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._limiters: dict[str, HostLimiter] = {}
+
+    async def __aenter__(self) -> "FetchEngine":
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+
+        return self._host_limits[host]
+
+    def limiter(self, host: str) -> HostLimiter:
+        if host not in self._limiters:
+            self._limiters[host] = HostLimiter()
+
+        return self._limiters[host]
+
+    async def _send(self, method: str, url: str, target: str, **kwargs) -> httpx.Response:
+        assert self._client is not None
+        host = urlsplit(url).netloc
+        limiter = self.limiter(host)
+        async with self._host_limit(host):
+            if waited := await limiter.acquire():
+                self.metrics.observe_throttle(host, waited)
+
+            sent_at = limiter.clock()
+            try:
+                resp = await self._client.request(method, target, **kwargs)
+            except Exception as e:
+                if isinstance(e, httpx.TimeoutException):
+                    limiter.on_throttled(sent_at)
+                self.metrics.observe_error(host, e)
+                raise
+
+        if is_throttled(resp.status_code):
+            limiter.on_throttled(sent_at, parse_retry_after(resp.headers.get("Retry-After")))
+        else:
+            limiter.on_success()
+
+        self.metrics.observe_response(host, limiter.clock() - sent_at, resp.status_code, len(resp.content))
+        self.metrics.observe_rate(host, limiter.rate)
+        return resp
+
+    async def request(
+        self, method: str, url: str, *, accept: t.Callable[[httpx.Response], bool] | None = None, **kwargs
+    ) -> httpx.Response:
+        """`accept` is called on successful responses, only the accepted ones are cached"""
+        if self._client is None:
+            raise RuntimeError("FetchEngine must be used as 'async with FetchEngine() as engine'")
+
+        payload = {name: kwargs[name] for name in ("params", "data", "json") if kwargs.get(name) is not None}
+        if self.mock_server is not None:
+            return await self._send(method, url, f"{self.mock_server}/{ResponseCache.key(method, url, payload)}", **kwargs)
+
+        if self.cache is None:
+            return await self._send(method, url, url, **kwargs)
+
+        key = self.cache.key(method, url, payload)
+        if cached := self.cache.get(key):
+            resp = httpx.Response(
+                cached["status_code"],
+                headers=cached["headers"],
+                content=cached["content"],
+                request=httpx.Request(method, cached["url"]),
+            )
+            # Replays serve whatever was recorded, otherwise a rejected entry is fetched again
+            if self.cache.replay or accept is None or accept(resp):
+                self.metrics.observe_cache_hit(urlsplit(url).netloc)
+                return resp
+
+            self.cache.delete(key)
+
+        if self.cache.replay:
+            raise CacheMiss(f"{method} {url} is not cached")
+
+        resp = await self._send(method, url, url, **kwargs)
+        if resp.is_success and (accept is None or accept(resp)):
+            self.cache.put(key, CachedResponse(
+                url=str(resp.url),
+                status_code=resp.status_code,
+                headers={
+                    name: value for name, value in resp.headers.items()
+                    if name not in ("content-encoding", "content-length", "transfer-encoding")
+                },
+                content=resp.content,
+            ))
+
+        return resp
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def retry(self, fn: t.Callable[..., t.Awaitable[T]], *args) -> T:
+        """Call `fn` until it succeeds, sleeping a jittered exponential delay between attempts.
+
+        Only the failing job waits; a Retry-After is enforced by the host's
+        limiter for every request to that host, including this one's retry.
+        """
+        for attempt in range(self.retries):
+            try:
+                return await fn(*args)
+            except CacheMiss:
+                raise
+            except Exception as e:
+                print(f"[red]Attempt {attempt + 1} failed:[/red] {e}")
+                if attempt < self.retries - 1:
+                    delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+                    print(f"[yellow]Retrying in {delay:.1f} seconds...[/yellow]")
+                    self.metrics.observe_retry(delay)
+                    await asyncio.sleep(delay)
+                else:
+                    self.metrics.observe_failure()
+                    raise
+
+        raise RuntimeError("unreachable")
+
+    async def stream(
+        self, jobs: t.Iterable[Job[T]], *, retry: bool = True
+    ) -> t.AsyncIterator[T]:
+        """Run jobs on at most `self.workers` workers, yielding results as they finish.
+
+        Jobs are pulled lazily from `jobs`, each one is retried inside the
+        pool (see `retry`) and the first job that still fails cancels the
+        other workers and is re-raised to the caller.
+        """
+        pending = iter(jobs)
+        done: asyncio.Queue[tuple[bool, t.Any]] = asyncio.Queue(maxsize=self.workers)
+
+        async def worker() -> None:
+            for job in pending:
+                try:
+                    result = await (self.retry(job) if retry else job())
+                except Exception as e:
+                    await done.put((False, e))
+                    return
+
+                await done.put((True, result))
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        finished = asyncio.ensure_future(asyncio.wait(workers))
+
+        try:
+            while not finished.done() or not done.empty():
+                if finished.done():
+                    ok, value = done.get_nowait()
+                else:
+                    get = asyncio.create_task(done.get())
+                    await asyncio.wait({get, finished}, return_when=asyncio.FIRST_COMPLETED)
+                    if not get.done():
+                        get.cancel()
+                        continue
+
+                    ok, value = get.result()
+
+                if not ok:
+                    raise value
+
+                yield value
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            finished.cancel()
+
+    async def run(self, jobs: t.Iterable[Job[T]]) -> list[T]:
+        """Run every job through the pool and return results in the order of `jobs`.
+
+        Jobs are expected to handle their own retries (e.g. through `retry`).
+        """
+
+        async def _indexed(idx: int, job: Job[T]) -> tuple[int, T]:
+            return idx, await job()
+
+        results = [
+            item
+            async for item in self.stream(
+                (partial(_indexed, idx, job) for idx, job in enumerate(jobs)),
+                retry=False,
+            )
+        ]
+        return [result for _, result in sorted(results, key=lambda item: item[0])]
@@ -0,0 +1,148 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+import typing as t
+
+
+CACHE_DIR = Path("./.cache/http/")
+MAX_SIZE_MB = 2048
+EVICT_TO = 0.9
+"""After going over the cap, evict until the cache is back to 90% of it"""
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request is not in the cache"""
+
+
+class CachedResponse(t.TypedDict):
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+
+
+class ResponseCache:
+    """Content-addressed, gzip compressed, on-disk cache of HTTP responses.
+
+    Entries are keyed by method + URL + payload and stored as
+    `<dir>/<key[:2]>/<key>.gz`. Reads bump the file mtime, so eviction drops
+    the least recently used entries once the cache grows past `max_bytes`.
+    In `replay` mode the network is never touched: a miss raises `CacheMiss`.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = MAX_SIZE_MB * 1024**2, replay: bool = False) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self._size: int | None = None
+
+    @staticmethod
+    def key(method: str, url: str, payload: t.Any = None) -> str:
+        raw = json.dumps([method.upper(), url, payload], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.gz"
+
+    def get(self, key: str, touch: bool = True) -> CachedResponse | None:
+        """`touch=False` reads without counting as a use for eviction"""
+        path = self._path(key)
+        try:
+            raw = gzip.decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+
+        if touch:
+            path.touch()
+        header, content = raw.split(b"\n", 1)
+        meta = json.loads(header)
+        return CachedResponse(url=meta["url"], status_code=meta["status_code"], headers=meta["headers"], content=content)
+
+    def put(self, key: str, response: CachedResponse) -> None:
+        header = json.dumps({
+            "url": response["url"],
+            "status_code": response["status_code"],
+            "headers": response["headers"],
+        })
+        raw = gzip.compress(header.encode() + b"\n" + response["content"])
+
+        path = self._path(key)
+        # Before the write, so the total doesn't count the new entry yet; a replaced one no longer counts
+        size = self.size()
+        try:
+            size -= path.stat().st_size
+        except FileNotFoundError:
+            pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, path)
+
+        self._size = size + len(raw)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+
+        if self._size is not None:
+            self._size -= size
+
+    def _entries(self) -> list[os.DirEntry]:
+        if not self.directory.exists():
+            return []
+
+        return [
+            entry
+            for bucket in os.scandir(self.directory) if bucket.is_dir()
+            for entry in os.scandir(bucket.path) if entry.name.endswith(".gz")
+        ]
+
+    def keys(self) -> list[str]:
+        return [entry.name.removesuffix(".gz") for entry in self._entries()]
+
+    def size(self) -> int:
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self._entries())
+
+        return self._size
+
+    def evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        size = sum(entry.stat().st_size for entry in entries)
+        target = self.max_bytes * EVICT_TO
+
+        for entry in entries:
+            if size <= target:
+                break
+
+            size -= entry.stat().st_size
+            os.unlink(entry.path)
+
+        self._size = size
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("http cache")
+    group.add_argument("--replay", action="store_true", help="Serve every request from the local cache and never touch the network")
+    group.add_argument("--no-cache", action="store_true", help="Neither read nor write the local cache")
+    group.add_argument("--cache-dir", type=Path, default=CACHE_DIR)
+    group.add_argument("--cache-max-mb", type=int, default=MAX_SIZE_MB)
+
+
+def from_args(args: argparse.Namespace) -> ResponseCache | None:
+    if args.no_cache:
+        if args.replay:
+            raise SystemExit("--replay needs the cache, drop --no-cache")
+        return None
+
+    return ResponseCache(args.cache_dir, args.cache_max_mb * 1024**2, replay=args.replay)
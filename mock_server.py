@@ -0,0 +1,172 @@
+# Local stand-in for the scraped sites: replays recorded fixtures over HTTP with
+# configurable latency, jitter, 429 and 5xx injection, so scrapers can be
+# benchmarked (see bench_scrapers) without network access.
+#
+# Fixtures are http_cache entries, one directory per source, and requests are
+# addressed by their cache key: a FetchEngine created with mock_server=<url>
+# sends `GET <url>/<key>` for what would have been a request to the real host.
+#
+#   GET /_stats   requests served, missing fixtures and injected failures
+#
+# Usage:
+#   python mock_server.py fixtures/scrapers/jw --port 8765 --latency-ms 80 --jitter-ms 40
+#   python mock_server.py fixtures/scrapers/* --rate-limit 0.05 --server-error 0.02
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import random
+import typing as t
+from rich import print
+from http_cache import CachedResponse, ResponseCache
+
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+HOP_BY_HOP = {"connection", "keep-alive"}
+"""Recorded headers that would describe the original connection, not ours"""
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class Faults(t.NamedTuple):
+    latency: float = 0.0
+    """Seconds before every response"""
+    jitter: float = 0.0
+    """Up to this many seconds added to `latency`, uniformly"""
+    rate_limit: float = 0.0
+    """Probability of answering 429 with Retry-After instead of the fixture"""
+    retry_after: int = 1
+    server_error: float = 0.0
+    """Probability of answering 500/503"""
+
+
+class Stats(t.TypedDict):
+    requests: int
+    served: int
+    missing: int
+    rate_limited: int
+    server_errors: int
+
+
+def load_fixtures(directories: t.Iterable[Path]) -> dict[str, CachedResponse]:
+    """Cache key -> response of every entry in the given http_cache directories"""
+    fixtures: dict[str, CachedResponse] = {}
+    for directory in directories:
+        cache = ResponseCache(directory)
+        for key in cache.keys():
+            if fixture := cache.get(key, touch=False):
+                fixtures[key] = fixture
+
+    return fixtures
+
+
+def _response(status: int, content: bytes, headers: dict[str, str] | None = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items() if name.lower() not in HOP_BY_HOP]
+    lines.append(f"Content-Length: {len(content)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + content
+
+
+class MockServer:
+    def __init__(self, fixtures: dict[str, CachedResponse], faults: Faults = Faults(), seed: int | None = None) -> None:
+        self.fixtures = fixtures
+        self.faults = faults
+        self.random = random.Random(seed)
+        self.stats = Stats(requests=0, served=0, missing=0, rate_limited=0, server_errors=0)
+
+    def respond(self, path: str) -> bytes:
+        if path == "/_stats":
+            return _response(200, json.dumps(self.stats).encode(), {"Content-Type": "application/json"})
+
+        self.stats["requests"] += 1
+        roll = self.random.random()
+        if roll < self.faults.rate_limit:
+            self.stats["rate_limited"] += 1
+            return _response(429, b"", {"Retry-After": str(self.faults.retry_after)})
+        if roll < self.faults.rate_limit + self.faults.server_error:
+            self.stats["server_errors"] += 1
+            return _response(self.random.choice([500, 503]), b"")
+
+        fixture = self.fixtures.get(path.lstrip("/").partition("?")[0])
+        if fixture is None:
+            self.stats["missing"] += 1
+            return _response(404, b"No fixture recorded for this request")
+
+        self.stats["served"] += 1
+        return _response(fixture["status_code"], fixture["content"], fixture["headers"])
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                _, path, _ = request_line.split(" ", 2)
+                headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines if line)}
+                if length := int(headers.get("content-length", 0)):
+                    await reader.readexactly(length)
+
+                delay = self.faults.latency + self.random.uniform(0, self.faults.jitter)
+                if delay and path != "/_stats":
+                    await asyncio.sleep(delay)
+
+                writer.write(self.respond(path))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    return
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = HOST, port: int = PORT, started: t.Callable[[int], None] | None = None) -> None:
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        if started:
+            started(server.sockets[0].getsockname()[1])
+
+        async with server:
+            await server.serve_forever()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("fault injection")
+    group.add_argument("--latency-ms", type=float, default=0)
+    group.add_argument("--jitter-ms", type=float, default=0)
+    group.add_argument("--rate-limit", type=float, default=0, help="Share of requests answered with 429")
+    group.add_argument("--retry-after", type=int, default=1, help="Retry-After of the 429s, in seconds")
+    group.add_argument("--server-error", type=float, default=0, help="Share of requests answered with 500/503")
+    group.add_argument("--seed", type=int, help="Makes the injected latency and failures repeatable")
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    return Faults(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        server_error=args.server_error,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", nargs="+", type=Path, help="Fixture directories, e.g. fixtures/scrapers/jw")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures)
+    server = MockServer(fixtures, faults_from_args(args), args.seed)
+    print(f"Replaying {len(fixtures)} fixtures on [green]http://{args.host}:{args.port}[/green]")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# Compile each version tree (json/<lang>/<version>/<book>/<chapter>.json) into a
+# single packed file that can be mmap'ed and queried without decoding JSON.
+#
+# Layout (little endian):
+#
+#   magic          8 bytes  b"BIBPACK1"
+#   header_len     u32
+#   header         JSON: version, books (abbrev, title, chapter_base, chapters), counts
+#   padding        up to a multiple of 8
+#   chapters       CHAPTER_STRUCT per (book, chapter): first verse row + row count
+#   verses         VERSE_STRUCT per verse, sorted by (book, chapter, verse, part)
+#   text           UTF-8 verse texts, back to back
+#
+# Usage:
+#   python packed_corpus.py                 # builds every version into build/packed/
+#   python packed_corpus.py json/pt-br/acf  # builds a single version
+
+import argparse
+from bisect import bisect_left
+import json
+import mmap
+from pathlib import Path
+import struct
+import typing as t
+from biblia.canon import book_sort_key
+from biblia.corpus import JSON_DIR, Corpus, format_verse_key, parse_verse_key
+
+
+OUTPUT_DIR = Path("./build/packed/")
+
+MAGIC = b"BIBPACK1"
+HEADER_LEN_STRUCT = struct.Struct("<I")
+CHAPTER_STRUCT = struct.Struct("<II")
+"""first verse row, verse row count"""
+VERSE_STRUCT = struct.Struct("<HHHBxII")
+"""book index, chapter, verse, part, text offset, text length"""
+
+class PackedBook(t.TypedDict):
+    abbrev: str
+    title: str
+    chapters: int
+    chapter_base: int
+    """Row of chapter 1 in the chapter table"""
+
+
+class PackedHeader(t.TypedDict):
+    version: str
+    books: list[PackedBook]
+    chapter_count: int
+    verse_count: int
+
+
+def build(version_dir: Path, output_file: Path) -> PackedHeader:
+    book_dirs = sorted(
+        (path for path in version_dir.iterdir() if path.is_dir()),
+        key=lambda path: book_sort_key(path.name),
+    )
+
+    books: list[PackedBook] = []
+    chapter_rows: list[tuple[int, int]] = []
+    verse_rows: list[tuple[int, int, int, int, int, int]] = []
+    text = bytearray()
+
+    for book_idx, book_dir in enumerate(book_dirs):
+        chapters = {int(file.stem): file for file in book_dir.glob("*.json")}
+        last_chapter = max(chapters)
+        title = ""
+
+        books.append(PackedBook(abbrev=book_dir.name, title="", chapters=last_chapter, chapter_base=len(chapter_rows)))
+
+        for chapter in range(1, last_chapter + 1):
+            first_row = len(verse_rows)
+            if chapter not in chapters:
+                chapter_rows.append((first_row, 0))
+                continue
+
+            raw = json.loads(chapters[chapter].read_text(encoding="utf-8"))
+            title = title or raw["meta"]["title"]
+            verses = sorted((parse_verse_key(key), value) for key, value in raw["content"].items())
+
+            for (verse, part), value in verses:
+                encoded = value.encode("utf-8")
+                verse_rows.append((book_idx, chapter, verse, part, len(text), len(encoded)))
+                text += encoded
+
+            chapter_rows.append((first_row, len(verse_rows) - first_row))
+
+        books[-1]["title"] = title
+
+    header = PackedHeader(
+        version=version_dir.name,
+        books=books,
+        chapter_count=len(chapter_rows),
+        verse_count=len(verse_rows),
+    )
+    raw_header = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix_len = len(MAGIC) + HEADER_LEN_STRUCT.size + len(raw_header)
+    padding = b"\0" * (-prefix_len % 8)
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_LEN_STRUCT.pack(len(raw_header)))
+        f.write(raw_header)
+        f.write(padding)
+        for row in chapter_rows:
+            f.write(CHAPTER_STRUCT.pack(*row))
+        for row in verse_rows:
+            f.write(VERSE_STRUCT.pack(*row))
+        f.write(text)
+
+    tmp.replace(output_file)
+    return header
+
+
+class PackedCorpus:
+    """Read-only view over a packed version file.
+
+    Lookups go through the fixed-width tables in the mmap and return slices
+    of the text section, nothing is decoded until `verse` is called.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a packed corpus")
+
+        (header_len,) = HEADER_LEN_STRUCT.unpack_from(self._view, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LEN_STRUCT.size
+        self.header: PackedHeader = json.loads(bytes(self._view[header_start : header_start + header_len]))
+        self.books = {book["abbrev"]: (idx, book) for idx, book in enumerate(self.header["books"])}
+
+        self._chapters_at = header_start + header_len + (-(header_start + header_len) % 8)
+        self._verses_at = self._chapters_at + self.header["chapter_count"] * CHAPTER_STRUCT.size
+        self._text_at = self._verses_at + self.header["verse_count"] * VERSE_STRUCT.size
+
+    def __enter__(self) -> "PackedCorpus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    @property
+    def version(self) -> str:
+        return self.header["version"]
+
+    def _chapter_rows(self, book: str, chapter: int) -> tuple[int, int]:
+        if book not in self.books:
+            return 0, 0
+
+        _, meta = self.books[book]
+        if not 1 <= chapter <= meta["chapters"]:
+            return 0, 0
+
+        return CHAPTER_STRUCT.unpack_from(self._view, self._chapters_at + (meta["chapter_base"] + chapter - 1) * CHAPTER_STRUCT.size)
+
+    def _row(self, row: int) -> tuple[int, int, int, int, int, int]:
+        return VERSE_STRUCT.unpack_from(self._view, self._verses_at + row * VERSE_STRUCT.size)
+
+    def _find_row(self, book: str, chapter: int, verse: int, part: int) -> int | None:
+        first, count = self._chapter_rows(book, chapter)
+        if count == 0:
+            return None
+
+        # Verses are usually numbered 1..n without gaps, so the row is known upfront
+        _, _, first_verse, _, _, _ = self._row(first)
+        guess = first + verse - first_verse
+        if first <= guess < first + count:
+            _, _, row_verse, row_part, _, _ = self._row(guess)
+            if (row_verse, row_part) == (verse, part):
+                return guess
+
+        keys = [self._row(row)[2:4] for row in range(first, first + count)]
+        idx = bisect_left(keys, (verse, part))
+        if idx < count and keys[idx] == (verse, part):
+            return first + idx
+
+        return None
+
+    def verse_bytes(self, book: str, chapter: int, verse: int | str) -> memoryview | None:
+        """UTF-8 text of the verse as a zero-copy slice of the file"""
+        verse, part = parse_verse_key(verse) if isinstance(verse, str) else (verse, 0)
+        row = self._find_row(book, chapter, verse, part)
+        if row is None:
+            return None
+
+        *_, offset, length = self._row(row)
+        return self._view[self._text_at + offset : self._text_at + offset + length]
+
+    def verse(self, book: str, chapter: int, verse: int | str) -> str | None:
+        raw = self.verse_bytes(book, chapter, verse)
+        return str(raw, "utf-8") if raw is not None else None
+
+    def chapter(self, book: str, chapter: int) -> dict[str, str]:
+        first, count = self._chapter_rows(book, chapter)
+        verses = {}
+        for row in range(first, first + count):
+            _, _, verse, part, offset, length = self._row(row)
+            verses[format_verse_key(verse, part)] = str(self._view[self._text_at + offset : self._text_at + offset + length], "utf-8")
+
+        return verses
+
+
+def default_version_dirs() -> list[Path]:
+    """Every version under json/, as biblia.corpus.Corpus finds them"""
+    return list(Corpus().versions.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("versions", nargs="*", type=Path, help="Every version when omitted")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    for version_dir in args.versions or default_version_dirs():
+        output_file = args.output_dir / version_dir.relative_to(JSON_DIR).with_suffix(".bpk")
+        header = build(version_dir, output_file)
+        print(f"Write {output_file}: {len(header['books'])} books, {header['verse_count']} verses")
+
+
+if __name__ == "__main__":
+    main()
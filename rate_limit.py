@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import time
+import typing as t
+
+
+INITIAL_RATE = 4.0
+"""Requests per second to a host before anything is known about it"""
+MIN_RATE = 0.1
+MAX_RATE = 50.0
+INCREASE = 1.0
+"""Requests/s added for every second of healthy responses"""
+DECREASE = 0.5
+"""Rate multiplier on a 429, 5xx or timeout"""
+BURST = 2.0
+"""Tokens a host can accumulate while idle"""
+MAX_RETRY_AFTER = 600.0
+
+BACKOFF = 1.0
+"""Base of the exponential retry delay, in seconds"""
+MAX_BACKOFF = 60.0
+
+
+def is_throttled(status: int) -> bool:
+    """Responses that mean the host wants us to slow down"""
+    return status == 429 or status >= 500
+
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Seconds to wait from a Retry-After header, either delta-seconds or an HTTP date (compared with `now`)"""
+    if not value:
+        return None
+
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - (now or datetime.now(timezone.utc))).total_seconds()
+        except (TypeError, ValueError):
+            return None
+
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF, cap: float = MAX_BACKOFF) -> float:
+    """Delay before retry number `attempt` (from 0): uniform in [0, base * 2^attempt], capped.
+
+    The full jitter spreads the retries of jobs that failed together instead
+    of sending them back to the host at the same instant.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class HostLimiter:
+    """Token bucket for a single host whose rate adapts to how the host responds (AIMD).
+
+    Until the host first pushes back, every healthy response adds 1 request/s,
+    doubling the rate each second (TCP's slow start), so a new host isn't
+    crawled at INITIAL_RATE for minutes. After that, every healthy response
+    adds `increase / rate` requests/s, so the rate grows by about `increase`
+    per second of healthy traffic; a 429, 5xx or timeout multiplies it by
+    `decrease`. Failures of requests sent before the last decrease were sent
+    at the old rate and don't lower it again, so a burst of concurrent 429s
+    halves the rate once instead of collapsing it.
+
+    A Retry-After pauses the whole host, not only the request that got it.
+
+    Times come from `clock`, time.monotonic unless a test injects its own.
+    """
+
+    def __init__(
+        self,
+        rate: float = INITIAL_RATE,
+        *,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        increase: float = INCREASE,
+        decrease: float = DECREASE,
+        burst: float = BURST,
+        clock: t.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+        self.clock = clock
+
+        self.slow_start = True
+        self.tokens = burst
+        self.paused_until = 0.0
+        self._updated = clock()
+        self._decreased_at = 0.0
+
+    async def acquire(self) -> float:
+        """Wait for a token, returns the seconds spent waiting"""
+        start = self.clock()
+        while True:
+            now = self.clock()
+            wait = self.paused_until - now
+            if wait <= 0:
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+
+                wait = (1 - self.tokens) / self.rate
+
+            await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + (1.0 if self.slow_start else self.increase / self.rate))
+
+    def on_throttled(self, sent_at: float, retry_after: float | None = None) -> None:
+        """`sent_at` is the `clock()` at which the failed request was sent"""
+        now = self.clock()
+        if retry_after is not None:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+        if sent_at < self._decreased_at:
+            return
+
+        self.slow_start = False
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.tokens = min(self.tokens, 0.0)
+        self._decreased_at = now
@@ -0,0 +1,174 @@
+# Compile json/refs into a cross reference graph stored as CSR arrays keyed by
+# canonical verse ordinal (see canon.ordinal), for both directions:
+#
+#   forward_indptr / forward_indices   verse -> verses it references
+#   reverse_indptr / reverse_indices   verse -> verses that reference it
+#
+# Arrays are saved as .npy files and memory mapped on load, so queries never
+# decode JSON.
+#
+# Usage:
+#   python refs_graph.py build
+#   python refs_graph.py query jo3:16 --hops 2
+
+import argparse
+from pathlib import Path
+import json
+import time
+import typing as t
+import numpy as np
+from rich import print
+from biblia.canon import VERSE_COUNT, book_sort_key, from_ordinal, ordinal
+from biblia.references import expand_ref, split_ref
+
+
+REFS_DIR = Path("./json/refs/")
+OUTPUT_DIR = Path("./build/refs_graph/")
+ARRAYS = ("forward_indptr", "forward_indices", "reverse_indptr", "reverse_indices")
+
+Direction = t.Literal["out", "in", "both"]
+"""`out` follows what a verse references, `in` who references it"""
+
+
+def _csr(sources: np.ndarray, targets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(VERSE_COUNT + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=VERSE_COUNT), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+def build(refs_dir: Path = REFS_DIR, output_dir: Path = OUTPUT_DIR) -> int:
+    edges: set[tuple[int, int]] = set()
+    for file in sorted(refs_dir.glob("*.json"), key=lambda file: book_sort_key(file.stem)):
+        refs: dict[str, list[str]] = json.loads(file.read_text(encoding="utf-8"))
+        for source, targets in refs.items():
+            book, chapter, verse = split_ref(source)
+            source_ordinal = ordinal(book, int(chapter), int(verse))
+            for target in targets:
+                for target_verse in expand_ref(target):
+                    edges.add((source_ordinal, ordinal(*target_verse)))
+
+    pairs = np.array(sorted(edges), dtype=np.int32).reshape(-1, 2)
+    forward = _csr(pairs[:, 0], pairs[:, 1])
+    reverse = _csr(pairs[:, 1], pairs[:, 0])
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, values in zip(ARRAYS, (*forward, *reverse)):
+        np.save(output_dir / f"{name}.npy", values)
+
+    return len(pairs)
+
+
+class RefsGraph:
+    def __init__(self, directory: Path = OUTPUT_DIR) -> None:
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+        self._forward = arrays["forward_indptr"], arrays["forward_indices"]
+        self._reverse = arrays["reverse_indptr"], arrays["reverse_indices"]
+
+    @property
+    def edges(self) -> int:
+        return len(self._forward[1])
+
+    def references(self, verse: int) -> np.ndarray:
+        """Verses `verse` points to, sorted"""
+        indptr, indices = self._forward
+        return indices[indptr[verse] : indptr[verse + 1]]
+
+    def cited_by(self, verse: int) -> np.ndarray:
+        """Verses that point to `verse`, sorted"""
+        indptr, indices = self._reverse
+        return indices[indptr[verse] : indptr[verse + 1]]
+
+    def _neighbors(self, nodes: np.ndarray, direction: Direction) -> np.ndarray:
+        graphs = {"out": [self._forward], "in": [self._reverse], "both": [self._forward, self._reverse]}[direction]
+        found = [_gather(indptr, indices, nodes) for indptr, indices in graphs]
+        return np.concatenate(found) if len(found) > 1 else found[0]
+
+    def neighborhood(self, verse: int, hops: int = 1, direction: Direction = "out") -> dict[int, np.ndarray]:
+        """Verses first reached at each hop (1..hops), `verse` itself excluded"""
+        seen = np.zeros(VERSE_COUNT, dtype=bool)
+        seen[verse] = True
+        frontier = np.array([verse], dtype=np.int32)
+        reached: dict[int, np.ndarray] = {}
+
+        for hop in range(1, hops + 1):
+            candidates = np.unique(self._neighbors(frontier, direction))
+            frontier = candidates[~seen[candidates]]
+            if not len(frontier):
+                break
+
+            seen[frontier] = True
+            reached[hop] = frontier
+
+        return reached
+
+    def co_citation_count(self, a: int, b: int) -> int:
+        """How many verses reference both `a` and `b`"""
+        return len(np.intersect1d(self.cited_by(a), self.cited_by(b), assume_unique=True))
+
+    def co_cited(self, verse: int, limit: int = 10) -> list[tuple[int, int]]:
+        """Verses most often referenced together with `verse`, as (verse, count)"""
+        others = _gather(*self._forward, self.cited_by(verse))
+        others = others[others != verse]
+        if not len(others):
+            return []
+
+        counts = np.bincount(others, minlength=VERSE_COUNT)
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [(int(other), int(counts[other])) for other in top if counts[other]]
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenated CSR rows of `nodes` without a Python loop"""
+    starts = indptr[nodes]
+    lengths = indptr[nodes + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=indices.dtype)
+
+    # Offset of every output item inside its own row, added to the row start
+    row_offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + row_offsets]
+
+
+def format_ordinal(verse: int) -> str:
+    book, chapter, number = from_ordinal(int(verse))
+    return f"{book}{chapter}:{number}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("verse", nargs="?", help='e.g. "jo3:16"')
+    parser.add_argument("--hops", type=int, default=1)
+    parser.add_argument("--direction", choices=t.get_args(Direction), default="out")
+    parser.add_argument("--graph-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        edges = build(REFS_DIR, args.graph_dir)
+        print(f"Write {args.graph_dir}: {edges} edges in {time.perf_counter() - start:.2f}s")
+        return
+
+    if not args.verse:
+        parser.error("query needs a verse")
+
+    book, chapter, verse = split_ref(args.verse)
+    source = ordinal(book, int(chapter), int(verse))
+    graph = RefsGraph(args.graph_dir)
+
+    start = time.perf_counter()
+    reached = graph.neighborhood(source, args.hops, args.direction)
+    co_cited = graph.co_cited(source)
+    elapsed = time.perf_counter() - start
+
+    for hop, verses in reached.items():
+        shown = ", ".join(format_ordinal(v) for v in verses[:20])
+        print(f"[bold]{hop} hop(s)[/bold] {len(verses)} verses: {shown}{' ...' if len(verses) > 20 else ''}")
+    print(f"[bold]Co-cited[/bold]: {', '.join(f'{format_ordinal(v)} ({count})' for v, count in co_cited)}")
+    print(f"Queried in {elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Reverse index of json/refs: for every verse, the verses that reference it.
+#
+# json/refs-reverse/<book>.json holds the verses of <book> that are cited, e.g.
+# {"jo3:16": ["gn22:2", "gn22:12", ...]}, and _sources.json records which
+# shards every source book contributes to, so regenerating one book's refs only
+# rewrites the shards it touches (see `update_book`, called by copy_refs).
+#
+# Usage:
+#   python refs_reverse.py build
+#   python refs_reverse.py jo3:16
+
+import argparse
+from collections import defaultdict
+from pathlib import Path
+import json
+from rich import print
+from biblia.canon import book_sort_key
+from biblia.references import expand_ref, split_ref
+from biblia.refs import REFS_DIR, REVERSE_DIR, RefsContent, cited_by
+
+
+SOURCES_FILE = "_sources.json"
+
+
+def _ref_sort_key(ref: str) -> tuple[tuple[int, str], int, int]:
+    book, chapter, verse = split_ref(ref)
+    return book_sort_key(book), int(chapter), int(verse)
+
+
+def _invert(refs: RefsContent) -> dict[str, dict[str, set[str]]]:
+    """Target book -> target verse -> sources, for the refs of a single book"""
+    reverse: dict[str, dict[str, set[str]]] = defaultdict(lambda: defaultdict(set))
+    for source, targets in refs.items():
+        for target in targets:
+            for book, chapter, verse in expand_ref(target):
+                reverse[book][f"{book}{chapter}:{verse}"].add(source)
+
+    return reverse
+
+
+def _is_from(source: str, abbrev: str) -> bool:
+    """Cheaper than `split_ref` for every entry of every shard: "jo3:16" is from "jo", not "1jo" """
+    return source.startswith(abbrev) and source[len(abbrev)].isdigit()
+
+
+def _write(path: Path, raw: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(raw, separators=(',', ':')))
+    tmp.replace(path)
+
+
+def _write_shard(reverse_dir: Path, book: str, shard: dict[str, set[str]] | dict[str, list[str]]) -> None:
+    path = reverse_dir / f"{book}.json"
+    if not shard:
+        path.unlink(missing_ok=True)
+        return
+
+    _write(path, {
+        target: sorted(shard[target], key=_ref_sort_key)
+        for target in sorted(shard, key=_ref_sort_key)
+    })
+
+
+def _read(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def build(refs_dir: Path = REFS_DIR, reverse_dir: Path = REVERSE_DIR) -> int:
+    """Rebuild the whole reverse index from every json/refs file"""
+    reverse: dict[str, dict[str, set[str]]] = defaultdict(lambda: defaultdict(set))
+    sources: dict[str, list[str]] = {}
+
+    for file in sorted(refs_dir.glob("*.json"), key=lambda file: book_sort_key(file.stem)):
+        inverted = _invert(json.loads(file.read_text()))
+        sources[file.stem] = sorted(inverted, key=book_sort_key)
+        for book, targets in inverted.items():
+            for target, citing in targets.items():
+                reverse[book][target] |= citing
+
+    reverse_dir.mkdir(parents=True, exist_ok=True)
+    for stale in set(reverse_dir.glob("*.json")) - {reverse_dir / f"{book}.json" for book in reverse} - {reverse_dir / SOURCES_FILE}:
+        stale.unlink()
+    for book, shard in reverse.items():
+        _write_shard(reverse_dir, book, shard)
+    _write(reverse_dir / SOURCES_FILE, sources)
+
+    return sum(len(shard) for shard in reverse.values())
+
+
+def update_book(abbrev: str, refs: RefsContent | None = None, refs_dir: Path = REFS_DIR, reverse_dir: Path = REVERSE_DIR) -> None:
+    """Replace what `abbrev` contributes to the reverse index after its refs file changed"""
+    if refs is None:
+        refs = json.loads((refs_dir / f"{abbrev}.json").read_text())
+
+    reverse_dir.mkdir(parents=True, exist_ok=True)
+    sources: dict[str, list[str]] = _read(reverse_dir / SOURCES_FILE)
+    inverted = _invert(refs)
+
+    for book in set(sources.get(abbrev, [])) | set(inverted):
+        shard = {
+            target: {source for source in citing if not _is_from(source, abbrev)}
+            for target, citing in _read(reverse_dir / f"{book}.json").items()
+        }
+        for target, citing in inverted.get(book, {}).items():
+            shard.setdefault(target, set()).update(citing)
+
+        _write_shard(reverse_dir, book, {target: citing for target, citing in shard.items() if citing})
+
+    sources[abbrev] = sorted(inverted, key=book_sort_key)
+    _write(reverse_dir / SOURCES_FILE, dict(sorted(sources.items(), key=lambda item: book_sort_key(item[0]))))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("ref", help='"build" to rebuild the whole index, or a verse to look up, e.g. "jo3:16"')
+    args = parser.parse_args()
+
+    if args.ref == "build":
+        print(f"Write [green]{REVERSE_DIR}[/green]: {build()} cited verses")
+        return
+
+    refs = cited_by(args.ref)
+    print(f"[bold]{args.ref}[/bold] is cited by {len(refs)} verses: {', '.join(refs)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import argparse
+from datetime import datetime, timezone
+import hashlib
+from pathlib import Path
+import sqlite3
+import typing as t
+
+import httpx
+
+
+MANIFEST_PATH = Path("./.cache/manifest.sqlite3")
+
+Status = t.Literal["done", "empty", "failed"]
+"""`empty` means the source has nothing for that chapter, which is also final"""
+
+
+class ChapterKey(t.NamedTuple):
+    source: str
+    """e.g. "bibliaonline", "jw", "a12" """
+    version: str
+    book: str
+    chapter: int
+
+
+class Manifest:
+    """Per-chapter scrape status shared by every copy_* script.
+
+    Each row records the outcome of one source/version/book/chapter with its
+    HTTP metadata, the hash of what was written and when, so a run that was
+    interrupted (crash, rate-limit ban) resumes exactly where it stopped.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH, redo: bool = False) -> None:
+        self.path = path
+        self.redo = redo
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # scrape_pipeline marks chapters done from its writer thread, sqlite serializes the calls
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chapters (
+                source TEXT NOT NULL,
+                version TEXT NOT NULL,
+                book TEXT NOT NULL,
+                chapter INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                url TEXT,
+                http_status INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                response_bytes INTEGER,
+                content_hash TEXT,
+                error TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (source, version, book, chapter)
+            )
+        """)
+
+    def status(self, key: ChapterKey) -> Status | None:
+        row = self._conn.execute(
+            "SELECT status FROM chapters WHERE source = ? AND version = ? AND book = ? AND chapter = ?",
+            key,
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, key: ChapterKey) -> bool:
+        return self.status(key) in ("done", "empty")
+
+    def should_skip(self, key: ChapterKey, output_file: Path | None = None) -> bool:
+        """Whether the chapter is already done.
+
+        Passing `output_file` also skips chapters written before the manifest
+        existed. `--redo` turns skipping off.
+        """
+        if self.redo:
+            return False
+
+        return self.is_done(key) or (output_file is not None and output_file.exists())
+
+    def _record(
+        self,
+        key: ChapterKey,
+        status: Status,
+        resp: httpx.Response | None = None,
+        content: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                *key,
+                status,
+                str(resp.url) if resp is not None else None,
+                resp.status_code if resp is not None else None,
+                resp.headers.get("etag") if resp is not None else None,
+                resp.headers.get("last-modified") if resp is not None else None,
+                len(resp.content) if resp is not None else None,
+                hashlib.sha256(content.encode()).hexdigest() if content is not None else None,
+                error,
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            ),
+        )
+
+    def mark_done(self, key: ChapterKey, content: str, resp: httpx.Response | None = None) -> None:
+        """`content` is what was written to disk"""
+        self._record(key, "done", resp, content)
+
+    def mark_empty(self, key: ChapterKey, resp: httpx.Response | None = None) -> None:
+        self._record(key, "empty", resp)
+
+    def mark_failed(self, key: ChapterKey, error: BaseException) -> None:
+        self._record(key, "failed", error=f"{type(error).__name__}: {error}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("manifest")
+    group.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    group.add_argument("--redo", action="store_true", help="Download chapters again even if the manifest has them as done")
+
+
+def from_args(args: argparse.Namespace) -> Manifest:
+    return Manifest(args.manifest, redo=args.redo)
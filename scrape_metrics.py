@@ -0,0 +1,281 @@
+import argparse
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import json
+from pathlib import Path
+import sys
+import time
+import typing as t
+from rich import print
+
+
+METRICS_DIR = Path("./.cache/metrics/")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""Request latency histogram bounds in seconds, as Prometheus `le` (+Inf is implicit)"""
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+Stage = t.Literal["parse", "write"]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, never above the max seen"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip((*self.buckets, self.max), self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def summary(self) -> "HistogramSummary":
+        return HistogramSummary(
+            count=self.count,
+            seconds=round(self.sum, 4),
+            p50=round(self.quantile(0.5), 4),
+            p95=round(self.quantile(0.95), 4),
+            max=round(self.max, 4),
+        )
+
+
+class HistogramSummary(t.TypedDict):
+    count: int
+    seconds: float
+    """Sum of every observation"""
+    p50: float
+    p95: float
+    max: float
+
+
+class HostMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.bytes = 0
+        self.cache_hits = 0
+        self.throttled_seconds = 0.0
+        """Time requests waited on the host's rate limiter"""
+        self.rate = 0.0
+        """Latest requests/s allowed by the rate limiter"""
+        self.statuses: Counter[int] = Counter()
+        self.errors: Counter[str] = Counter()
+        """Requests that got no response, by exception name (e.g. ReadTimeout)"""
+
+
+class HostSummary(t.TypedDict):
+    requests: int
+    bytes: int
+    cache_hits: int
+    throttled_seconds: float
+    rate: float
+    statuses: dict[str, int]
+    errors: dict[str, int]
+    latency: HistogramSummary
+
+
+class Summary(t.TypedDict):
+    scraper: str
+    seconds: float
+    retries: int
+    failures: int
+    """Jobs that failed even after every retry"""
+    backoff_seconds: float
+    hosts: dict[str, HostSummary]
+    stages: dict[str, HistogramSummary]
+
+
+class ScrapeMetrics:
+    """Counters and histograms of a scraper run, shared by FetchEngine and the copy_* scripts.
+
+    FetchEngine records every request (latency per host, status, bytes, cache
+    hits, errors) and every retry with the time spent backing off; parse and
+    write times come from scrape_pipeline, or from `time("parse")` in the
+    scripts that don't use it, so a slow run can be traced to the network,
+    the parsing or a host throttling us.
+
+    `export` writes `<dir>/<scraper>.json` and `<dir>/<scraper>.prom`, the
+    latter in the Prometheus text format for node_exporter's textfile collector.
+    """
+
+    def __init__(self, scraper: str | None = None, directory: Path | None = METRICS_DIR) -> None:
+        self.scraper = scraper or Path(sys.argv[0]).stem
+        self.directory = directory
+        self.hosts: defaultdict[str, HostMetrics] = defaultdict(HostMetrics)
+        self.stages: defaultdict[str, Histogram] = defaultdict(lambda: Histogram(STAGE_BUCKETS))
+        self.retries = 0
+        self.failures = 0
+        self.backoff_seconds = 0.0
+        self._start = time.perf_counter()
+
+    def observe_response(self, host: str, seconds: float, status: int, size: int) -> None:
+        metrics = self.hosts[host]
+        metrics.latency.observe(seconds)
+        metrics.statuses[status] += 1
+        metrics.bytes += size
+
+    def observe_error(self, host: str, error: BaseException) -> None:
+        self.hosts[host].errors[type(error).__name__] += 1
+
+    def observe_cache_hit(self, host: str) -> None:
+        self.hosts[host].cache_hits += 1
+
+    def observe_throttle(self, host: str, seconds: float) -> None:
+        self.hosts[host].throttled_seconds += seconds
+
+    def observe_rate(self, host: str, rate: float) -> None:
+        self.hosts[host].rate = rate
+
+    def observe_retry(self, backoff: float) -> None:
+        self.retries += 1
+        self.backoff_seconds += backoff
+
+    def observe_failure(self) -> None:
+        self.failures += 1
+
+    def observe_stage(self, stage: Stage, seconds: float) -> None:
+        self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage: Stage) -> t.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def summary(self) -> Summary:
+        return Summary(
+            scraper=self.scraper,
+            seconds=round(time.perf_counter() - self._start, 3),
+            retries=self.retries,
+            failures=self.failures,
+            backoff_seconds=round(self.backoff_seconds, 3),
+            hosts={
+                host: HostSummary(
+                    requests=metrics.latency.count,
+                    bytes=metrics.bytes,
+                    cache_hits=metrics.cache_hits,
+                    throttled_seconds=round(metrics.throttled_seconds, 3),
+                    rate=round(metrics.rate, 2),
+                    statuses={str(status): count for status, count in sorted(metrics.statuses.items())},
+                    errors=dict(metrics.errors),
+                    latency=metrics.latency.summary(),
+                )
+                for host, metrics in sorted(self.hosts.items())
+            },
+            stages={stage: histogram.summary() for stage, histogram in sorted(self.stages.items())},
+        )
+
+    def prometheus(self) -> str:
+        scraper = _label_value(self.scraper)
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help: str) -> None:
+            lines.append(f"# HELP scrape_{name} {help}")
+            lines.append(f"# TYPE scrape_{name} {kind}")
+
+        def histogram(name: str, labels: str, histogram: Histogram) -> None:
+            cumulative = 0
+            for bound, count in zip((*map(str, histogram.buckets), "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f'scrape_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"scrape_{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"scrape_{name}_count{{{labels}}} {histogram.count}")
+
+        hosts = [(f'scraper="{scraper}",host="{_label_value(host)}"', metrics) for host, metrics in sorted(self.hosts.items())]
+
+        metric("request_duration_seconds", "histogram", "Time from sending a request to reading the whole response")
+        for labels, metrics in hosts:
+            histogram("request_duration_seconds", labels, metrics.latency)
+
+        metric("responses_total", "counter", "Responses by HTTP status")
+        for labels, metrics in hosts:
+            lines += [f'scrape_responses_total{{{labels},code="{status}"}} {count}' for status, count in sorted(metrics.statuses.items())]
+
+        metric("response_bytes_total", "counter", "Response bodies, decompressed")
+        lines += [f"scrape_response_bytes_total{{{labels}}} {metrics.bytes}" for labels, metrics in hosts]
+
+        metric("request_errors_total", "counter", "Requests that got no response")
+        for labels, metrics in hosts:
+            lines += [f'scrape_request_errors_total{{{labels},error="{error}"}} {count}' for error, count in sorted(metrics.errors.items())]
+
+        metric("cache_hits_total", "counter", "Requests served from the local HTTP cache")
+        lines += [f"scrape_cache_hits_total{{{labels}}} {metrics.cache_hits}" for labels, metrics in hosts]
+
+        metric("throttled_seconds_total", "counter", "Time requests waited on the host's rate limiter")
+        lines += [f"scrape_throttled_seconds_total{{{labels}}} {metrics.throttled_seconds}" for labels, metrics in hosts]
+
+        metric("host_rate", "gauge", "Requests per second currently allowed to the host")
+        lines += [f"scrape_host_rate{{{labels}}} {metrics.rate}" for labels, metrics in hosts]
+
+        metric("retries_total", "counter", "Failed attempts that were retried")
+        lines.append(f'scrape_retries_total{{scraper="{scraper}"}} {self.retries}')
+        metric("failures_total", "counter", "Jobs that failed after every retry")
+        lines.append(f'scrape_failures_total{{scraper="{scraper}"}} {self.failures}')
+        metric("backoff_seconds_total", "counter", "Time spent waiting before retries")
+        lines.append(f'scrape_backoff_seconds_total{{scraper="{scraper}"}} {self.backoff_seconds}')
+
+        metric("stage_duration_seconds", "histogram", "Time per chapter spent parsing and writing")
+        for stage, stage_histogram in sorted(self.stages.items()):
+            histogram("stage_duration_seconds", f'scraper="{scraper}",stage="{stage}"', stage_histogram)
+
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> None:
+        summary = self.summary()
+        for host, metrics in summary["hosts"].items():
+            latency = metrics["latency"]
+            print(
+                f"[yellow]{host}[/yellow]: {metrics['requests']} requests, {metrics['bytes'] / 1024**2:.1f} MB, "
+                f"p50 {latency['p50']}s, p95 {latency['p95']}s, {metrics['cache_hits']} cached, "
+                f"{metrics['throttled_seconds']}s throttled at {metrics['rate']} req/s, "
+                f"statuses {metrics['statuses']}" + (f", errors {metrics['errors']}" if metrics["errors"] else "")
+            )
+        for stage, stage_summary in summary["stages"].items():
+            print(f"[yellow]{stage}[/yellow]: {stage_summary['count']} chapters, {stage_summary['seconds']}s, p95 {stage_summary['p95']}s")
+        print(f"{summary['retries']} retries, {summary['backoff_seconds']}s backing off, {summary['failures']} failures in {summary['seconds']}s")
+
+    def export(self) -> None:
+        """Print the summary and write it as JSON and Prometheus text, unless disabled"""
+        self.report()
+        if self.directory is None:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path, content in [
+            (self.directory / f"{self.scraper}.json", json.dumps(self.summary(), indent=2)),
+            (self.directory / f"{self.scraper}.prom", self.prometheus()),
+        ]:
+            # The textfile collector may read at any moment, never leave half a file
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(content)
+            tmp.replace(path)
+            print(f"Write [green]{path}[/green]")
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("metrics")
+    group.add_argument("--metrics-dir", type=Path, default=METRICS_DIR, help="Where <scraper>.json and <scraper>.prom are written at exit")
+    group.add_argument("--no-metrics", action="store_true", help="Only print the summary at exit")
+
+
+def from_args(args: argparse.Namespace) -> ScrapeMetrics:
+    return ScrapeMetrics(directory=None if args.no_metrics else args.metrics_dir)
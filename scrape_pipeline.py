@@ -0,0 +1,179 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
+import os
+import time
+import typing as t
+import httpx
+from rich.console import Console
+from rich.table import Table
+from fetcher import FetchEngine
+
+
+C = t.TypeVar("C")
+"""Whatever identifies a chapter to the script, e.g. a NamedTuple with its book, chapter and output file"""
+R = t.TypeVar("R")
+
+PARSE_WORKERS = os.cpu_count() or 1
+QUEUE_SIZE = 32
+"""Chapters waiting between two stages, a full queue makes the previous stage wait"""
+
+
+class ChapterStages(t.NamedTuple, t.Generic[C, R]):
+    fetch: t.Callable[[C], t.Awaitable[httpx.Response | None]]
+    """Downloads the chapter (retrying through the engine), None when there is nothing to do"""
+    parse: t.Callable[[C, str], R]
+    """Runs in a worker process on the response text: a module level function or a partial of one"""
+    write: t.Callable[[C, httpx.Response, R], None]
+    """Runs on the writer thread, the only one writing files and marking chapters done"""
+    failed: t.Callable[[C, BaseException], None]
+    """Called with the chapter that stopped the pipeline, e.g. to mark it failed in the manifest"""
+
+
+class StageReport(t.NamedTuple):
+    stage: str
+    workers: int
+    chapters: int
+    busy: float
+    """Seconds spent working, summed over the workers"""
+    blocked: float
+    """Seconds spent waiting for room in the next stage's queue"""
+
+
+class PipelineReport(t.NamedTuple):
+    seconds: float
+    stages: list[StageReport]
+
+    def print(self) -> None:
+        table = Table(title=f"Pipeline, {self.seconds:.1f}s")
+        table.add_column("Stage")
+        table.add_column("Workers", justify="right")
+        table.add_column("Chapters", justify="right")
+        table.add_column("Busy", justify="right")
+        table.add_column("Blocked on next stage", justify="right")
+        for stage in self.stages:
+            utilization = stage.busy / (self.seconds * stage.workers) if self.seconds else 0.0
+            table.add_row(stage.stage, str(stage.workers), str(stage.chapters), f"{utilization:.0%}", f"{stage.blocked:.1f}s")
+
+        Console().print(table)
+
+
+class _Stage:
+    def __init__(self, name: str, workers: int) -> None:
+        self.name = name
+        self.workers = workers
+        self.chapters = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+    async def put(self, queue: asyncio.Queue, item: t.Any) -> None:
+        start = time.perf_counter()
+        await queue.put(item)
+        self.blocked += time.perf_counter() - start
+
+    def report(self) -> StageReport:
+        return StageReport(self.name, self.workers, self.chapters, self.busy, self.blocked)
+
+
+def _timed(fn: t.Callable[..., R], *args) -> tuple[R, float]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+_DONE = object()
+
+
+async def run_chapters(
+    engine: FetchEngine,
+    stages: ChapterStages[C, R],
+    chapters: t.Iterable[C],
+    *,
+    parse_workers: int = PARSE_WORKERS,
+    queue_size: int = QUEUE_SIZE,
+) -> PipelineReport:
+    """Download, parse and write chapters as three overlapping stages.
+
+    `engine.workers` coroutines fetch, `parse_workers` processes parse (so
+    BeautifulSoup no longer holds up the event loop) and a single thread
+    writes, connected by queues of `queue_size`: when parsing falls behind,
+    fetching waits instead of piling responses up in memory, and the other
+    way round. The first chapter that fails stops every stage and is re-raised.
+    """
+    fetch = _Stage("fetch", engine.workers)
+    parse = _Stage("parse", parse_workers)
+    write = _Stage("write", 1)
+    parse_queue: asyncio.Queue[tuple[C, httpx.Response] | object] = asyncio.Queue(queue_size)
+    write_queue: asyncio.Queue[tuple[C, httpx.Response, R] | object] = asyncio.Queue(queue_size)
+    pending = iter(chapters)
+    running = {"fetch": engine.workers, "parse": parse_workers}
+    loop = asyncio.get_running_loop()
+
+    async def fetcher() -> None:
+        for chapter in pending:
+            start = time.perf_counter()
+            try:
+                resp = await stages.fetch(chapter)
+            except Exception as e:
+                stages.failed(chapter, e)
+                raise
+            fetch.busy += time.perf_counter() - start
+
+            if resp is not None:
+                fetch.chapters += 1
+                await fetch.put(parse_queue, (chapter, resp))
+
+        # The last fetcher out lets the parsers go
+        running["fetch"] -= 1
+        if not running["fetch"]:
+            for _ in range(parse_workers):
+                await parse_queue.put(_DONE)
+
+    async def parser(pool: Executor) -> None:
+        while (item := await parse_queue.get()) is not _DONE:
+            chapter, resp = t.cast(tuple[C, httpx.Response], item)
+            try:
+                parsed, seconds = await loop.run_in_executor(pool, _timed, stages.parse, chapter, resp.text)
+            except Exception as e:
+                stages.failed(chapter, e)
+                raise
+            parse.busy += seconds
+            parse.chapters += 1
+            engine.metrics.observe_stage("parse", seconds)
+            await parse.put(write_queue, (chapter, resp, parsed))
+
+        running["parse"] -= 1
+        if not running["parse"]:
+            await write_queue.put(_DONE)
+
+    async def writer(thread: Executor) -> None:
+        while (item := await write_queue.get()) is not _DONE:
+            chapter, resp, parsed = t.cast(tuple[C, httpx.Response, R], item)
+            try:
+                _, seconds = await loop.run_in_executor(thread, _timed, stages.write, chapter, resp, parsed)
+            except Exception as e:
+                stages.failed(chapter, e)
+                raise
+            write.busy += seconds
+            write.chapters += 1
+            engine.metrics.observe_stage("write", seconds)
+
+    start = time.perf_counter()
+    # spawn, not fork: the event loop and the writer thread shouldn't be copied into the workers
+    with (
+        ProcessPoolExecutor(parse_workers, mp_context=multiprocessing.get_context("spawn")) as pool,
+        ThreadPoolExecutor(1, thread_name_prefix="writer") as thread,
+    ):
+        # One group for every worker: the first to fail cancels all the others,
+        # so no fetcher keeps hitting the host (or failing chapters) after it
+        try:
+            async with asyncio.TaskGroup() as group:
+                for _ in range(engine.workers):
+                    group.create_task(fetcher())
+                for _ in range(parse_workers):
+                    group.create_task(parser(pool))
+                group.create_task(writer(thread))
+        except ExceptionGroup as e:
+            raise e.exceptions[0] from None
+
+    return PipelineReport(time.perf_counter() - start, [fetch.report(), parse.report(), write.report()])
@@ -0,0 +1,300 @@
+# Accent and case insensitive full text search over one version directory,
+# e.g. "graca" finds "graça" in json/pt-br/ara.
+#
+# Usage:
+#   python search_index.py build json/pt-br/ara
+#   python search_index.py query json/pt-br/ara 'graça fé'          # both words
+#   python search_index.py query json/pt-br/ara 'graça OR misericórdia'
+#   python search_index.py query json/pt-br/ara '"graça de deus" -lei'  # phrase, without "lei"
+#
+# Index file layout (native little endian uint32 arrays):
+#
+#   magic          8 bytes  b"BIBIDX01"
+#   header_len     u32
+#   header         JSON: version, docs, avgdl, vocabulary (sorted terms joined by "\n")
+#   padding        up to a multiple of 4
+#   doc ids        uint32 per verse (see canon.verse_id), sorted
+#   doc lengths    uint32 per verse, in tokens
+#   term offsets   uint32 per term + 1, start of the term in postings
+#   term df        uint32 per term, how many verses have it
+#   postings       per term: doc id, tf, positions... for every doc with the term
+
+import argparse
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+import json
+import math
+import mmap
+from pathlib import Path
+import sys
+import time
+import typing as t
+from rich import print
+from biblia.canon import book_sort_key, format_verse_id, split_verse_id, verse_id
+from biblia.corpus import JSON_DIR, parse_verse_key
+from biblia.normalize import fold, tokenize
+
+
+OUTPUT_DIR = Path("./build/search/")
+MAGIC = b"BIBIDX01"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class IndexHeader(t.TypedDict):
+    version: str
+    docs: int
+    avgdl: float
+    vocabulary: str
+    """Sorted terms joined by "\\n", much faster to load than a JSON object"""
+
+
+class SearchHit(t.NamedTuple):
+    verse_id: int
+    score: float
+
+
+Postings = dict[int, list[int]]
+"""verse id -> positions of the term in the verse"""
+
+
+class Clause(t.NamedTuple):
+    terms: list[str]
+    """A single term, or several for a phrase"""
+    negated: bool
+
+
+def parse_query(query: str) -> list[list[Clause]]:
+    """Split a query in OR groups of AND-ed clauses.
+
+    `a b` needs both words, `a OR b` either, `"a b"` the exact phrase and
+    `-a` excludes verses with the word (or phrase).
+    """
+    groups: list[list[Clause]] = [[]]
+    pieces = query.split('"')
+    for idx, piece in enumerate(pieces):
+        if idx % 2:
+            negated = pieces[idx - 1].endswith("-")
+            if terms := tokenize(piece):
+                groups[-1].append(Clause(terms, negated))
+            continue
+
+        for word in piece.split():
+            if word == "OR":
+                groups.append([])
+            elif word != "-" and (terms := tokenize(word)):
+                groups[-1].append(Clause(terms, word.startswith("-")))
+
+    return [group for group in groups if any(not clause.negated for clause in group)]
+
+
+def build(version_dir: Path, output_file: Path) -> IndexHeader:
+    index: dict[str, dict[int, list[int]]] = defaultdict(dict)
+    lengths: dict[int, int] = {}
+
+    for book_dir in sorted((path for path in version_dir.iterdir() if path.is_dir()), key=lambda path: book_sort_key(path.name)):
+        for file in book_dir.glob("*.json"):
+            chapter = int(file.stem)
+            content: dict[str, str] = json.loads(file.read_text(encoding="utf-8"))["content"]
+
+            for key, text in content.items():
+                vid = verse_id(book_dir.name, chapter, *parse_verse_key(key))
+                tokens = tokenize(text)
+                lengths[vid] = len(tokens)
+                for position, token in enumerate(tokens):
+                    index[token].setdefault(vid, []).append(position)
+
+    doc_ids = array("I", sorted(lengths))
+    doc_lengths = array("I", (lengths[vid] for vid in doc_ids))
+    terms = sorted(index)
+    offsets = array("I")
+    dfs = array("I", (len(index[term]) for term in terms))
+    postings = array("I")
+
+    for term in terms:
+        offsets.append(len(postings))
+        for vid, positions in sorted(index[term].items()):
+            postings.append(vid)
+            postings.append(len(positions))
+            postings.extend(positions)
+    offsets.append(len(postings))
+
+    header = IndexHeader(
+        version=version_dir.name,
+        docs=len(doc_ids),
+        avgdl=sum(doc_lengths) / max(len(doc_ids), 1),
+        vocabulary="\n".join(terms),
+    )
+    raw_header = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    prefix_len = len(MAGIC) + 4 + len(raw_header)
+
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output_file.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(raw_header).to_bytes(4, "little"))
+        f.write(raw_header)
+        f.write(b"\0" * (-prefix_len % 4))
+        for values in (doc_ids, doc_lengths, offsets, dfs, postings):
+            if sys.byteorder != "little":
+                values.byteswap()
+            f.write(values.tobytes())
+
+    tmp.replace(output_file)
+    return header
+
+
+class SearchIndex:
+    """Inverted index of one version, loaded from a file written by `build`.
+
+    Only the vocabulary is decoded on load, the arrays are zero-copy views of
+    the mmap'ed file and postings are decoded when a term is first queried.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            raw = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        if raw[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a search index")
+
+        header_len = int.from_bytes(raw[len(MAGIC) : len(MAGIC) + 4], "little")
+        header_start = len(MAGIC) + 4
+        self.header: IndexHeader = json.loads(bytes(raw[header_start : header_start + header_len]))
+
+        values = _uint32s(raw[header_start + header_len + (-(header_start + header_len) % 4) :])
+        terms = self.header["vocabulary"].split("\n") if self.header["vocabulary"] else []
+        docs = self.header["docs"]
+
+        self._terms = dict(zip(terms, range(len(terms))))
+        self._doc_ids = values[:docs]
+        self._doc_lengths = values[docs : 2 * docs]
+        self._offsets = values[2 * docs : 2 * docs + len(terms) + 1]
+        self._dfs = values[2 * docs + len(terms) + 1 : 2 * docs + 2 * len(terms) + 1]
+        self._postings = values[2 * docs + 2 * len(terms) + 1 :]
+        self._cache: dict[str, Postings] = {}
+
+    @property
+    def version(self) -> str:
+        return self.header["version"]
+
+    def postings(self, term: str) -> Postings:
+        if term in self._cache:
+            return self._cache[term]
+
+        found: Postings = {}
+        if term in self._terms:
+            term_idx = self._terms[term]
+            raw = self._postings[self._offsets[term_idx] : self._offsets[term_idx + 1]].tolist()
+            idx = 0
+            while idx < len(raw):
+                tf = raw[idx + 1]
+                found[raw[idx]] = raw[idx + 2 : idx + 2 + tf]
+                idx += 2 + tf
+
+        self._cache[term] = found
+        return found
+
+    def _matches(self, clause: Clause) -> set[int]:
+        if len(clause.terms) == 1:
+            return set(self.postings(clause.terms[0]))
+
+        postings = [self.postings(term) for term in clause.terms]
+        candidates = set.intersection(*(set(p) for p in postings))
+        found = set()
+        for vid in candidates:
+            starts = set(postings[0][vid])
+            for shift, p in enumerate(postings[1:], start=1):
+                starts &= {position - shift for position in p[vid]}
+            if starts:
+                found.add(vid)
+
+        return found
+
+    def _score(self, vid: int, terms: t.Iterable[str]) -> float:
+        docs, avgdl = self.header["docs"], self.header["avgdl"]
+        length = self._doc_lengths[bisect_left(self._doc_ids, vid)]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+        score = 0.0
+        for term in terms:
+            positions = self.postings(term).get(vid)
+            if not positions:
+                continue
+
+            df = self._dfs[self._terms[term]]
+            idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+            score += idf * len(positions) * (BM25_K1 + 1) / (len(positions) + norm)
+
+        return score
+
+    def search(self, query: str, limit: int | None = 20) -> list[SearchHit]:
+        """Verses matching `query` (see `parse_query`), ranked with BM25"""
+        scores: dict[int, float] = {}
+        for group in parse_query(query):
+            positive = [clause for clause in group if not clause.negated]
+            found = set.intersection(*(self._matches(clause) for clause in positive))
+            for clause in group:
+                if clause.negated:
+                    found -= self._matches(clause)
+
+            terms = {term for clause in positive for term in clause.terms}
+            for vid in found:
+                scores[vid] = max(scores.get(vid, 0.0), self._score(vid, terms))
+
+        hits = sorted((SearchHit(vid, score) for vid, score in scores.items()), key=lambda hit: (-hit.score, hit.verse_id))
+        return hits[:limit] if limit is not None else hits
+
+
+def _uint32s(raw: memoryview) -> t.Sequence[int]:
+    if sys.byteorder == "little":
+        return raw.cast("I")
+
+    values = array("I")
+    values.frombytes(raw)
+    values.byteswap()
+    return values
+
+
+def index_path(version_dir: Path, output_dir: Path = OUTPUT_DIR) -> Path:
+    return output_dir / version_dir.relative_to(JSON_DIR).with_suffix(".idx")
+
+
+def _verse_text(version_dir: Path, vid: int) -> str:
+    book, chapter, verse, part = split_verse_id(vid)
+    content = json.loads((version_dir / book / f"{chapter}.json").read_text(encoding="utf-8"))["content"]
+    return content[f"{verse}{chr(ord('a') + part - 1) if part else ''}"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("version_dir", type=Path)
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    path = index_path(args.version_dir, args.output_dir)
+    if args.command == "build":
+        start = time.perf_counter()
+        header = build(args.version_dir, path)
+        print(f"Write {path}: {header['vocabulary'].count(chr(10)) + 1} terms, {header['docs']} verses in {time.perf_counter() - start:.2f}s")
+        return
+
+    if not args.query:
+        parser.error("query needs the search terms")
+
+    start = time.perf_counter()
+    index = SearchIndex(path)
+    loaded = time.perf_counter()
+    hits = index.search(args.query, args.limit)
+    searched = time.perf_counter()
+
+    for hit in hits:
+        print(f"[bold]{format_verse_id(hit.verse_id)}[/bold] ({hit.score:.2f}) {_verse_text(args.version_dir, hit.verse_id)}")
+    print(f"{len(hits)} results for '{fold(args.query)}', load {(loaded - start) * 1000:.1f}ms, search {(searched - loaded) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
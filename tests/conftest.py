@@ -0,0 +1,20 @@
+from functools import partial
+import httpx
+import pytest
+
+
+@pytest.fixture
+def serve_bodies(monkeypatch):
+    """Make every FetchEngine answer each request with the next of `bodies` (the last one repeats), returns the requests made"""
+
+    def install(bodies: list[str]) -> list[httpx.Request]:
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, text=bodies[min(len(requests), len(bodies)) - 1])
+
+        monkeypatch.setattr(httpx, "AsyncClient", partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+        return requests
+
+    return install
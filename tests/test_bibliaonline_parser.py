@@ -0,0 +1,41 @@
+from pathlib import Path
+import pytest
+from copy_bibliaonline import PARSERS
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "bibliaonline"
+PAGES = sorted(FIXTURES_DIR.glob("*.html"))
+
+SNIPPETS = {
+    "script": '<p class="l0" data-v=".1."><span class="v" data-v=".1.">1</span><span class="t">a<script>var x=1</script>b</span></p>',
+    "comment": '<p class="l0" data-v=".1."><span class="v" data-v=".1.">1</span><span class="t">a<!-- c -->b</span></p>',
+    "unclosed": '<p class="l0" data-v=".4."><span class="v" data-v=".4.">4<span class="t">t4<p class="l1" data-v=".5."><span class="v" data-v=".5.">5</span><span class="t">t5',
+    "continuation": (
+        '<p class="l1" data-v=".2."><span class="v" data-v=".2.">2</span><span class="t" data-v=".2.">one</span></p>'
+        '<p class="l1" data-v=".2."><span class="t" data-v=".2.">two</span></p>'
+    ),
+}
+
+
+def test_fixtures_exist():
+    assert PAGES
+
+
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_lxml_matches_bs4_on_saved_pages(page):
+    html = page.read_text(encoding="utf-8")
+    verses, titles = PARSERS["bs4"](html)
+    assert verses and titles
+    assert PARSERS["lxml"](html) == (verses, titles)
+
+
+@pytest.mark.parametrize("snippet", SNIPPETS.values(), ids=SNIPPETS.keys())
+def test_lxml_matches_bs4_on_snippets(snippet):
+    html = f"<html><body>{snippet}</body></html>"
+    assert PARSERS["lxml"](html) == PARSERS["bs4"](html)
+
+
+@pytest.mark.parametrize("backend", PARSERS)
+def test_title_without_text_span(backend):
+    with pytest.raises(ValueError):
+        PARSERS[backend]('<html><body><div class="l0" data-v=".1."><b>x</b></div></body></html>')
@@ -0,0 +1,36 @@
+import json
+import random
+import pytest
+from comment_index import RANGES_FILE, IntervalTree, update_ranges
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_overlapping_matches_brute_force(seed):
+    rng = random.Random(seed)
+    intervals = []
+    for _ in range(300):
+        start = rng.randint(0, 1000)
+        intervals.append((start, start + rng.choice([0, 0, 0, 1, 5, 40, 300])))
+    tree = IntervalTree(intervals)
+
+    for _ in range(500):
+        start = rng.randint(-10, 1400)
+        end = start + rng.choice([0, 0, 1, 10, 100])
+        expected = [item for item, (a, b) in enumerate(intervals) if a <= end and start <= b]
+        assert sorted(tree.overlapping(start, end)) == expected
+
+
+def test_covering_single_points():
+    tree = IntervalTree([(1, 1), (1, 5), (3, 3), (6, 10)])
+    assert sorted(tree.covering(1)) == [0, 1]
+    assert sorted(tree.covering(3)) == [1, 2]
+    assert tree.covering(11) == []
+    assert IntervalTree([]).covering(0) == []
+
+
+def test_update_ranges_replaces_the_chapter(tmp_path):
+    update_ranges(tmp_path, "gn", 1, {"gn1:3": [(0, "gn2:7")], "gn1:10": [(1, "gn1:12")]})
+    update_ranges(tmp_path, "gn", 10, {"gn10:1": [(0, "gn10:5")]})
+    update_ranges(tmp_path, "gn", 1, {})
+
+    assert json.loads((tmp_path / RANGES_FILE).read_text()) == {"gn10:1": [[0, "gn10:5"]]}
@@ -0,0 +1,25 @@
+import asyncio
+import json
+from copy_catolica_pastoral import OutputMeta, _download_version
+from fetcher import FetchEngine
+from http_cache import ResponseCache
+from scrape_manifest import Manifest
+
+
+def _chapter(*verses: str) -> str:
+    return json.dumps({"data": [{"versicles": [{"value": idx, "text": f"<p>{text}</p>"} for idx, text in enumerate(verses, 1)]}]})
+
+
+def test_empty_chapter_is_fetched_again(tmp_path, serve_bodies):
+    requests = serve_bodies([_chapter(), _chapter("No princípio", "A terra")])
+    manifest = Manifest(tmp_path / "manifest.sqlite3")
+
+    async def main() -> None:
+        async with FetchEngine(cache=ResponseCache(tmp_path / "cache")) as engine:
+            [job] = _download_version(engine, manifest, OutputMeta(title="Gênesis", abbrev="gn"), "gn", "genesis", 1, tmp_path / "out")
+            await job()
+
+    asyncio.run(main())
+    manifest.close()
+    assert len(requests) == 2
+    assert json.loads((tmp_path / "out" / "gn" / "1.json").read_text())["content"] == {"1": "No princípio", "2": "A terra"}
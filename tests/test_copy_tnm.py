@@ -0,0 +1,21 @@
+import asyncio
+import copy_tnm
+from fetcher import FetchEngine
+from http_cache import ResponseCache
+
+
+PAGE = '<html><body><div id="bibleText"><span class="verse">No princípio</span></div></body></html>'
+
+
+def test_page_without_bible_text_is_fetched_again(tmp_path, serve_bodies):
+    requests = serve_bodies(["<html><body>Carregando...</body></html>", PAGE])
+
+    async def main() -> str:
+        async with FetchEngine(cache=ResponseCache(tmp_path), backoff=0) as engine:
+            resp = await engine.retry(copy_tnm._fetch_bible_text, engine, "Gênesis", 1)
+            return resp.text
+
+    assert asyncio.run(main()) == PAGE
+    assert len(requests) == 2
+    assert asyncio.run(main()) == PAGE
+    assert len(requests) == 2
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+from fetcher import FetchEngine
+from http_cache import CacheMiss, CachedResponse, ResponseCache
+
+
+def _sleeper(value: int, seconds: float, log: list[int] | None = None):
+    async def job() -> int:
+        await asyncio.sleep(seconds)
+        if log is not None:
+            log.append(value)
+        return value
+
+    return job
+
+
+async def _collect(engine: FetchEngine, jobs, **kwargs) -> list:
+    return [result async for result in engine.stream(jobs, **kwargs)]
+
+
+def test_stream_yields_results_as_they_finish():
+    engine = FetchEngine(workers=3)
+    jobs = [_sleeper(0, 0.06), _sleeper(1, 0.02), _sleeper(2, 0.04)]
+    assert asyncio.run(_collect(engine, jobs)) == [1, 2, 0]
+
+
+def test_stream_pulls_jobs_lazily():
+    pulled: list[int] = []
+
+    def jobs():
+        for idx in range(10):
+            pulled.append(idx)
+            yield _sleeper(idx, 0)
+
+    async def first() -> int:
+        async for result in FetchEngine(workers=2).stream(jobs()):
+            return result
+
+    asyncio.run(first())
+    assert len(pulled) < 10
+
+
+def test_stream_failure_cancels_the_other_workers():
+    finished: list[int] = []
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main() -> None:
+        jobs = [fail, *(_sleeper(idx, 0.1, finished) for idx in range(5))]
+        with pytest.raises(RuntimeError, match="boom"):
+            await _collect(FetchEngine(workers=3), jobs, retry=False)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+    assert finished == []
+
+
+def test_run_keeps_job_order():
+    engine = FetchEngine(workers=4)
+    jobs = [_sleeper(idx, (5 - idx) * 0.01) for idx in range(6)]
+    assert asyncio.run(engine.run(jobs)) == list(range(6))
+
+
+def test_retry_until_success():
+    attempts: list[int] = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("flaky")
+        return "ok"
+
+    engine = FetchEngine(retries=5, backoff=0)
+    assert asyncio.run(engine.retry(flaky)) == "ok"
+    assert len(attempts) == 3
+    assert engine.metrics.retries == 2
+    assert engine.metrics.failures == 0
+
+
+def test_retry_gives_up_after_retries():
+    async def broken() -> None:
+        raise RuntimeError("broken")
+
+    engine = FetchEngine(retries=3, backoff=0)
+    with pytest.raises(RuntimeError, match="broken"):
+        asyncio.run(engine.retry(broken))
+    assert engine.metrics.retries == 2
+    assert engine.metrics.failures == 1
+
+
+def test_retries_must_allow_one_attempt():
+    with pytest.raises(ValueError, match="retries"):
+        FetchEngine(retries=0)
+
+
+def test_retry_reraises_cache_miss_immediately():
+    attempts: list[int] = []
+
+    async def missing() -> None:
+        attempts.append(1)
+        raise CacheMiss("GET https://example.com is not cached")
+
+    engine = FetchEngine(retries=5, backoff=10)
+    with pytest.raises(CacheMiss):
+        asyncio.run(engine.retry(missing))
+    assert attempts == [1]
+    assert engine.metrics.retries == 0
+
+
+async def _fetch_complete(engine: FetchEngine) -> str:
+    resp = await engine.get("https://example.com/page", accept=lambda resp: "complete" in resp.text)
+    if "complete" not in resp.text:
+        raise ValueError("Incomplete page")
+    return resp.text
+
+
+def test_rejected_response_is_not_cached(tmp_path, serve_bodies):
+    requests = serve_bodies(["loading", "complete"])
+
+    async def main() -> str:
+        async with FetchEngine(cache=ResponseCache(tmp_path), backoff=0) as engine:
+            return await engine.retry(_fetch_complete, engine)
+
+    assert asyncio.run(main()) == "complete"
+    assert len(requests) == 2
+
+    # The next run is served the good page from the cache
+    assert asyncio.run(main()) == "complete"
+    assert len(requests) == 2
+
+
+def test_rejected_cache_entry_is_fetched_again(tmp_path, serve_bodies):
+    cache = ResponseCache(tmp_path)
+    url = "https://example.com/page"
+    cache.put(cache.key("GET", url, {}), CachedResponse(url=url, status_code=200, headers={}, content=b"loading"))
+    requests = serve_bodies(["complete"])
+
+    async def main() -> str:
+        async with FetchEngine(cache=cache, retries=1) as engine:
+            return await _fetch_complete(engine)
+
+    assert asyncio.run(main()) == "complete"
+    assert len(requests) == 1
+    assert cache.get(cache.key("GET", url, {}))["content"] == b"complete"
@@ -0,0 +1,33 @@
+import os
+from http_cache import CachedResponse, ResponseCache
+
+
+def _response(content: bytes) -> CachedResponse:
+    return CachedResponse(url="https://example.com/", status_code=200, headers={}, content=content)
+
+
+def _disk_size(cache: ResponseCache) -> int:
+    return sum(os.path.getsize(cache._path(key)) for key in cache.keys())
+
+
+def test_overwriting_keeps_the_size_right(tmp_path):
+    cache = ResponseCache(tmp_path)
+    key = cache.key("GET", "https://example.com/")
+    for content in (b"a" * 100, b"b" * 10_000, b"c"):
+        cache.put(key, _response(content))
+        assert cache.size() == _disk_size(cache)
+
+    assert cache.get(key)["content"] == b"c"
+    assert ResponseCache(tmp_path).size() == cache.size()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=2_000)
+    keys = [cache.key("GET", f"https://example.com/{idx}") for idx in range(20)]
+    for idx, key in enumerate(keys):
+        cache.put(key, _response(os.urandom(200)))
+        os.utime(cache._path(key), (idx, idx))
+
+    assert cache.size() == _disk_size(cache) <= 2_000
+    assert keys[-1] in cache.keys()
+    assert keys[0] not in cache.keys()
@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timezone
+import random
+import pytest
+from rate_limit import MAX_RETRY_AFTER, HostLimiter, backoff_delay, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _limiter(rate: float = 4.0, **kwargs) -> tuple[HostLimiter, FakeClock]:
+    clock = FakeClock()
+    return HostLimiter(rate, clock=clock, **kwargs), clock
+
+
+def test_slow_start_adds_one_per_response():
+    limiter, _ = _limiter(4.0)
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.rate == 8.0
+
+
+def test_additive_increase_after_first_decrease():
+    limiter, clock = _limiter(8.0)
+    limiter.on_throttled(sent_at=clock.now)
+    assert limiter.rate == 4.0
+
+    # One second of healthy traffic at 4 req/s adds about 1 req/s
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.rate < 5.0
+
+
+def test_rate_stays_within_bounds():
+    limiter, clock = _limiter(1.0, min_rate=0.5, max_rate=2.0)
+    for _ in range(5):
+        limiter.on_success()
+    assert limiter.rate == 2.0
+
+    for _ in range(5):
+        clock.now += 1
+        limiter.on_throttled(sent_at=clock.now)
+    assert limiter.rate == 0.5
+
+
+def test_multiplicative_decrease_once_per_burst():
+    limiter, clock = _limiter(8.0)
+    sent_at = clock.now
+    clock.now += 0.5
+
+    # Concurrent requests sent at the old rate all come back throttled
+    for _ in range(5):
+        limiter.on_throttled(sent_at)
+    assert limiter.rate == 4.0
+
+    # A request sent after the decrease lowers it again
+    clock.now += 0.5
+    limiter.on_throttled(sent_at=clock.now)
+    assert limiter.rate == 2.0
+
+
+def test_retry_after_pauses_the_host():
+    limiter, clock = _limiter(8.0)
+    limiter.on_throttled(sent_at=clock.now, retry_after=30.0)
+    assert limiter.paused_until == clock.now + 30.0
+
+    # A stale failure can't lower the rate but still extends the pause
+    clock.now += 10
+    limiter.on_throttled(sent_at=clock.now - 20, retry_after=60.0)
+    assert limiter.rate == 4.0
+    assert limiter.paused_until == clock.now + 60.0
+
+
+def test_acquire_waits_for_the_pause(monkeypatch):
+    limiter, clock = _limiter(8.0)
+    limiter.on_throttled(sent_at=clock.now, retry_after=5.0)
+    slept: list[float] = []
+
+    async def sleep(seconds: float) -> None:
+        slept.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    assert asyncio.run(limiter.acquire()) == pytest.approx(5.0)
+    assert slept == [pytest.approx(5.0)]
+
+
+def test_acquire_spends_burst_then_waits_for_tokens(monkeypatch):
+    limiter, clock = _limiter(2.0, burst=2.0)
+
+    async def sleep(seconds: float) -> None:
+        clock.now += seconds
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    waits = [asyncio.run(limiter.acquire()) for _ in range(4)]
+    assert waits == [0.0, 0.0, pytest.approx(0.5), pytest.approx(0.5)]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("120", 120.0),
+        ("1.5", 1.5),
+        ("-3", 0.0),
+        ("999999", MAX_RETRY_AFTER),
+        ("Wed, 21 Oct 2026 07:28:30 GMT", 30.0),
+        ("Wed, 21 Oct 2026 07:27:00 GMT", 0.0),
+        ("soon", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    now = datetime(2026, 10, 21, 7, 28, tzinfo=timezone.utc)
+    assert parse_retry_after(value, now) == expected
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    random.seed(0)
+    for attempt in range(10):
+        delays = [backoff_delay(attempt, base=1.0, cap=8.0) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(8.0, 2**attempt)
+        assert len(set(delays)) > 1
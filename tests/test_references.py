@@ -0,0 +1,20 @@
+import pytest
+from biblia.references import Passage, parse_references
+
+
+def test_cross_chapter_range():
+    assert parse_references("jo 3:16-5:2") == [
+        Passage("jo", 3, 16, None),
+        Passage("jo", 4, 1, None),
+        Passage("jo", 5, 1, 2),
+    ]
+
+
+def test_range_written_out_in_the_same_chapter():
+    assert parse_references("jo 3:16-3:18") == [Passage("jo", 3, 16, 18)]
+
+
+@pytest.mark.parametrize("text", ["gn 1:1-51:1", "gn 1:1-999999999:1", "gn 3:1-2:4"])
+def test_cross_chapter_range_out_of_the_book(text):
+    with pytest.raises(ValueError):
+        parse_references(text)
@@ -0,0 +1,54 @@
+import asyncio
+import httpx
+import pytest
+from fetcher import FetchEngine
+from scrape_pipeline import ChapterStages, run_chapters
+
+
+def _parse(chapter: int, text: str) -> str:
+    return text.upper()
+
+
+def test_run_chapters():
+    written: dict[int, str] = {}
+
+    async def fetch(chapter: int) -> httpx.Response | None:
+        await asyncio.sleep(0)
+        return None if chapter == 3 else httpx.Response(200, text=f"chapter {chapter}")
+
+    def write(chapter: int, resp: httpx.Response, parsed: str) -> None:
+        written[chapter] = parsed
+
+    stages = ChapterStages(fetch, _parse, write, failed=lambda chapter, e: None)
+    report = asyncio.run(run_chapters(FetchEngine(workers=3), stages, range(10), parse_workers=1))
+
+    assert written == {chapter: f"CHAPTER {chapter}" for chapter in range(10) if chapter != 3}
+    assert [stage.chapters for stage in report.stages] == [9, 9, 9]
+
+
+def test_run_chapters_failure_stops_every_fetcher():
+    fetched: list[int] = []
+    failed: list[int] = []
+    fetched_after_failure: list[int] = []
+
+    async def fetch(chapter: int) -> httpx.Response | None:
+        fetched.append(chapter)
+        await asyncio.sleep(0.01 * chapter)
+        if chapter == 0:
+            raise RuntimeError("boom")
+        return None
+
+    stages = ChapterStages(fetch, _parse, lambda *args: None, failed=lambda chapter, e: failed.append(chapter))
+
+    async def main() -> None:
+        with pytest.raises(RuntimeError, match="boom"):
+            await run_chapters(FetchEngine(workers=4), stages, range(100), parse_workers=1)
+
+        count = len(fetched)
+        await asyncio.sleep(0.2)
+        fetched_after_failure.extend(fetched[count:])
+
+    asyncio.run(main())
+    assert failed == [0]
+    assert fetched_after_failure == []
+    assert len(fetched) < 10
@@ -0,0 +1,22 @@
+import json
+from search_index import SearchIndex, build
+
+
+def _index(tmp_path) -> SearchIndex:
+    version_dir = tmp_path / "version"
+    chapter = version_dir / "jo" / "3.json"
+    chapter.parent.mkdir(parents=True)
+    chapter.write_text(json.dumps({"content": {
+        "16": "Porque Deus amou o mundo de tal maneira",
+        "17": "Porque Deus enviou o seu Filho ao mundo",
+        "18": "Quem crê nele não é julgado",
+    }}))
+    build(version_dir, tmp_path / "index.bin")
+    return SearchIndex(tmp_path / "index.bin")
+
+
+def test_search_limit(tmp_path):
+    index = _index(tmp_path)
+    assert len(index.search("mundo", limit=None)) == 2
+    assert len(index.search("mundo", limit=1)) == 1
+    assert index.search("mundo", limit=0) == []
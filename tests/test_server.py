@@ -0,0 +1,39 @@
+import json
+from biblia import server
+from biblia.server import ChapterStore, HttpProtocol
+
+
+def _protocol(tmp_path) -> HttpProtocol:
+    for chapter in range(1, 51):
+        path = tmp_path / "gn" / f"{chapter}.json"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(json.dumps({"chapter": chapter, "content": {"1": f"gn {chapter}:1", "2": f"gn {chapter}:2"}}))
+
+    store = ChapterStore()
+    store.add_version("test", tmp_path)
+    return HttpProtocol(store)
+
+
+def _post_batch(protocol: HttpProtocol, references: list[str]) -> tuple[bytes, dict]:
+    response = protocol.handle(b"POST", b"/test/batch", {}, json.dumps(references).encode())
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0], json.loads(body)
+
+
+def test_batch(tmp_path):
+    status, body = _post_batch(_protocol(tmp_path), ["gn 1:2", "gn 1:1-51:1"])
+    assert status == b"HTTP/1.1 200 OK"
+    first, second = body["results"]
+    assert first["passages"] == [{"book": "gn", "chapter": 1, "verses": {"2": "gn 1:2"}}]
+    assert "error" in second
+
+
+def test_batch_over_max_passages(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "MAX_PASSAGES", 100)
+    protocol = _protocol(tmp_path)
+
+    status, _ = _post_batch(protocol, ["gn 1:1-50:2"] * 2)
+    assert status == b"HTTP/1.1 200 OK"
+    status, body = _post_batch(protocol, ["gn 1:1-50:2"] * 3)
+    assert status == b"HTTP/1.1 413 Content Too Large"
+    assert "150 passages" in body["error"]
@@ -0,0 +1,25 @@
+import json
+from verify_content import VerseCountCache, get_book_chapter_verse_counts
+
+
+def _write_chapter(path, verses: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"content": {str(verse): "..." for verse in range(1, verses + 1)}}))
+
+
+def test_cache_drops_deleted_files(tmp_path):
+    corpus = tmp_path / "json"
+    _write_chapter(corpus / "ara" / "gn" / "1.json", 31)
+    _write_chapter(corpus / "ara" / "gn" / "2.json", 25)
+
+    cache = VerseCountCache(tmp_path / "verse_counts.json")
+    counts = get_book_chapter_verse_counts(corpus, cache)
+    cache.save()
+    assert counts["ARA"]["gn"] == {1: 31, 2: 25}
+
+    (corpus / "ara" / "gn" / "2.json").unlink()
+    cache = VerseCountCache(tmp_path / "verse_counts.json")
+    counts = get_book_chapter_verse_counts(corpus, cache)
+    cache.save()
+    assert counts["ARA"]["gn"] == {1: 31}
+    assert list(json.loads((tmp_path / "verse_counts.json").read_text())) == [str(corpus / "ara" / "gn" / "1.json")]
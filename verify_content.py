@@ -5,8 +5,11 @@
 
 
 from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+import os
 from pathlib import Path
 import json
+import time
 from rich.console import Console
 from rich.table import Table
 from rich import box
@@ -23,46 +26,148 @@ class Output(t.TypedDict):
     content: dict[str, str]
     titles: t.NotRequired[dict[str, str]]
 
-class ReadResult(t.TypedDict):
-    version: str
-    book: str
-    chapter: str
-    content: dict[str, str]
-
-def read_json_files(directory: Path) -> t.Generator[ReadResult, None, None]:
-    json_files = directory.glob('**/*.json')
-    for file in json_files:
-        with file.open('r', encoding='utf-8') as f:
-            version = file.parent.parent.name
-            book = file.parent.name
-            chapter = file.stem
-            yield {
-                "version": version,
-                "book": book,
-                "chapter": chapter,
-                "content": json.load(f)
-            }
-
 VERSION_KEY = str
 BOOK_KEY = str
 CHAPTER_KEY = int
 VERSE_COUNT = int
 
-def get_book_chapter_verse_counts(directory: Path) -> dict[str, dict[str, t.Tuple[int, int]]]:
-    counts = {}
-    outputs = read_json_files(directory)
+CACHE_FILE = Path("./.cache/verse_counts.json")
+
+class VerseCountCache:
+    """Verse count per chapter file, keyed by path and invalidated by mtime + size.
+
+    A run only decodes the files that changed since the last one. Entries of
+    files the run never looked up (e.g. deleted ones) are dropped on `save`.
+    """
+
+    def __init__(self, path: Path = CACHE_FILE) -> None:
+        self.path = path
+        self.dirty = False
+        try:
+            self._entries: dict[str, tuple[int, int, int]] = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+        self._seen: set[str] = set()
+
+    def get(self, file: str, mtime_ns: int, size: int) -> int | None:
+        self._seen.add(file)
+        entry = self._entries.get(file)
+        if entry and entry[0] == mtime_ns and entry[1] == size:
+            return entry[2]
+
+        return None
+
+    def set(self, file: str, mtime_ns: int, size: int, verse_count: int) -> None:
+        self._entries[file] = (mtime_ns, size, verse_count)
+        self._seen.add(file)
+        self.dirty = True
+
+    def save(self) -> None:
+        if stale := self._entries.keys() - self._seen:
+            for file in stale:
+                del self._entries[file]
+            self.dirty = True
+
+        if not self.dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries, separators=(',', ':')))
+        tmp.replace(self.path)
+        self.dirty = False
+
+class ScanTiming(t.TypedDict):
+    files: int
+    decoded: int
+    stat_seconds: float
+    decode_seconds: float
+    """Summed over the workers, i.e. CPU time spent decoding"""
+
+def _count_shard(files: list[str]) -> tuple[list[tuple[str, int]], float]:
+    """Decode one book worth of chapter files, runs in a worker process"""
+    start = time.perf_counter()
+    results = []
+    for file in files:
+        with open(file, 'r', encoding='utf-8') as f:
+            results.append((file, len(json.load(f)["content"])))
+
+    return results, time.perf_counter() - start
+
+def get_book_chapter_verse_counts(
+    directory: Path,
+    cache: VerseCountCache | None = None,
+    executor: Executor | None = None,
+    timings: dict[VERSION_KEY, ScanTiming] | None = None,
+) -> dict[str, dict[str, t.Tuple[int, int]]]:
     counts: dict[VERSION_KEY, dict[BOOK_KEY, dict[CHAPTER_KEY, VERSE_COUNT]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+    timings = timings if timings is not None else {}
+    stats: dict[str, os.stat_result] = {}
+    shards: dict[tuple[VERSION_KEY, BOOK_KEY], list[str]] = defaultdict(list)
+
+    for version_dir in directory.iterdir():
+        if not version_dir.is_dir():
+            continue
+
+        start = time.perf_counter()
+        for file in version_dir.glob('**/*.json'):
+            version = file.parent.parent.name.upper()
+            book = file.parent.name
+            chapter = int(file.stem)
 
-    for output in outputs:
-        version = output["version"].upper()
-        book = output["book"]
-        chapter = int(output["chapter"])
-        verse_count = len(output["content"]["content"])
+            timing = timings.setdefault(version, ScanTiming(files=0, decoded=0, stat_seconds=0.0, decode_seconds=0.0))
+            timing["files"] += 1
 
-        counts[version][book][chapter] = verse_count
+            # Created here so versions keep the directory order no matter which shard finishes first
+            book_counts = counts[version][book]
+
+            stat = stats[str(file)] = file.stat()
+            verse_count = cache.get(str(file), stat.st_mtime_ns, stat.st_size) if cache else None
+            if verse_count is None:
+                shards[(version, book)].append(str(file))
+            else:
+                book_counts[chapter] = verse_count
+
+        if version_dir.name.upper() in timings:
+            timings[version_dir.name.upper()]["stat_seconds"] += time.perf_counter() - start
+
+    if executor:
+        futures = {executor.submit(_count_shard, files): key for key, files in shards.items()}
+        done = ((futures[future], future.result()) for future in as_completed(futures))
+    else:
+        done = ((key, _count_shard(files)) for key, files in shards.items())
+
+    for (version, book), (results, elapsed) in done:
+        timings[version]["decoded"] += len(results)
+        timings[version]["decode_seconds"] += elapsed
+
+        for file, verse_count in results:
+            counts[version][book][int(Path(file).stem)] = verse_count
+            if cache:
+                stat = stats[file]
+                cache.set(file, stat.st_mtime_ns, stat.st_size, verse_count)
 
     return counts
 
+def create_timing_table(timings: dict[VERSION_KEY, ScanTiming]) -> None:
+    table = Table(box=box.SIMPLE, title="Scan timings")
+    table.add_column("Version")
+    table.add_column("Files", justify="right")
+    table.add_column("Decoded", justify="right")
+    table.add_column("Stat (s)", justify="right")
+    table.add_column("Decode CPU (s)", justify="right")
+
+    for version, timing in sorted(timings.items()):
+        table.add_row(
+            version,
+            str(timing["files"]),
+            str(timing["decoded"]),
+            f"{timing['stat_seconds']:.3f}",
+            f"{timing['decode_seconds']:.3f}",
+        )
+
+    Console().print(table)
+
 def create_table(counts):
     console = Console()
     table = Table(box=box.SIMPLE)
@@ -111,12 +216,20 @@ def create_table(counts):
     console.print(table)
 
 def main():
-    directory = Path('json/pt-br/')
-    counts = get_book_chapter_verse_counts(directory)
-    counts |= get_book_chapter_verse_counts(Path('json/en-us/'))
-    counts |= get_book_chapter_verse_counts(Path('json/greek/'))
-    counts |= get_book_chapter_verse_counts(Path('json/catolicos/pt-br/'))
+    cache = VerseCountCache()
+    timings: dict[VERSION_KEY, ScanTiming] = {}
+
+    # Workers are only spawned if some file actually needs decoding
+    with ProcessPoolExecutor() as executor:
+        directory = Path('json/pt-br/')
+        counts = get_book_chapter_verse_counts(directory, cache, executor, timings)
+        counts |= get_book_chapter_verse_counts(Path('json/en-us/'), cache, executor, timings)
+        counts |= get_book_chapter_verse_counts(Path('json/greek/'), cache, executor, timings)
+        counts |= get_book_chapter_verse_counts(Path('json/catolicos/pt-br/'), cache, executor, timings)
+
+    cache.save()
     create_table(counts)
+    create_timing_table(timings)
 
 if __name__ == "__main__":
     main()
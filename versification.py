@@ -0,0 +1,388 @@
+# Translate verses between the versification schemes of the json/ tree:
+#
+#   protestant  CHAPTER_VERSE_MAP, i.e. canon.ordinal (ARA, ACF, KJV...)
+#   hebrew      masoretic numbering, psalm titles are verses and several
+#               chapters break elsewhere (hebrew/bhs)
+#   catholic    hebrew numbering plus the greek additions to Daniel
+#               (biblia-aparecida, biblia-pastoral)
+#   vulgate     catholic with the greek numbering of the psalms (ave-maria)
+#   tnm         protestant without jo7:53-8:11 and mc16:9-20 (tnm)
+#
+# Every scheme numbers its verses densely like canon.ordinal, and translating
+# between two schemes is a single read of a precomputed int32 table, -1 where
+# the target has no such verse. `translate_many` does whole ranges at once with
+# numpy when it is installed (the 'graph' extra).
+#
+# Deuterocanonical books have no protestant counterpart, so they are outside
+# every scheme, as they are outside canon.ordinal.
+#
+# Usage:
+#   python versification.py jl3:1 --source catholic
+#   python versification.py sl23:1 --target vulgate
+
+import argparse
+from array import array
+from functools import cache
+from pathlib import Path
+import typing as t
+from rich import print
+from biblia.canon import BOOK_INDEX, CHAPTER_VERSE_MAP, VERSE_COUNT, book_sort_key, ordinal as canon_ordinal
+from biblia.references import expand_ref, split_ref
+
+
+Versification = t.Literal["protestant", "hebrew", "catholic", "vulgate", "tnm"]
+
+Verse = tuple[str, int, int]
+
+Rule = tuple[str | None, str | None]
+"""(protestant verses, the same verses in another scheme), e.g. ("jl3:1-21", "jl4:1-21").
+
+Spans of different lengths are merged/split verses: the shorter side repeats its
+last verse. None on either side means the verses only exist on the other side.
+When several rules mention a verse the first one wins."""
+
+HEBREW_RULES: list[Rule] = [
+    ("gn31:55", "gn32:1"),
+    ("gn32:1-32", "gn32:2-33"),
+    ("ex8:1-4", "ex7:26-29"),
+    ("ex8:5-32", "ex8:1-28"),
+    ("ex22:1", "ex21:37"),
+    ("ex22:2-31", "ex22:1-30"),
+    ("lv6:1-7", "lv5:20-26"),
+    ("lv6:8-30", "lv6:1-23"),
+    ("nm16:36-50", "nm17:1-15"),
+    ("nm17:1-13", "nm17:16-28"),
+    ("nm29:40", "nm30:1"),
+    ("nm30:1-16", "nm30:2-17"),
+    ("dt12:32", "dt13:1"),
+    ("dt13:1-18", "dt13:2-19"),
+    ("dt22:30", "dt23:1"),
+    ("dt23:1-25", "dt23:2-26"),
+    ("dt29:1", "dt28:69"),
+    ("dt29:2-29", "dt29:1-28"),
+    ("1sm20:42", "1sm20:42"),
+    ("1sm20:42", "1sm21:1"),
+    ("1sm21:1-15", "1sm21:2-16"),
+    ("1sm23:29", "1sm24:1"),
+    ("1sm24:1-22", "1sm24:2-23"),
+    ("2sm18:33", "2sm19:1"),
+    ("2sm19:1-43", "2sm19:2-44"),
+    ("1rs4:21-34", "1rs5:1-14"),
+    ("1rs5:1-18", "1rs5:15-32"),
+    ("1rs22:43", "1rs22:43"),
+    ("1rs22:43", "1rs22:44"),
+    ("1rs22:44-53", "1rs22:45-54"),
+    ("2rs11:21", "2rs12:1"),
+    ("2rs12:1-21", "2rs12:2-22"),
+    ("1cr6:1-15", "1cr5:27-41"),
+    ("1cr6:16-81", "1cr6:1-66"),
+    ("1cr12:4", "1cr12:4"),
+    ("1cr12:4", "1cr12:5"),
+    ("1cr12:5-40", "1cr12:6-41"),
+    ("2cr2:1", "2cr1:18"),
+    ("2cr2:2-18", "2cr2:1-17"),
+    ("2cr14:1", "2cr13:23"),
+    ("2cr14:2-15", "2cr14:1-14"),
+    ("ne4:1-6", "ne3:33-38"),
+    ("ne4:7-23", "ne4:1-17"),
+    ("ne9:38", "ne10:1"),
+    ("ne10:1-39", "ne10:2-40"),
+    ("jó41:1-8", "jó40:25-32"),
+    ("jó41:9-34", "jó41:1-26"),
+    ("sl13:1-4", "sl13:2-5"),
+    ("sl13:5-6", "sl13:6"),
+    ("ec5:1", "ec4:17"),
+    ("ec5:2-20", "ec5:1-19"),
+    ("ct6:13", "ct7:1"),
+    ("ct7:1-13", "ct7:2-14"),
+    ("is9:1", "is8:23"),
+    ("is9:2-21", "is9:1-20"),
+    ("is63:19", "is63:19"),
+    ("is64:1", "is63:19"),
+    ("is64:2-12", "is64:1-11"),
+    ("jr9:1", "jr8:23"),
+    ("jr9:2-26", "jr9:1-25"),
+    ("ez20:45-49", "ez21:1-5"),
+    ("ez21:1-32", "ez21:6-37"),
+    ("dn5:31", "dn6:1"),
+    ("dn6:1-28", "dn6:2-29"),
+    ("os1:10-11", "os2:1-2"),
+    ("os2:1-23", "os2:3-25"),
+    ("os11:12", "os12:1"),
+    ("os12:1-14", "os12:2-15"),
+    ("os13:16", "os14:1"),
+    ("os14:1-9", "os14:2-10"),
+    ("jl2:28-32", "jl3:1-5"),
+    ("jl3:1-21", "jl4:1-21"),
+    ("jn1:17", "jn2:1"),
+    ("jn2:1-10", "jn2:2-11"),
+    ("mq5:1", "mq4:14"),
+    ("mq5:2-15", "mq5:1-14"),
+    ("na1:15", "na2:1"),
+    ("na2:1-13", "na2:2-14"),
+    ("zc1:18-21", "zc2:1-4"),
+    ("zc2:1-13", "zc2:5-17"),
+    ("ml4:1-6", "ml3:19-24"),
+]
+"""Protestant -> masoretic numbering, Daniel 3-4 and the psalm titles aside"""
+
+HEBREW_DANIEL: list[Rule] = [
+    ("dn4:1-3", "dn3:31-33"),
+    ("dn4:4-37", "dn4:1-34"),
+]
+
+CATHOLIC_DANIEL: list[Rule] = [
+    ("dn3:24-30", "dn3:91-97"),
+    ("dn4:1-3", "dn3:98-100"),
+    ("dn4:4-37", "dn4:1-34"),
+    (None, "dn13:1-64"),
+    (None, "dn14:1-42"),
+]
+"""The song of the three young men is dn3:24-90, Susanna and Bel are chapters 13 and 14"""
+
+TNM_RULES: list[Rule] = [
+    ("jo7:53", None),
+    ("jo8:1-11", None),
+    ("jo8:12", "jo8:1"),
+    ("mc16:9-20", None),
+    ("3jo1:14-15", "3jo1:14"),
+]
+"""json/pt-br/tnm/jo/8.json numbers jo8:12 as "1" since the chapter starts there"""
+
+PSALM_TITLES: dict[int, int] = {
+    psalm: 1 for psalm in (
+        3, 4, 5, 6, 7, 8, 9, 12, 18, 19, 20, 21, 22, 30, 31, 34, 36, 38, 39, 40, 41, 42, 44, 45, 46, 47, 48, 49, 53,
+        55, 56, 57, 58, 59, 61, 62, 63, 64, 65, 67, 68, 69, 70, 75, 76, 77, 80, 81, 83, 84, 85, 88, 89, 92, 102,
+        108, 140, 142,
+    )
+} | {51: 2, 52: 2, 54: 2, 60: 2}
+"""Psalm -> how many verses its title takes in the hebrew numbering"""
+
+VERSION_VERSIFICATION: dict[str, Versification] = {
+    "bhs": "hebrew",
+    "biblia-aparecida": "catholic",
+    "biblia-pastoral": "catholic",
+    "ave-maria": "vulgate",
+    "tnm": "tnm",
+}
+"""Version directory name -> scheme, anything else is protestant"""
+
+
+class Layout(t.NamedTuple):
+    """Verses of one scheme and the tables to and from canonical ordinals"""
+
+    chapters: dict[str, dict[int, int]]
+    """Verses per chapter, like canon.CHAPTER_VERSE_MAP"""
+    chapter_slots: dict[tuple[str, int], int]
+    chapter_start: array
+    """Chapter slot -> ordinal of its first verse"""
+    slot_chapter: list[tuple[str, int]]
+    ordinal_slot: array
+    to_canon: array
+    """Ordinal -> canonical ordinal, -1 for verses protestant bibles don't have"""
+    from_canon: array
+    """Canonical ordinal -> ordinal, -1 for verses this scheme doesn't have"""
+
+    @property
+    def verse_count(self) -> int:
+        return len(self.to_canon)
+
+
+def _rule_pairs(rules: list[Rule]) -> t.Iterator[tuple[Verse | None, Verse | None]]:
+    for protestant, other in rules:
+        left = expand_ref(protestant) if protestant else []
+        right = expand_ref(other) if other else []
+        for idx in range(max(len(left), len(right))):
+            yield (
+                left[min(idx, len(left) - 1)] if left else None,
+                right[min(idx, len(right) - 1)] if right else None,
+            )
+
+
+def _psalm_pairs(rules: list[Rule]) -> t.Iterator[tuple[Verse, Verse]]:
+    """Every verse of the psalms shifted by its title, unless `rules` cover the psalm"""
+    covered = {split_ref(protestant)[1] for protestant, _ in rules if protestant and protestant.startswith("sl")}
+    for psalm, verses in CHAPTER_VERSE_MAP["sl"].items():
+        if str(psalm) in covered:
+            continue
+
+        title = PSALM_TITLES.get(psalm, 0)
+        for verse in range(1, verses + 1):
+            yield ("sl", psalm, verse), ("sl", psalm, verse + title)
+
+
+def _greek_psalm(verse: Verse | None) -> Verse | None:
+    """Hebrew numbered verse -> greek (septuagint/vulgate) psalm numbering"""
+    if verse is None or verse[0] != "sl":
+        return verse
+
+    _, psalm, number = verse
+    if psalm == 10:
+        return "sl", 9, number + 21
+    if psalm == 115:
+        return "sl", 113, number + 8
+    if psalm == 116:
+        return ("sl", 114, number) if number <= 9 else ("sl", 115, number - 9)
+    if psalm == 147:
+        return ("sl", 146, number) if number <= 11 else ("sl", 147, number - 11)
+    if 11 <= psalm <= 146:
+        return "sl", psalm - 1, number
+
+    return verse
+
+
+def _pairs(scheme: Versification) -> list[tuple[Verse | None, Verse | None]]:
+    if scheme == "protestant":
+        return []
+    if scheme == "tnm":
+        return list(_rule_pairs(TNM_RULES))
+    if scheme == "hebrew":
+        return [*_rule_pairs(HEBREW_RULES + HEBREW_DANIEL), *_psalm_pairs(HEBREW_RULES)]
+
+    catholic = [*_rule_pairs(HEBREW_RULES + CATHOLIC_DANIEL), *_psalm_pairs(HEBREW_RULES)]
+    if scheme == "vulgate":
+        return [(protestant, _greek_psalm(other)) for protestant, other in catholic]
+
+    return catholic
+
+
+@cache
+def layout(scheme: Versification) -> Layout:
+    """Tables of a scheme, built on first use"""
+    pairs = _pairs(scheme)
+    moved = {protestant for protestant, _ in pairs if protestant}
+    chapters: dict[str, dict[int, int]] = {}
+    for book, book_chapters in CHAPTER_VERSE_MAP.items():
+        for chapter, verses in book_chapters.items():
+            for verse in range(1, verses + 1):
+                if (book, chapter, verse) not in moved:
+                    book_layout = chapters.setdefault(book, {})
+                    book_layout[chapter] = max(book_layout.get(chapter, 0), verse)
+    for book, chapter, verse in (other for _, other in pairs if other):
+        book_layout = chapters.setdefault(book, {})
+        book_layout[chapter] = max(book_layout.get(chapter, 0), verse)
+
+    chapter_slots: dict[tuple[str, int], int] = {}
+    chapter_start = array("i")
+    slot_chapter: list[tuple[str, int]] = []
+    ordinal_slot = array("i")
+    total = 0
+    for book in sorted(chapters, key=book_sort_key):
+        chapters[book] = dict(sorted(chapters[book].items()))
+        for chapter, verses in chapters[book].items():
+            chapter_slots[book, chapter] = len(chapter_start)
+            ordinal_slot.extend([len(chapter_start)] * verses)
+            chapter_start.append(total)
+            slot_chapter.append((book, chapter))
+            total += verses
+
+    def to_ordinal(verse: Verse) -> int:
+        book, chapter, number = verse
+        return chapter_start[chapter_slots[book, chapter]] + number - 1
+
+    to_canon = array("i", [-1]) * total
+    from_canon = array("i", [-1]) * VERSE_COUNT
+    seen_canon: set[int] = set()
+    seen: set[int] = set()
+    for protestant, other in pairs:
+        canon = canon_ordinal(*protestant) if protestant else -1
+        value = to_ordinal(other) if other else -1
+        if protestant and canon not in seen_canon:
+            seen_canon.add(canon)
+            from_canon[canon] = value
+        if other and value not in seen:
+            seen.add(value)
+            to_canon[value] = canon
+
+    # Everything no rule mentions keeps its number
+    for book, book_chapters in CHAPTER_VERSE_MAP.items():
+        for chapter, verses in book_chapters.items():
+            if (book, chapter) not in chapter_slots:
+                continue
+            for number in range(1, min(verses, chapters[book][chapter]) + 1):
+                canon = canon_ordinal(book, chapter, number)
+                value = to_ordinal((book, chapter, number))
+                if canon not in seen_canon and value not in seen:
+                    from_canon[canon] = value
+                    to_canon[value] = canon
+
+    return Layout(chapters, chapter_slots, chapter_start, slot_chapter, ordinal_slot, to_canon, from_canon)
+
+
+@cache
+def table(source: Versification, target: Versification) -> array:
+    """Ordinal in `source` -> ordinal in `target`, -1 where `target` has no such verse"""
+    if source == "protestant":
+        return layout(target).from_canon
+    if target == "protestant":
+        return layout(source).to_canon
+
+    from_canon = layout(target).from_canon
+    return array("i", (from_canon[canon] if canon >= 0 else -1 for canon in layout(source).to_canon))
+
+
+def ordinal(book: str, chapter: int, verse: int, scheme: Versification = "protestant") -> int:
+    scheme_layout = layout(scheme)
+    if not 1 <= verse <= scheme_layout.chapters.get(book, {}).get(chapter, 0):
+        raise KeyError(f"{book}{chapter}:{verse}")
+
+    return scheme_layout.chapter_start[scheme_layout.chapter_slots[book, chapter]] + verse - 1
+
+
+def from_ordinal(value: int, scheme: Versification = "protestant") -> Verse:
+    scheme_layout = layout(scheme)
+    if not 0 <= value < scheme_layout.verse_count:
+        raise KeyError(value)
+
+    slot = scheme_layout.ordinal_slot[value]
+    book, chapter = scheme_layout.slot_chapter[slot]
+    return book, chapter, value - scheme_layout.chapter_start[slot] + 1
+
+
+def translate(value: int, source: Versification, target: Versification) -> int:
+    """Ordinal of the same verse in another scheme, -1 if it has none"""
+    return table(source, target)[value]
+
+
+def translate_verse(book: str, chapter: int, verse: int, source: Versification, target: Versification) -> Verse | None:
+    """e.g. ("jl", 3, 1, "catholic", "protestant") -> ("jl", 2, 28)"""
+    value = translate(ordinal(book, chapter, verse, source), source, target)
+    return from_ordinal(value, target) if value >= 0 else None
+
+
+def translate_many(values: t.Sequence[int], source: Versification, target: Versification) -> t.Sequence[int]:
+    """`translate` for a whole range or array of ordinals, vectorized when numpy is available"""
+    try:
+        import numpy as np
+    except ImportError:
+        lookup = table(source, target)
+        return array("i", (lookup[value] for value in values))
+
+    return np.frombuffer(table(source, target), dtype=np.int32)[np.asarray(values)]
+
+
+def version_versification(version_dir: Path) -> Versification:
+    """e.g. json/catolicos/pt-br/ave-maria -> "vulgate" """
+    return VERSION_VERSIFICATION.get(version_dir.name, "protestant")
+
+
+def main():
+    schemes = t.get_args(Versification)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("verse", help='e.g. "jl3:1"')
+    parser.add_argument("--source", choices=schemes, default="protestant")
+    parser.add_argument("--target", choices=schemes, help="Every scheme when omitted")
+    args = parser.parse_args()
+
+    book, chapter, verse = split_ref(args.verse)
+    if book not in BOOK_INDEX:
+        parser.error(f"Unknown book: {book}")
+
+    for target in [args.target] if args.target else schemes:
+        found = translate_verse(book, int(chapter), int(verse), args.source, target)
+        shown = f"{found[0]}{found[1]}:{found[2]}" if found else "[red]-[/red]"
+        print(f"[bold]{target}[/bold] {shown}")
+
+
+if __name__ == "__main__":
+    main()